@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from itertools import islice
+
+from reviews.models import GenreTitle, Title
+
+TITLE_EXPORT_FIELDS = (
+    'id', 'name', 'year', 'description', 'category', 'genre',
+    'rating', 'rating_count',
+)
+
+
+def iter_titles(chunk_size):
+    """
+    Yields catalogue rows, titles are read with a chunked iterator
+    and genres are resolved with one query per chunk.
+    """
+    titles = Title.objects.order_by('pk').values_list(
+        'pk', 'name', 'year', 'description', 'category__slug',
+        'rating', 'rating_count',
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(titles, chunk_size))
+        if not chunk:
+            return
+        genres = defaultdict(list)
+        title_genres = GenreTitle.objects.filter(
+            title_id__in=[row[0] for row in chunk]
+        ).order_by('genre__slug').values_list('title_id', 'genre__slug')
+        for title_id, slug in title_genres:
+            genres[title_id].append(slug)
+        for pk, name, year, description, category, rating, count in chunk:
+            yield {
+                'id': pk,
+                'name': name,
+                'year': year,
+                'description': description,
+                'category': category,
+                'genre': genres[pk],
+                'rating': rating,
+                'rating_count': count,
+            }
+
+
+def to_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def to_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=TITLE_EXPORT_FIELDS)
+    # The header goes out on its own, an empty catalogue still gets it.
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow({**row, 'genre': ','.join(row['genre'])})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
@@ -1,19 +1,86 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
+
+from reviews import registry
+from reviews.models import GenreTitle, Title, casefold_key
+
+# Sorts after every character, closes the index range of a key prefix.
+KEY_PREFIX_END = '\U0010ffff'
+
+
+def key_prefix_q(field_name, value):
+    """
+    Case-insensitive prefix lookup on a casefolded key field,
+    expressed as a range so that it is served by the key index.
+    """
+    key = casefold_key(value)
+    return Q(**{
+        f'{field_name}__gte': key,
+        f'{field_name}__lt': key + KEY_PREFIX_END,
+    })
+
+
+def key_contains_q(field_name, value):
+    """
+    Case-insensitive substring lookup on a casefolded key field.
+    """
+    return Q(**{f'{field_name}__contains': casefold_key(value)})
 
-from reviews.models import Title
+
+class KeySearchFilter(SearchFilter):
+    """
+    Matches the search terms as substrings of the casefolded key
+    `search_fields`, so the search ignores case and ё.
+    `search_prefix` opts in to a prefix match served by the key index.
+    """
+    prefix_search_param = 'search_prefix'
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        if not search_fields:
+            return queryset
+        conditions = [
+            reduce(or_, (
+                key_contains_q(field_name, term)
+                for field_name in search_fields
+            ))
+            for term in self.get_search_terms(request)
+        ]
+        prefix = request.query_params.get(self.prefix_search_param, '')
+        if prefix.strip():
+            conditions.append(reduce(or_, (
+                key_prefix_q(field_name, prefix.strip())
+                for field_name in search_fields
+            )))
+        return queryset.filter(*conditions)
 
 
 class TitleFilter(filters.FilterSet):
-    genre = filters.CharFilter(
-        field_name='genre__slug', lookup_expr='icontains'
-    )
-    category = filters.CharFilter(
-        field_name='category__slug', lookup_expr='icontains'
-    )
-    name = filters.CharFilter(
-        field_name='name', lookup_expr='icontains'
-    )
+    genre = filters.CharFilter(method='filter_genre')
+    category = filters.CharFilter(method='filter_category')
+    name = filters.CharFilter(method='filter_name')
+    name_prefix = filters.CharFilter(method='filter_name_prefix')
 
     class Meta:
         model = Title
-        fields = ('name', 'year', 'genre', 'category',)
+        fields = ('name', 'name_prefix', 'year', 'genre', 'category',)
+
+    def filter_name(self, queryset, name, value):
+        return queryset.filter(key_contains_q('name_key', value))
+
+    def filter_name_prefix(self, queryset, name, value):
+        return queryset.filter(key_prefix_q('name_key', value))
+
+    def filter_genre(self, queryset, name, value):
+        return queryset.filter(pk__in=GenreTitle.objects.filter(
+            genre_id__in=registry.genres.search(value)
+        ).values('title_id'))
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(
+            category_id__in=registry.categories.search(value)
+        )
@@ -0,0 +1,49 @@
+"""
+Cached serialized titles assembled into list responses.
+
+A fragment is the serializer output of one title, stored under the
+version stamps of the title and of the catalogue of categories and
+genres. The stamps are read before the titles, so a fragment is never
+older than the stamps it is stored under. Writes move the stamps on,
+outdated fragments are not read again and expire with the timeout.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from reviews import versions
+from reviews.models import Title
+
+
+def get_fragment_key(serializer_class, title_id, stamp, catalogue_stamp):
+    return (
+        f'fragment:{serializer_class.__name__}:{title_id}:'
+        f'{stamp}:{catalogue_stamp}'
+    )
+
+
+def render_titles(title_ids, serializer_class, context):
+    """
+    Returns the serialized titles in the order of `title_ids`, only the
+    titles without a current fragment are read and serialized.
+    Titles deleted in the meantime are skipped.
+    """
+    *stamps, catalogue_stamp = versions.get_stamps(
+        [versions.get_title_key(pk) for pk in title_ids]
+        + [versions.CATALOGUE_KEY]
+    )
+    keys = {
+        pk: get_fragment_key(serializer_class, pk, stamp, catalogue_stamp)
+        for pk, stamp in zip(title_ids, stamps)
+    }
+    fragments = cache.get_many(list(keys.values()))
+    missing = [pk for pk, key in keys.items() if key not in fragments]
+    if missing:
+        titles = Title.objects.prefetch_related('genres').in_bulk(missing)
+        serializer = serializer_class(
+            [titles[pk] for pk in missing if pk in titles],
+            many=True, context=context
+        )
+        rendered = {keys[item['id']]: item for item in serializer.data}
+        cache.set_many(rendered, settings.FRAGMENT_CACHE_TIMEOUT)
+        fragments.update(rendered)
+    return [fragments[key] for key in keys.values() if key in fragments]
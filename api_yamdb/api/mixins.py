@@ -1,6 +1,12 @@
-from rest_framework import viewsets
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status, viewsets
+from rest_framework.response import Response
 
 from api_yamdb.settings import admin_methods, moderator_methods
+from reviews import versions
 from .permissions import IsAdminOrSuperUser, IsModeratorOrAdminOrOwner
 
 
@@ -27,3 +33,68 @@ class ModeratorViewMixin(AdminViewMixin):
 
     restricted_methods = moderator_methods
     current_permission_class = IsModeratorOrAdminOrOwner
+
+
+class CachedListMixin:
+    """
+    Serves list responses from the `list_cache` of the view,
+    the X-Cache header tells whether the response was cached.
+    """
+
+    list_cache = None
+
+    def list(self, request, *args, **kwargs):
+        key = self.list_cache.get_key(request)
+        data = self.list_cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            self.list_cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Answers list and retrieve requests with 304 Not Modified when the
+    version stamps of `get_version_keys` match the client's copy,
+    before the view reads the resource or runs serializers.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+
+    def get_version_keys(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+        stamps = versions.get_stamps(self.get_version_keys())
+        etag = quote_etag(
+            md5(':'.join(map(str, stamps)).encode()).hexdigest()
+        )
+        last_modified = max(stamps) // 10 ** 6
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+        ):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
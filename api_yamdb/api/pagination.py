@@ -0,0 +1,284 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, PageNumberPagination,
+                                       _positive_int)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from reviews import search
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the view's `cursor_ordering` fields.
+
+    The cursor holds the ordering values of the page edge row,
+    the next page is selected with a row comparison against them,
+    so deep pages cost as much as the first one and need no COUNT.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.ordering = view.cursor_ordering
+        position, reverse = self.decode_cursor(
+            request.query_params[self.cursor_query_param], queryset.model
+        )
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(ordering, position)
+            )
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def get_position_filter(ordering, position):
+        """
+        Selects the rows after the position: an inclusive bound on the
+        leading field, which the index seeks to, and the comparison of
+        the following fields among the rows equal on the leading one.
+        """
+        lookups = [
+            (field.lstrip('-'), 'lt' if field.startswith('-') else 'gt')
+            for field in ordering
+        ]
+        (first, first_lookup), *rest = lookups
+        bound = Q(**{f'{first}__{first_lookup}e': position[0]})
+        condition = Q(**{f'{first}__{first_lookup}': position[0]})
+        equal = {}
+        for (name, lookup), value in zip(rest, position[1:]):
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return bound & condition
+
+    def encode_cursor(self, obj, reverse):
+        position = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            position.append(value)
+        cursor = base64.urlsafe_b64encode(
+            json.dumps({'p': position, 'r': reverse}).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, cursor, model):
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            position = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, data['p'])
+            ]
+            reverse = bool(data['r'])
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator that takes the total count instead of counting the rows.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class DefaultPagination(PageNumberPagination):
+    """
+    Page number pagination with opt-in keyset pagination.
+
+    Requests with the `cursor` query parameter (empty for the first page)
+    are paginated by cursor on views that declare `cursor_ordering`.
+
+    Unfiltered listings take their total from the view's
+    `get_cached_count()` and count all rows when it has none,
+    filtered listings count at most COUNT_ESTIMATE_CAP rows past
+    the requested page and flag a capped total with `count_is_estimate`.
+
+    Clients choose the page size with `page_size` or `limit`,
+    capped by the view's `max_page_size`.
+    """
+
+    cursor_query_param = KeysetPagination.cursor_query_param
+    page_size_query_param = 'page_size'
+    page_size_query_aliases = ('limit',)
+    max_page_size = settings.MAX_PAGE_SIZE
+    unfiltering_query_params = ('ordering', 'format')
+    view = None
+
+    def get_page_size(self, request):
+        max_page_size = getattr(self.view, 'max_page_size', self.max_page_size)
+        for param in (
+            self.page_size_query_param, *self.page_size_query_aliases
+        ):
+            if param in request.query_params:
+                try:
+                    return _positive_int(
+                        request.query_params[param],
+                        strict=True,
+                        cutoff=max_page_size
+                    )
+                except ValueError:
+                    pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.view = view
+        self.keyset_paginator = None
+        if (
+            self.cursor_query_param in request.query_params
+            and getattr(view, 'cursor_ordering', None)
+        ):
+            page_size = self.get_page_size(request)
+            if not page_size:
+                return None
+            self.keyset_paginator = KeysetPagination(page_size)
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        count, self.count_is_estimate = self.get_count(
+            queryset, request, view
+        )
+        self.django_paginator_class = partial(CountedPaginator, count=count)
+        return super().paginate_queryset(queryset, request, view)
+
+    def is_filtered(self, request):
+        return bool(set(request.query_params) - {
+            self.page_query_param, self.page_size_query_param,
+            *self.page_size_query_aliases, *self.unfiltering_query_params,
+        })
+
+    def get_count(self, queryset, request, view):
+        if not self.is_filtered(request):
+            get_cached_count = getattr(view, 'get_cached_count', None)
+            count = get_cached_count() if get_cached_count else None
+            if count is None:
+                count = queryset.count()
+            return count, False
+        try:
+            page_number = int(request.query_params[self.page_query_param])
+        except (KeyError, ValueError):
+            page_number = 1
+        limit = max(
+            settings.COUNT_ESTIMATE_CAP,
+            page_number * self.get_page_size(request)
+        ) + 1
+        count = queryset[:limit].count()
+        return count, count == limit
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_is_estimate', self.count_is_estimate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class SearchPagination(BasePagination):
+    """
+    Cursor pagination of ranked search hits.
+
+    The cursor holds the rank and rowid of the last hit of the page,
+    page size parameters are the ones of DefaultPagination.
+    """
+
+    cursor_query_param = KeysetPagination.cursor_query_param
+    invalid_cursor_message = KeysetPagination.invalid_cursor_message
+
+    def paginate_search(self, text, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        sizer = DefaultPagination()
+        sizer.view = view
+        page_size = sizer.get_page_size(request)
+        position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param)
+        )
+        hits = search.search(text, page_size + 1, position)
+        self.has_next = len(hits) > page_size
+        self.page = hits[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        edge = self.page[-1]
+        cursor = base64.urlsafe_b64encode(
+            json.dumps({'p': [edge.rank, edge.rowid]}).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return float(data['p'][0]), int(data['p'][1])
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
@@ -1,34 +1,76 @@
+from contextlib import nullcontext
+
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
-from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews import registry, search
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleStatistics, User)
 from .validators import (allowed_username_validator, score_validator,
                          RegexUsernameValidator, year_validator)
 
 
-class SignupSerializer(serializers.ModelSerializer):
+class ConstraintFirstSerializer(serializers.ModelSerializer):
+    """
+    Model serializer that leaves uniqueness checks to the database.
+
+    Rows are written without lookups beforehand, a unique constraint
+    violation is turned into the validation errors of `unique_messages`.
+    """
+    unique_messages = {}
+
+    def save(self, **kwargs):
+        # A savepoint keeps an outer transaction usable after the error,
+        # in autocommit mode the failed insert leaves nothing to roll back.
+        if transaction.get_connection().in_atomic_block:
+            savepoint = transaction.atomic()
+        else:
+            savepoint = nullcontext()
+        try:
+            with savepoint:
+                return super().save(**kwargs)
+        except IntegrityError:
+            # Only a value taken by another row is reported,
+            # any other constraint error is re-raised.
+            errors = self.get_unique_errors({**self.validated_data, **kwargs})
+            if not errors:
+                raise
+            raise serializers.ValidationError(errors)
+
+    def get_others(self):
+        others = self.Meta.model.objects.all()
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        return others
+
+    def get_unique_errors(self, values):
+        others = self.get_others()
+        errors = {}
+        for field, message in self.unique_messages.items():
+            value = values.get(field)
+            if value is not None and others.filter(**{field: value}).exists():
+                errors[field] = [message]
+        return errors
+
+
+class SignupSerializer(ConstraintFirstSerializer):
     """
     User registration serializer.
     """
-    email = serializers.EmailField(
-        validators=[
-            UniqueValidator(
-                queryset=User.objects.all(),
-                message="Введённый email используется другим пользователем."
-            ),
-        ]
-    )
+    email = serializers.EmailField()
     username = serializers.CharField(
         validators=[
             allowed_username_validator,
             RegexUsernameValidator(),
-            UniqueValidator(
-                queryset=User.objects.all(),
-                message="Введённый username используется другим пользователем."
-            )
         ]
     )
+    unique_messages = {
+        'email': "Введённый email используется другим пользователем.",
+        'username': "Введённый username используется другим пользователем.",
+    }
 
     class Meta:
         model = User
@@ -74,19 +116,70 @@ class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Category
-        exclude = ('id',)
+        exclude = ('id', 'name_key')
 
 
 class GenreSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Genre
-        exclude = ('id',)
+        exclude = ('id', 'name_key')
+
+
+class RegistrySlugRelatedField(SlugRelatedField):
+    """
+    Slug related field resolved through the in-process registry.
+    """
+
+    def __init__(self, registry, **kwargs):
+        self.registry = registry
+        kwargs.setdefault('queryset', registry.model.objects.all())
+        super().__init__(slug_field='slug', **kwargs)
+
+    def use_pk_only_optimization(self):
+        return True
+
+    def to_representation(self, obj):
+        return self.registry.get(obj.pk).slug
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        obj = self.registry.get_by_slug(data)
+        if obj is None:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=data)
+        return obj
+
+
+class RegistryObjectField(serializers.Field):
+    """
+    Read only field that renders the related rows from the registry
+    by the ids of a title, without reading the related tables.
+    """
+
+    def __init__(self, registry, serializer_class, many=False, **kwargs):
+        self.registry = registry
+        self.serializer_class = serializer_class
+        self.many = many
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if self.many:
+            return [
+                self.registry.represent(pk, self.serializer_class)
+                for pk in value
+            ]
+        return self.registry.represent(value, self.serializer_class)
 
 
 class TitleGetSerializer(serializers.ModelSerializer):
-    genre = GenreSerializer(many=True)
-    category = CategorySerializer()
+    genre = RegistryObjectField(
+        registry.genres, GenreSerializer, many=True, source='genre_ids'
+    )
+    category = RegistryObjectField(
+        registry.categories, CategorySerializer, source='category_id'
+    )
     rating = serializers.FloatField()
 
     class Meta:
@@ -96,16 +189,35 @@ class TitleGetSerializer(serializers.ModelSerializer):
         )
 
 
+class TitleTopSerializer(TitleGetSerializer):
+
+    class Meta(TitleGetSerializer.Meta):
+        fields = TitleGetSerializer.Meta.fields + ('weighted_rating',)
+
+
+class TitleStatisticsSerializer(serializers.ModelSerializer):
+    histogram = serializers.DictField(child=serializers.IntegerField())
+    review_count = serializers.IntegerField()
+    mean = serializers.FloatField()
+    median = serializers.FloatField()
+    std_deviation = serializers.FloatField()
+
+    class Meta:
+        model = TitleStatistics
+        fields = (
+            'histogram', 'review_count', 'mean', 'median', 'std_deviation',
+            'last_review_date',
+        )
+
+
 class TitlePostSerializer(serializers.ModelSerializer):
-    genre = SlugRelatedField(
-        queryset=Genre.objects.all(),
-        slug_field='slug',
+    genre = RegistrySlugRelatedField(
+        registry.genres,
         many=True,
         required=False
     )
-    category = SlugRelatedField(
-        queryset=Category.objects.all(),
-        slug_field='slug',
+    category = RegistrySlugRelatedField(
+        registry.categories,
         required=False
     )
     year = serializers.IntegerField(validators=[year_validator])
@@ -123,7 +235,7 @@ class TitlePostSerializer(serializers.ModelSerializer):
         ]
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(ConstraintFirstSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True
@@ -134,19 +246,16 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = ('id', 'text', 'author', 'score', 'pub_date')
 
-    def validate(self, data):
-        if self.context['request'].method != 'POST':
-            return super().validate(data)
-        title_id = self.context['view'].kwargs.get('title_id')
-        author = self.context['request'].user
-        is_second_review = (
-            Review.objects.filter(author=author, title=title_id).exists()
-        )
-        if is_second_review:
-            raise serializers.ValidationError(
+    def get_unique_errors(self, values):
+        title = values.get('title') or self.instance.title
+        author = values.get('author') or self.instance.author
+        if not self.get_others().filter(title=title, author=author).exists():
+            return {}
+        return {
+            api_settings.NON_FIELD_ERRORS_KEY: [
                 'Вы уже написали отзыв к этому произведению.'
-            )
-        return super().validate(data)
+            ]
+        }
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -158,3 +267,23 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ('id', 'text', 'author', 'pub_date')
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+
+    def validate_q(self, value):
+        if not search.parse_query(value):
+            raise serializers.ValidationError(
+                'Поисковый запрос должен содержать хотя бы одно слово.'
+            )
+        return value
+
+
+class SearchHitSerializer(serializers.Serializer):
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    title_id = serializers.IntegerField()
+    review_id = serializers.IntegerField(allow_null=True)
+    snippet = serializers.CharField()
+    rank = serializers.FloatField()
@@ -2,7 +2,8 @@ from django.urls import include, path
 from rest_framework import routers
 
 from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    ReviewViewSet, AuthViewSet, TitleViewSet, UserViewSet)
+                    ReviewViewSet, AuthViewSet, SearchViewSet, TitleViewSet,
+                    UserViewSet)
 
 router_v1 = routers.DefaultRouter()
 router_v1.register(r'auth', AuthViewSet, basename='auth')
@@ -17,6 +18,7 @@ router_v1.register(
     r'titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/comments',
     CommentViewSet, basename='comments'
 )
+router_v1.register(r'search', SearchViewSet, basename='search')
 
 urlpatterns = [
     path('v1/', include(router_v1.urls)),
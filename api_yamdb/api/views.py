@@ -1,5 +1,5 @@
 from django.contrib.auth.tokens import default_token_generator
-from django.db.models import Avg
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, status, viewsets
 from rest_framework.decorators import action
@@ -8,16 +8,24 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from api_yamdb.settings import ADMINS_EMAIL
-from reviews.models import Category, Genre, Review, Title, User
-from .filters import TitleFilter
-from .mixins import AdminViewMixin, ModeratorViewMixin
+from api_yamdb.settings import ADMINS_EMAIL, EXPORT_CHUNK_SIZE
+from reviews import counters, leaderboards, list_cache, registry, versions
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleStatistics, User)
+from .export import iter_titles, to_csv, to_ndjson
+from .filters import KeySearchFilter, TitleFilter
+from .fragments import render_titles
+from .mixins import (AdminViewMixin, CachedListMixin, ConditionalGetMixin,
+                     ModeratorViewMixin)
+from .pagination import SearchPagination
 from .permissions import IsAdminOrSuperUser
 from .serializers import (CategorySerializer, CommentSerializer,
                           ConfirmationCodeSerializer,
                           GenreSerializer, TitleGetSerializer,
-                          ReviewSerializer, SignupSerializer,
-                          TitlePostSerializer, TokenSerializer,
+                          ReviewSerializer, SearchHitSerializer,
+                          SearchQuerySerializer, SignupSerializer,
+                          TitlePostSerializer, TitleStatisticsSerializer,
+                          TitleTopSerializer, TokenSerializer,
                           UserPatchMeSerializer, UserSerializer)
 from .utils import get_response_message, send_confirmation_code
 
@@ -27,11 +35,12 @@ class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
     permission_classes = (IsAdminOrSuperUser,)
     filter_backends = (
-        DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter
+        DjangoFilterBackend, filters.OrderingFilter, KeySearchFilter
     )
     lookup_field = 'username'
-    search_fields = ('username',)
-    ordering = ('username',)
+    search_fields = ('username_key',)
+    ordering = ('username_key',)
+    max_page_size = 50
 
     @action(
         methods=['GET', 'PATCH'],
@@ -66,20 +75,17 @@ class AuthViewSet(viewsets.ViewSet):
 
     @property
     def validated_user_data(self):
-        if self.action == 'refresh_confirmation_code':
-            serializer = ConfirmationCodeSerializer(data=self.request.data)
-        else:
-            serializer = SignupSerializer(data=self.request.data)
+        serializer = ConfirmationCodeSerializer(data=self.request.data)
         serializer.is_valid(raise_exception=True)
         validated_user_data = serializer.validated_data
         return validated_user_data
 
     @action(methods=['POST'], detail=False)
     def signup(self, request):
-        username = self.validated_user_data['username']
-        email = self.validated_user_data['email']
-        user = User.objects.create(email=email, username=username)
-        send_confirmation_code(user, ADMINS_EMAIL, email)
+        serializer = SignupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.save()
+        send_confirmation_code(user, ADMINS_EMAIL, user.email)
         return Response(
             get_response_message().get('successful_registration'),
             status=status.HTTP_200_OK
@@ -126,60 +132,209 @@ class AuthViewSet(viewsets.ViewSet):
 
 
 class CategoryViewSet(
-        mixins.CreateModelMixin, mixins.DestroyModelMixin,
+        CachedListMixin, mixins.CreateModelMixin, mixins.DestroyModelMixin,
         mixins.ListModelMixin, AdminViewMixin):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
-    filter_backends = (filters.OrderingFilter, filters.SearchFilter,)
-    search_fields = ('name', 'slug')
-    ordering = ('name',)
+    list_cache = list_cache.categories
+    filter_backends = (filters.OrderingFilter, KeySearchFilter,)
+    search_fields = ('name_key', 'slug')
+    ordering = ('name_key',)
+    max_page_size = 100
 
 
 class GenreViewSet(CategoryViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    list_cache = list_cache.genres
 
 
-class TitleViewSet(viewsets.ModelViewSet, AdminViewMixin):
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).select_related()
+class TitleViewSet(ConditionalGetMixin, viewsets.ModelViewSet,
+                   AdminViewMixin):
+    # Categories and genres are rendered from the registry by their ids.
+    queryset = Title.objects.prefetch_related('genres')
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter,)
     filterset_class = TitleFilter
-    ordering = ('name',)
+    ordering = ('name_key',)
+    cursor_ordering = ('name_key', 'id')
+    # Any title write changes the list, it has no cheap version stamp.
+    conditional_actions = ('retrieve',)
+    max_page_size = 50
+
+    def get_cached_count(self):
+        return counters.get_titles_count()
+
+    def get_version_keys(self):
+        return [
+            versions.get_title_key(self.kwargs['pk']), versions.CATALOGUE_KEY
+        ]
+
+    def list(self, request, *args, **kwargs):
+        # Pages are read as ids only, the titles are rendered
+        # from cached fragments and read in full on a miss.
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(
+            queryset.prefetch_related(None).only('id', *self.cursor_ordering)
+        )
+        data = render_titles(
+            [title.pk for title in page],
+            self.get_serializer_class(), self.get_serializer_context()
+        )
+        return self.get_paginated_response(data)
+
+    def get_object(self):
+        title = super().get_object()
+        category = registry.categories.get(title.category_id)
+        if category is not None:
+            title.category = category
+        return title
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return TitleGetSerializer
+        if self.action == 'statistics':
+            return TitleStatisticsSerializer
+        if self.action == 'top':
+            return TitleTopSerializer
         return TitlePostSerializer
 
+    @action(methods=['GET'], detail=False, url_path='top')
+    def top(self, request):
+        title_ids = leaderboards.get_board(
+            category=request.query_params.get('category'),
+            genre=request.query_params.get('genre'),
+        )
+        data = render_titles(
+            title_ids,
+            self.get_serializer_class(), self.get_serializer_context()
+        )
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        permission_classes=(IsAdminOrSuperUser,),
+    )
+    def export(self, request):
+        export_formats = {
+            'ndjson': (to_ndjson, 'application/x-ndjson'),
+            'csv': (to_csv, 'text/csv'),
+        }
+        export_format = request.query_params.get('type', 'ndjson')
+        if export_format not in export_formats:
+            return Response(
+                f'Неизвестный формат выгрузки: {export_format}.',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        render, content_type = export_formats[export_format]
+        response = StreamingHttpResponse(
+            render(iter_titles(EXPORT_CHUNK_SIZE)),
+            content_type=f'{content_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="titles.{export_format}"'
+        )
+        return response
+
+    @action(methods=['GET'], detail=True, url_path='stats')
+    def statistics(self, request, pk=None):
+        statistics = TitleStatistics.objects.filter(title_id=pk).first()
+        if statistics is None:
+            statistics = TitleStatistics.objects.rebuild(self.get_object().pk)
+        serializer = self.get_serializer(statistics)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 
-class ReviewViewSet(viewsets.ModelViewSet, ModeratorViewMixin):
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet,
+                    ModeratorViewMixin):
     serializer_class = ReviewSerializer
     filter_backends = (filters.OrderingFilter,)
     ordering = ('-pub_date')
+    cursor_ordering = ('-pub_date', '-id')
+    max_page_size = 100
+
+    def get_title(self):
+        if not hasattr(self, '_title'):
+            title_id = self.kwargs.get('title_id')
+            self._title = get_object_or_404(Title, id=title_id)
+        return self._title
+
+    def get_cached_count(self):
+        return self.get_title().rating_count
+
+    def get_version_keys(self):
+        return [
+            versions.get_reviews_key(self.kwargs.get('title_id')),
+            versions.USERS_KEY,
+        ]
 
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all().select_related('author')
+        if self.detail:
+            # The object lookup itself checks that the review
+            # belongs to the title, no separate title query is needed.
+            return Review.objects.filter(
+                title_id=self.kwargs.get('title_id')
+            ).select_related('author')
+        return self.get_title().reviews.all().select_related('author')
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_title())
 
 
 class CommentViewSet(ReviewViewSet):
     serializer_class = CommentSerializer
 
+    def get_review(self):
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review.objects.only('id', 'title_id'),
+                id=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id'),
+            )
+        return self._review
+
+    def get_cached_count(self):
+        return None
+
+    def get_version_keys(self):
+        return [
+            versions.get_comments_key(self.kwargs.get('review_id')),
+            versions.USERS_KEY,
+        ]
+
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(title.reviews, id=review_id)
-        return review.comments.all().select_related('author')
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id'),
+        ).select_related('author', 'review')
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            # Comments prove the review exists, only an empty page
+            # has to tell an unknown review from one without comments.
+            self.get_review()
+        return page
 
     def perform_create(self, serializer):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_review())
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Ranked full-text search over titles, reviews and comments.
+    """
+
+    permission_classes = (AllowAny,)
+    max_page_size = 50
+
+    def list(self, request):
+        serializer = SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        paginator = SearchPagination()
+        hits = paginator.paginate_search(
+            serializer.validated_data['q'], request, self
+        )
+        return paginator.get_paginated_response(
+            SearchHitSerializer(hits, many=True).data
+        )
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -20,7 +21,7 @@ INSTALLED_APPS = [
     'django_filters',
     'rest_framework_simplejwt',
     'api',
-    'reviews',
+    'reviews.apps.ReviewsConfig',
 ]
 
 MIDDLEWARE = [
@@ -54,6 +55,28 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Leaderboards and counters are shared between workers through the cache,
+# multi-process deployments should use a shared backend such as memcached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Hit and miss counters of the cached lists are read by the
+    # list_cache_stats command in its own process, so they live in files
+    # all processes of the host share. The file backend may lose a count
+    # when two processes count at once, memcached counts atomically.
+    'stats': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'api_yamdb_stats'),
+    },
+}
+# Version tokens tell processes that a write made their registries,
+# cached responses and boards stale. LocMemCache keeps them per process,
+# so they expire after this many seconds to bound how long other
+# processes serve outdated data; with a shared backend set None.
+# Version stamps of conditional GET are kept in the database instead.
+VERSION_TIMEOUT = 10
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -86,10 +109,25 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.DefaultPagination',
     'PAGE_SIZE': 5,
 }
 
+# Upper bound of the client-selected page size, views may lower it.
+MAX_PAGE_SIZE = 100
+
+EXPORT_CHUNK_SIZE = 1000
+
+# Filtered listings count at most this many rows past the requested page.
+COUNT_ESTIMATE_CAP = 1000
+COUNTER_TIMEOUT = 60 * 5
+# Admin changelists of large tables count at most this many rows.
+ADMIN_COUNT_CAP = 10000
+# Cached category and genre listings are replaced on writes,
+# the timeout only evicts the responses of outdated versions.
+LIST_CACHE_TIMEOUT = 60 * 60 * 24
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -118,3 +156,11 @@ admin_methods = ('POST', 'PATCH', 'PUT', 'DELETE',)
 moderator_methods = ('PATCH', 'PUT', 'DELETE',)
 
 ADMINS_EMAIL = 'from@api_yamdb.com'
+
+# Bayesian weighted rating: scores are shrunk towards the prior mean
+# with the weight of RATING_PRIOR_VOTES reviews.
+RATING_PRIOR_MEAN = 5.5
+RATING_PRIOR_VOTES = 10
+
+LEADERBOARD_SIZE = 10
+LEADERBOARD_TIMEOUT = 60 * 60
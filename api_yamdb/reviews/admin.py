@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 
-from .models import Category, Comment, Genre, GenreTitle, Review, Title, User
+from . import registry
+from .models import (Category, Comment, Genre, GenreTitle, Review, Title,
+                     TitleStatistics, User)
 
 
 class AdminUser(admin.ModelAdmin):
@@ -33,36 +38,118 @@ class AdminGenreInline(admin.TabularInline):
 #     model = GenreTitle
 
 
+class CappedCountPaginator(Paginator):
+    """
+    Paginator that counts at most ADMIN_COUNT_CAP rows,
+    changelists of huge tables page through the newest rows only.
+    """
+
+    @cached_property
+    def count(self):
+        return self.object_list[:settings.ADMIN_COUNT_CAP].count()
+
+
+class RegistryListFilter(admin.SimpleListFilter):
+    """
+    List filter with choices taken from the in-process registry.
+    """
+    registry = None
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        objects = sorted(
+            self.registry.load().by_id.values(), key=lambda obj: obj.name_key
+        )
+        return [(obj.pk, obj.name) for obj in objects]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value()})
+        return queryset
+
+
+class CategoryListFilter(RegistryListFilter):
+    title = 'Категория'
+    parameter_name = 'category'
+    registry = registry.categories
+    lookup = 'category_id'
+
+
+class GenreListFilter(RegistryListFilter):
+    title = 'Жанр'
+    parameter_name = 'genre'
+    registry = registry.genres
+    lookup = 'genres__genre_id'
+
+
 class AdminTitle(admin.ModelAdmin):
     fields = ('name', 'category', 'year')
     inlines = (AdminGenreInline,)
-    list_display = ('pk', 'name', 'year', 'category', 'get_genres')
+    list_display = ('pk', 'name', 'year', 'get_category', 'get_genres')
     search_fields = ('pk', 'name', 'year', 'category__name', 'genre__name')
-    list_filter = ('category', 'genre',)
+    list_filter = (CategoryListFilter, GenreListFilter)
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('genres')
+
+    def get_category(self, obj):
+        return registry.categories.get(obj.category_id)
+    get_category.short_description = 'Категория'
 
     def get_genres(self, obj):
-        fetch_genres = Genre.objects.all()
-        return [
-            fetch_genres.filter(pk=genre.genre_id)[0].name
-            for genre in obj.genres.all()
-        ]
+        # A genre deleted since the titles were read is left out.
+        genres = (registry.genres.get(genre_id) for genre_id in obj.genre_ids)
+        return [genre.name for genre in genres if genre is not None]
     get_genres.short_description = 'Жанр'
 
 
-class AdminReview(admin.ModelAdmin):
+class ScoreListFilter(admin.SimpleListFilter):
+    """
+    Score filter with fixed choices, without scanning reviews for them.
+    """
+    title = 'Оценка'
+    parameter_name = 'score'
+
+    def lookups(self, request, model_admin):
+        return [(score, score) for score in TitleStatistics.SCORES]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(score=self.value())
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with millions of rows:
+    newest rows first by primary key, no full result counts
+    and raw id widgets instead of dropdowns with every user.
+    """
+    ordering = ('-pk',)
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    raw_id_fields = ('author',)
+
+
+class AdminReview(LargeTableAdmin):
     list_display = ('pk', 'title_id', 'text', 'author', 'score')
     list_editable = ('score',)
-    search_fields = ('text', 'author', 'score', 'title_id',)
-    list_filter = ('score',)
+    list_select_related = ('author',)
+    search_fields = ('text', 'author__username', 'score', 'title_id',)
+    list_filter = (ScoreListFilter,)
+    raw_id_fields = ('title', 'author')
 
 
-class AdminComment(admin.ModelAdmin):
+class AdminComment(LargeTableAdmin):
     list_display = ('pk', 'get_title_id', 'review_id', 'text', 'author')
-    search_fields = ('text', 'author', 'review_id',)
+    list_select_related = ('review', 'author')
+    search_fields = ('text', 'author__username', 'review_id',)
+    raw_id_fields = ('review', 'author')
 
     def get_title_id(self, obj):
-        fetch_titles = Title.objects.all()
-        return fetch_titles.get(pk=obj.review.title_id).id
+        return obj.review.title_id
     get_title_id.short_description = 'Title ID'
 
 
@@ -0,0 +1,25 @@
+"""
+Cached row counters of unfiltered listings.
+
+A counter is filled with a real COUNT on a cache miss and then shifted
+on writes, the timeout bounds drift left by writes that bypass signals.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Title
+
+TITLES_COUNT_KEY = 'counter:titles'
+
+
+def get_titles_count():
+    return cache.get_or_set(
+        TITLES_COUNT_KEY, Title.objects.count, settings.COUNTER_TIMEOUT
+    )
+
+
+def shift_titles_count(delta):
+    try:
+        cache.incr(TITLES_COUNT_KEY, delta)
+    except ValueError:
+        pass
@@ -0,0 +1,109 @@
+"""
+Materialized top titles leaderboards.
+
+Each board is cached as a list of (-weighted_rating, title_id) pairs
+sorted best first. Review writes patch the boards of the affected title
+in place, a board is rebuilt from the weighted rating index only when it
+is missing or when a title drops to the very end of a full board and
+some title outside of it may now rank higher.
+Boards are stored under a version token that expires after
+VERSION_TIMEOUT, so processes whose cache did not see the writes
+rebuild their boards at most that long after.
+"""
+import bisect
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import registry
+from .models import Title
+
+VERSION_KEY = 'leaderboard:version'
+
+
+def get_board_key(category, genre):
+    version = cache.get_or_set(
+        VERSION_KEY, lambda: uuid4().hex, settings.VERSION_TIMEOUT
+    )
+    return f'leaderboard:{version}:{category or ""}:{genre or ""}'
+
+
+def invalidate_boards():
+    """
+    Drops all boards, used when titles, their categories or genres change.
+    """
+    cache.delete(VERSION_KEY)
+
+
+def build_board(category, genre):
+    titles = Title.objects.all()
+    if category:
+        category = registry.categories.get_by_slug(category)
+        if category is None:
+            return []
+        titles = titles.filter(category_id=category.pk)
+    if genre:
+        genre = registry.genres.get_by_slug(genre)
+        if genre is None:
+            return []
+        titles = titles.filter(genres__genre_id=genre.pk)
+    return [
+        (-rating, title_id) for rating, title_id in
+        titles.order_by('-weighted_rating', 'pk').values_list(
+            'weighted_rating', 'pk'
+        )[:settings.LEADERBOARD_SIZE]
+    ]
+
+
+def get_board(category=None, genre=None):
+    """
+    Returns ids of the top titles of the category and genre, best first.
+    """
+    key = get_board_key(category, genre)
+    entries = cache.get(key)
+    if entries is None:
+        entries = build_board(category, genre)
+        cache.set(key, entries, settings.LEADERBOARD_TIMEOUT)
+    return [title_id for _, title_id in entries]
+
+
+def update_title(title_id):
+    """
+    Moves the title to its new place on every cached board it belongs to.
+    """
+    rows = Title.objects.filter(pk=title_id).values_list(
+        'weighted_rating', 'category__slug', 'genres__genre__slug'
+    )
+    rating = None
+    categories = {None}
+    genres = {None}
+    for rating, category, genre in rows:
+        categories.add(category)
+        genres.add(genre)
+    if rating is None:
+        return
+    entry = (-rating, title_id)
+    size = settings.LEADERBOARD_SIZE
+    boards = {
+        (category, genre) for category in categories for genre in genres
+    }
+    for category, genre in boards:
+        key = get_board_key(category, genre)
+        entries = cache.get(key)
+        if entries is None:
+            continue
+        previous = next(
+            (item for item in entries if item[1] == title_id), None
+        )
+        is_full = len(entries) >= size
+        entries = [item for item in entries if item[1] != title_id]
+        position = bisect.bisect_left(entries, entry)
+        if (
+            previous is not None and is_full
+            and entry > previous and position >= size - 1
+        ):
+            cache.delete(key)
+        elif position < size:
+            entries.insert(position, entry)
+            cache.set(key, entries[:size], settings.LEADERBOARD_TIMEOUT)
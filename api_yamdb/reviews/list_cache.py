@@ -0,0 +1,67 @@
+"""
+Cached list responses of the categories and genres endpoints.
+
+A response is stored under the registry version token of its table
+and the query parameters of the request. Writes through the API and
+the admin replace the token, so the stale responses are never read
+again and expire with the timeout. Tokens themselves expire after
+VERSION_TIMEOUT, which bounds how long a process whose cache did not
+see a write serves the old responses. Hits and misses are counted in the
+`stats` cache shared by all processes, to watch the hit ratio of a running
+deployment from the list_cache_stats command.
+"""
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.http import urlencode
+
+from . import registry
+
+
+class ListCache:
+
+    def __init__(self, name, registry):
+        self.name = name
+        self.registry = registry
+
+    def get_key(self, request):
+        # The pagination links are absolute, the host is a part of the key.
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        version = self.registry.load().version
+        return f'list:{self.name}:{version}:{request.get_host()}:{params}'
+
+    def get_stats_key(self, outcome):
+        return f'list:{self.name}:{outcome}'
+
+    def get(self, key):
+        data = cache.get(key)
+        self.count('misses' if data is None else 'hits')
+        return data
+
+    def set(self, key, data):
+        cache.set(key, data, settings.LIST_CACHE_TIMEOUT)
+
+    def count(self, outcome):
+        key = self.get_stats_key(outcome)
+        stats = caches['stats']
+        try:
+            stats.incr(key)
+        except ValueError:
+            stats.set(key, 1, None)
+
+    def get_stats(self):
+        stats = {
+            outcome: caches['stats'].get(self.get_stats_key(outcome), 0)
+            for outcome in ('hits', 'misses')
+        }
+        total = stats['hits'] + stats['misses']
+        stats['ratio'] = stats['hits'] / total if total else None
+        return stats
+
+    def reset_stats(self):
+        caches['stats'].delete_many(
+            [self.get_stats_key(outcome) for outcome in ('hits', 'misses')]
+        )
+
+
+categories = ListCache('categories', registry.categories)
+genres = ListCache('genres', registry.genres)
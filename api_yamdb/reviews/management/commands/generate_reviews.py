@@ -0,0 +1,423 @@
+'''
+Command to generate a synthetic dataset of the reviews models.
+
+Script writes users, categories, genres, titles with their genres,
+reviews and comments as csv files in the layout of static/data,
+split into numbered shards that populate_reviews --dir loads.
+Distributions follow real catalogues: reviews per title are Zipf
+distributed over the titles (--zipf sets the exponent), scores are
+skewed to the top of the scale and most reviews have no comments
+while a few gather long threads.
+
+The dataset depends on --seed only: every shard is generated from
+its own random generator seeded with the seed, the table and the
+shard number, so shards are generated in parallel by --workers
+processes and the files come out the same for any number of them.
+Rows are drawn a shard at a time with Random.choices and
+Random.sample instead of one call per value.
+--comments sets the expected number of comments, the actual number
+follows from the seed.
+
+With --load the dataset is loaded into the database with
+populate_reviews --dir, ratings and the search index are rebuilt
+afterwards.
+
+For script execution in the command line type:
+
+python3 manage.py generate_reviews --dir <directory> [--seed <number>]
+python3 manage.py generate_reviews --load --reviews 10000000
+
+* --users, --titles, --reviews and --comments set the table sizes
+'''
+import calendar
+import csv
+import math
+import os
+import random
+import tempfile
+import time
+from array import array
+from contextlib import ExitStack
+from functools import partial
+from itertools import accumulate
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.management.commands.dump_reviews import (TABLES, open_file,
+                                                      prepare_directory)
+from reviews.management.pool import get_pool
+
+# Rows per shard of users and titles, reviews are sharded
+# by whole titles and comments follow the shards of their reviews.
+CHUNK_ROWS = 100000
+HEADERS = {name: layout for _, name, layout in TABLES}
+START_DATE = calendar.timegm((2015, 1, 1, 0, 0, 0))
+END_DATE = calendar.timegm((2023, 1, 1, 0, 0, 0))
+FIRST_YEAR = 1900
+LAST_YEAR = 2022
+SCORES = range(1, 11)
+SCORE_WEIGHTS = list(accumulate((4, 1, 1, 2, 3, 5, 9, 16, 18, 14)))
+GENRE_COUNTS = range(1, 4)
+GENRE_WEIGHTS = list(accumulate((5, 3, 2)))
+ROLES = ('user', 'moderator', 'admin')
+ROLE_WEIGHTS = list(accumulate((989, 10, 1)))
+MAX_THREAD = 500
+WORDS = (
+    'фильм', 'книга', 'песня', 'сюжет', 'герой', 'автор', 'финал', 'сцена',
+    'музыка', 'роль', 'история', 'смысл', 'жанр', 'режиссёр', 'актёр',
+    'отличный', 'скучный', 'добрый', 'тёмный', 'смешной', 'длинный',
+    'новый', 'старый', 'главный', 'лучший', 'странный', 'живой', 'тихий',
+    'очень', 'совсем', 'снова', 'всегда', 'почти', 'вполне', 'слишком',
+    'нравится', 'смотреть', 'читать', 'слушать', 'помнить', 'ждать',
+)
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей', '')
+LAST_NAMES = ('Иванова', 'Петров', 'Смирнова', 'Кузнецов', 'Попова', '')
+
+
+def get_random(seed, *names):
+    return random.Random(':'.join(map(str, (seed, *names))))
+
+
+def format_date(timestamp):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+
+
+def make_text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def zipf_counts(total, size, exponent, cap):
+    """
+    Splits total into size counts proportional to 1 / rank ** exponent,
+    largest first, counts above cap pass the excess down the ranks.
+    """
+    weights = [rank ** -exponent for rank in range(1, size + 1)]
+    norm = math.fsum(weights)
+    counts = array('q', (int(total * weight / norm) for weight in weights))
+    remainder = total - sum(counts)
+    carry = 0
+    for rank in range(size):
+        wanted = counts[rank] + (rank < remainder) + carry
+        counts[rank] = min(cap, wanted)
+        carry = wanted - counts[rank]
+    return counts
+
+
+def scatter(counts, rng):
+    """
+    Reorders counts by the title ids of their ranks, ranks are mapped
+    to ids by a random permutation of the form rank * step + shift.
+    """
+    size = len(counts)
+    step = 1
+    if size > 2:
+        step = rng.randrange(1, size)
+        while math.gcd(step, size) != 1:
+            step = rng.randrange(1, size)
+    shift = rng.randrange(size) if size else 0
+    scattered = array('q', bytes(counts.itemsize * size))
+    for rank, count in enumerate(counts):
+        scattered[(rank * step + shift) % size] = count
+    return scattered
+
+
+def get_thread_weights(mean):
+    """
+    Cumulative weights of comment thread lengths k proportional to
+    (k + 1) ** -exponent, with the exponent fitted to the mean length.
+    """
+    if mean == 0:
+        return [1]
+    if mean >= MAX_THREAD / 2:
+        raise CommandError(
+            f"Cannot generate {mean:.0f} comments per review on average"
+        )
+    low, high = 0.0, 16.0
+    for _ in range(50):
+        exponent = (low + high) / 2
+        weights = [(k + 1) ** -exponent for k in range(MAX_THREAD + 1)]
+        if math.fsum(k * w for k, w in enumerate(weights)) > (
+            mean * math.fsum(weights)
+        ):
+            low = exponent
+        else:
+            high = exponent
+    return list(accumulate(weights))
+
+
+def get_genre_counts(seed, shard, size, genres):
+    rng = get_random(seed, 'genre counts', shard)
+    return [
+        min(count, genres) for count in
+        rng.choices(GENRE_COUNTS, cum_weights=GENRE_WEIGHTS, k=size)
+    ]
+
+
+def get_thread_lengths(seed, shard, size, thread_weights):
+    rng = get_random(seed, 'thread lengths', shard)
+    return rng.choices(
+        range(len(thread_weights)), cum_weights=thread_weights, k=size
+    )
+
+
+def write_shard(options, name, shard, rows):
+    file_name = f'{name}.{shard:04d}.csv'
+    if options['gzip']:
+        file_name += '.gz'
+    written = 0
+    with open_file(os.path.join(options['dir'], file_name),
+                   options['gzip']) as file:
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(HEADERS[name])
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    return name, written
+
+
+def generate_catalogue(options):
+    return [
+        write_shard(options, name, 1, (
+            (number, f'{label} {number}', f'{name}-{number}')
+            for number in range(1, options[size] + 1)
+        ))
+        for name, label, size in (
+            ('category', 'Категория', 'categories'),
+            ('genre', 'Жанр', 'genres'),
+        )
+    ]
+
+
+def generate_users(options, shard, start, end):
+    rng = get_random(options['seed'], 'users', shard)
+    roles = rng.choices(ROLES, cum_weights=ROLE_WEIGHTS, k=end - start)
+    rows = (
+        (
+            user_id, f'user{user_id}', f'user{user_id}@yamdb.fake', role,
+            make_text(rng, 3, 30) if rng.random() < 0.2 else '',
+            rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+        )
+        for user_id, role in zip(range(start + 1, end + 1), roles)
+    )
+    return [write_shard(options, 'users', shard, rows)]
+
+
+def generate_titles(options, shard, start, end, genre_title_id):
+    seed = options['seed']
+    rng = get_random(seed, 'titles', shard)
+    categories = options['categories']
+    titles = (
+        (
+            title_id, make_text(rng, 1, 4).capitalize(),
+            max(FIRST_YEAR, LAST_YEAR - int(rng.expovariate(1 / 15))),
+            rng.randint(1, categories) if categories else '',
+        )
+        for title_id in range(start + 1, end + 1)
+    )
+    genres = range(1, options['genres'] + 1)
+    genre_rng = get_random(seed, 'genre_title', shard)
+    genre_counts = get_genre_counts(seed, shard, end - start, len(genres))
+    genre_titles = (
+        (genre_title_id + number, title_id, genre)
+        for number, (title_id, genre) in enumerate(
+            (title_id, genre)
+            for title_id, count in zip(range(start + 1, end + 1), genre_counts)
+            for genre in genre_rng.sample(genres, count)
+        )
+    )
+    return [
+        write_shard(options, 'titles', shard, titles),
+        write_shard(options, 'genre_title', shard, genre_titles),
+    ]
+
+
+def generate_reviews(options, shard, start, review_counts, review_id,
+                     comment_id, thread_weights):
+    seed = options['seed']
+    rng = get_random(seed, 'review', shard)
+    authors = range(1, options['users'] + 1)
+    dates = array('q')
+
+    def reviews():
+        number = review_id
+        for title_id, count in enumerate(review_counts, start + 1):
+            scores = rng.choices(SCORES, cum_weights=SCORE_WEIGHTS, k=count)
+            for author, score in zip(rng.sample(authors, count), scores):
+                dates.append(rng.randrange(START_DATE, END_DATE))
+                yield (
+                    number, title_id, make_text(rng, 5, 60), author, score,
+                    format_date(dates[-1])
+                )
+                number += 1
+
+    comment_rng = get_random(seed, 'comments', shard)
+
+    def comments():
+        number = comment_id
+        lengths = get_thread_lengths(seed, shard, len(dates), thread_weights)
+        for offset, length in enumerate(lengths):
+            for _ in range(length):
+                yield (
+                    number, review_id + offset, make_text(comment_rng, 3, 30),
+                    comment_rng.choice(authors),
+                    format_date(
+                        dates[offset]
+                        + int(comment_rng.expovariate(1 / 86400))
+                    )
+                )
+                number += 1
+
+    return [
+        write_shard(options, 'review', shard, reviews()),
+        write_shard(options, 'comments', shard, comments()),
+    ]
+
+
+def run(task):
+    return task()
+
+
+class Command(BaseCommand):
+    help = "Generates a synthetic dataset in the static/data layout"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', type=str)
+        parser.add_argument(
+            '--load', action='store_true',
+            help='Load the dataset into the database'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument('--titles', type=int, default=500)
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument(
+            '--comments', type=int, default=5000,
+            help='Expected number of comments'
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.0,
+            help='Exponent of the Zipf law of reviews per title'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Compress the files with gzip'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of processes generating the shards'
+        )
+
+    def handle(self, *args, **kwargs):
+        # Workers get the options they need and nothing unpicklable.
+        options = {name: kwargs[name] for name in (
+            'dir', 'load', 'seed', 'users', 'categories', 'genres',
+            'titles', 'reviews', 'comments', 'zipf', 'gzip', 'workers'
+        )}
+        if options['reviews'] > options['titles'] * options['users']:
+            raise CommandError(
+                "Every user reviews a title once at most, "
+                f"{options['reviews']} reviews need more titles or users"
+            )
+        if options['comments'] and not options['users']:
+            raise CommandError("Comments need users")
+        if not options['dir'] and not options['load']:
+            raise CommandError("Give --dir, --load or both")
+        with ExitStack() as stack:
+            if not options['dir']:
+                options['dir'] = stack.enter_context(
+                    tempfile.TemporaryDirectory()
+                )
+            prepare_directory(options['dir'])
+            self.generate(options)
+            if options['load']:
+                self.load(options)
+
+    def generate(self, options):
+        started = time.monotonic()
+        tasks = self.get_tasks(options)
+        written = dict.fromkeys(HEADERS, 0)
+        for name, rows in generate_catalogue(options):
+            written[name] += rows
+        with get_pool(options['workers']) as pool:
+            for shards in pool.imap_unordered(run, tasks):
+                for name, rows in shards:
+                    written[name] += rows
+        elapsed = time.monotonic() - started
+        total = sum(written.values())
+        self.stdout.write(
+            ', '.join(f"{rows} {name}" for name, rows in written.items())
+        )
+        self.stdout.write(
+            f"Generated {total} rows in {elapsed:.2f}s "
+            f"({total / elapsed if elapsed else 0:.0f} rows/s) "
+            f"to {options['dir']}"
+        )
+
+    @staticmethod
+    def get_tasks(options):
+        """
+        Splits the tables into shards and numbers the rows of each
+        shard after the rows of the shards before it.
+        """
+        seed = options['seed']
+        tasks = [
+            partial(generate_users, options, shard, start,
+                    min(start + CHUNK_ROWS, options['users']))
+            for shard, start in enumerate(
+                range(0, options['users'], CHUNK_ROWS), 1
+            )
+        ]
+        genre_title_id = 1
+        for shard, start in enumerate(
+            range(0, options['titles'], CHUNK_ROWS), 1
+        ):
+            end = min(start + CHUNK_ROWS, options['titles'])
+            tasks.append(partial(
+                generate_titles, options, shard, start, end, genre_title_id
+            ))
+            genre_title_id += sum(get_genre_counts(
+                seed, shard, end - start, options['genres']
+            ))
+
+        review_counts = scatter(
+            zipf_counts(
+                options['reviews'], options['titles'], options['zipf'],
+                options['users']
+            ),
+            get_random(seed, 'ranks')
+        )
+        thread_weights = get_thread_weights(
+            options['comments'] / options['reviews']
+            if options['reviews'] else 0
+        )
+        shard = start = 0
+        review_id = comment_id = 1
+        while start < options['titles']:
+            shard += 1
+            end = start
+            reviews = 0
+            while end < options['titles'] and reviews < CHUNK_ROWS:
+                reviews += review_counts[end]
+                end += 1
+            tasks.append(partial(
+                generate_reviews, options, shard, start,
+                review_counts[start:end], review_id, comment_id,
+                thread_weights
+            ))
+            review_id += reviews
+            comment_id += sum(
+                get_thread_lengths(seed, shard, reviews, thread_weights)
+            )
+            start = end
+        return tasks
+
+    def load(self, options):
+        call_command(
+            'populate_reviews', '--dir', options['dir'],
+            '--workers', str(options['workers']), stdout=self.stdout
+        )
+        call_command('reconcile_ratings', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
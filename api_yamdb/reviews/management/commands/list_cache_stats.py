@@ -0,0 +1,34 @@
+'''
+Command to report the hit ratio of the cached category and genre lists.
+
+Script prints the hits and misses counted since the last reset,
+the --reset option zeroes the counters after printing them.
+
+For script execution in the command line type:
+
+python3 manage.py list_cache_stats [--reset]
+'''
+from django.core.management.base import BaseCommand
+
+from reviews import list_cache
+
+
+class Command(BaseCommand):
+    help = "Reports hits and misses of the cached category and genre lists"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Zero the counters after printing them'
+        )
+
+    def handle(self, *args, **options):
+        for cache in (list_cache.categories, list_cache.genres):
+            stats = cache.get_stats()
+            ratio = '-' if stats['ratio'] is None else f"{stats['ratio']:.1%}"
+            self.stdout.write(
+                f"{cache.name}: {stats['hits']} hits, "
+                f"{stats['misses']} misses, hit ratio {ratio}"
+            )
+            if options['reset']:
+                cache.reset_stats()
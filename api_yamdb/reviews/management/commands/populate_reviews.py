@@ -5,70 +5,665 @@ Script accepts file address, performs a check-up on file name,
 automatically fetches relevant model by its name
 and populates projects database with csv file data.
 
+With --bulk rows are inserted with batched bulk_create in a single
+transaction: foreign keys are assigned by id and checked with one
+query per key and batch, dates given in the file are kept.
+Bulk inserts bypass model signals: cached catalogue, counters and
+version stamps are refreshed by the command, run reconcile_ratings
+and rebuild_search_index after loading titles, reviews or comments.
+
+With --upsert bulk loads write only new and changed rows: every row
+is hashed and compared with the manifest of hashes kept from earlier
+upserts, rows are inserted or updated by id. --delete-missing also
+deletes the rows imported by earlier upserts whose ids are absent
+from the file, rows created outside imports are kept.
+
+With --dir every csv file of the directory is loaded in bulk in one
+transaction, in the order of the foreign keys between their models.
+Files are parsed in a pool of processes that pass row batches to the
+writer through bounded queues, so parsing of the next files overlaps
+with writing and memory stays bounded.
+
+Files may be gzip compressed, --path - reads the file from stdin,
+its model is then given with --model. Files named `.ndjson` hold
+one JSON object per row, keyed by the csv column names, as written
+by dump_reviews. `\\N` stands for NULL in csv files, a value starting
+with a backslash loses its first one. Tables dumped in shards
+(`review.0001.csv`, `review.0002.csv`, ...) are loaded shard after
+shard with --dir.
+
 For script execution in the command line type:
 
-python3 manage.py populate_reviews --path <path_name>
+python3 manage.py populate_reviews --path <path_name> [--bulk]
+python3 manage.py populate_reviews --dir <directory> [--workers <number>]
+python3 manage.py populate_reviews --dir <dir> --upsert [--delete-missing]
 
 * <path_name> should end with csv file name
+* --batch-size sets the number of rows per bulk insert
 '''
 import csv
+import gzip
+import hashlib
+import io
+import json
+import multiprocessing
 import os
 import string
+import sys
+import time
+from contextlib import contextmanager
+from functools import partial
+from itertools import chain, islice
 
 import inflect
 from django.apps import apps
+from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from django.db.models import ForeignKey
 
+from reviews import counters, leaderboards, registry, versions
+from reviews.management.pool import get_pool
+from reviews.models import (Category, Comment, Genre, GenreTitle,
+                            ImportManifest, Review, Title)
+
+BATCH_SIZE = 500
+# Row batches a parser may queue ahead of the writer for each file.
+QUEUE_BATCHES = 4
+GZIP_MAGIC = b'\x1f\x8b'
+FORMATS = ('csv', 'ndjson')
+# Marker of NULL in csv files, values that start with a backslash
+# get one more, so that a text equal to the marker stays a text.
+NULL = '\\N'
+# Version stamps touched by signals on writes, bulk inserts touch them
+# by the model field that holds the id of the changed resource.
+STAMPED_FIELDS = {
+    Title: ('id', (versions.get_title_key,)),
+    GenreTitle: ('title', (versions.get_title_key,)),
+    Review: ('title', (versions.get_reviews_key, versions.get_title_key)),
+    Comment: ('review', (versions.get_comments_key,)),
+}
+
+
+def split_file_name(file_name):
+    """
+    Splits `review.0002.csv.gz` into the model name `review`,
+    the shard number 2 and the format `csv`, absent parts are None.
+    """
+    name = file_name[:-len('.gz')] if file_name.endswith('.gz') else file_name
+    file_format = shard = None
+    base, _, extension = name.rpartition('.')
+    if base and extension in FORMATS:
+        name, file_format = base, extension
+    base, _, number = name.rpartition('.')
+    if base and number.isdigit():
+        name, shard = base, int(number)
+    return name, shard, file_format
+
+
+def escape(value):
+    if value is None:
+        return NULL
+    value = str(value)
+    return '\\' + value if value.startswith('\\') else value
+
+
+def unescape(value):
+    return value[1:] if value.startswith('\\') else value
+
+
+def get_model(file_name):
+    """
+    Returns the model a data file is named after.
+    """
+    model_name, _, _ = split_file_name(file_name)
+    p = inflect.engine()
+    to_singular = p.singular_noun(model_name)
+
+    if not to_singular:
+        model_name = string.capwords(model_name, '_').replace('_', '')
+    else:
+        model_name = string.capwords(to_singular, '_').replace('_', '')
+
+    try:
+        return apps.get_model('reviews', model_name)
+    except LookupError:
+        raise CommandError(f"{model_name} model does not exist")
+
+
+def get_file_fields(Model, header):
+    model_fields = [field.name for field in Model._meta.fields]
+    file_fields = []
+    for name in header:
+        name = name.lower().replace(' ', '_').replace('_id', '')
+        if name not in model_fields:
+            raise CommandError(
+                f"{Model.__name__} model does not have {name} field"
+            )
+        file_fields.append(Model._meta.get_field(name))
+    return file_fields
+
+
+def get_load_order(models):
+    """
+    Orders models so that every model follows the models
+    its foreign keys refer to.
+    """
+    pending = list(models)
+    order = []
+    while pending:
+        ready = [
+            Model for Model in pending
+            if not any(
+                field.related_model in pending
+                and field.related_model is not Model
+                for field in Model._meta.fields
+                if isinstance(field, ForeignKey)
+            )
+        ]
+        if not ready:
+            raise CommandError(
+                "Foreign keys of "
+                f"{', '.join(Model.__name__ for Model in pending)} "
+                "form a cycle"
+            )
+        order += ready
+        pending = [Model for Model in pending if Model not in ready]
+    return order
+
+
+@contextmanager
+def open_csv(path):
+    """
+    Opens a plain or gzip compressed data file, `-` stands for stdin.
+    """
+    stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        source = stream
+        if stream.peek(len(GZIP_MAGIC))[:len(GZIP_MAGIC)] == GZIP_MAGIC:
+            source = gzip.GzipFile(fileobj=stream)
+        file = io.TextIOWrapper(source, encoding='utf-8', newline='')
+        try:
+            yield file
+        finally:
+            # Detaching keeps the wrapper from closing stdin.
+            file.detach()
+    finally:
+        if path != '-':
+            stream.close()
+
+
+def read_rows(file, path):
+    """
+    Returns an iterator over the header and the rows of a csv
+    or an NDJSON file, stdin is read as csv.
+    """
+    if split_file_name(os.path.basename(path))[2] == 'ndjson':
+        return read_ndjson(file, path)
+    return csv.reader(file, delimiter=',')
+
+
+def read_ndjson(file, path):
+    """
+    Yields the keys of the first object as the header, then the
+    values of every object as csv strings, null becomes the NULL marker.
+    """
+    header = None
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise CommandError(f"Invalid JSON in {path}:{number}: {error}")
+        if header is None:
+            header = list(record)
+            yield header
+        yield [escape(record.get(name)) for name in header]
+
+
+queues = {}
+
+
+def set_queues(file_queues):
+    queues.update(file_queues)
+
+
+def parse_file(path, batch_size):
+    """
+    Pool worker: reads the csv file into the bounded queue of the file,
+    the header first, then row batches and None once the file ends.
+    """
+    queue = queues[path]
+    try:
+        with open_csv(path) as file:
+            reader = read_rows(file, path)
+            header = next(reader, None)
+            if header is not None:
+                queue.put(header)
+            while True:
+                batch = list(islice(reader, batch_size))
+                if not batch:
+                    break
+                queue.put(batch)
+    except Exception as error:
+        queue.put(CommandError(f"Cannot read {path}: {error}"))
+    queue.put(None)
+
+
+def iter_queue(queue):
+    while True:
+        item = queue.get()
+        if isinstance(item, Exception):
+            raise item
+        if item is None:
+            return
+        yield item
+
+
+def iter_shards(paths, file_queues):
+    """
+    Yields the header of the first shard of a table, then the row
+    batches of all its shards, which must share the header.
+    """
+    header = None
+    for path in paths:
+        batches = iter_queue(file_queues[path])
+        shard_header = next(batches, None)
+        if shard_header is None:
+            raise CommandError(f"{path} is empty")
+        if header is None:
+            header = shard_header
+            yield header
+        elif shard_header != header:
+            raise CommandError(
+                f"Columns of {path} differ from those of {paths[0]}"
+            )
+        yield from batches
+
+
+@contextmanager
+def keep_file_dates(fields):
+    """
+    Stops auto_now and auto_now_add fields read from the file
+    from overwriting the file values on insert.
+    """
+    date_fields = [
+        (field, field.auto_now, field.auto_now_add) for field in fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in date_fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in date_fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class RowManifest:
+    """
+    Hashes of the rows of one table written by earlier upserts.
+    """
+
+    def __init__(self, Model, fields):
+        pk_indexes = [i for i, field in enumerate(fields) if field.primary_key]
+        if not pk_indexes:
+            raise CommandError(
+                f"Upserting {Model.__name__} rows needs an id column"
+            )
+        self.Model = Model
+        self.table = Model._meta.db_table
+        self.pk_index = pk_indexes[0]
+        self.header_hash = hashlib.blake2b(digest_size=16)
+        self.header_hash.update(
+            '\x1f'.join(field.name for field in fields).encode()
+        )
+        self.seen = set()
+        self.pending = {}
+        self.skipped = 0
+
+    def get_hash(self, row):
+        row_hash = self.header_hash.copy()
+        row_hash.update('\x1f'.join(row).encode())
+        return row_hash.hexdigest()
+
+    def select_changed(self, rows, batch):
+        """
+        Returns the converted rows of the batch that are new or changed
+        since the last upsert and the ids of the batch present in the
+        table. Rows deleted from the table since are written again.
+        """
+        hashes = {
+            values[self.pk_index]: self.get_hash(row)
+            for row, values in zip(rows, batch)
+        }
+        self.seen.update(hashes)
+        stored = dict(
+            ImportManifest.objects.filter(
+                table=self.table, row_id__in=hashes
+            ).values_list('row_id', 'row_hash')
+        )
+        existing = set(
+            self.Model.objects.filter(pk__in=hashes)
+            .values_list('pk', flat=True)
+        )
+        self.pending = {
+            pk: row_hash for pk, row_hash in hashes.items()
+            if pk not in existing or stored.get(pk) != row_hash
+        }
+        self.skipped += len(hashes) - len(self.pending)
+        changed = [
+            values for values in batch if values[self.pk_index] in self.pending
+        ]
+        return changed, existing
+
+    def save(self):
+        ImportManifest.objects.filter(
+            table=self.table, row_id__in=self.pending
+        ).delete()
+        ImportManifest.objects.bulk_create(
+            ImportManifest(table=self.table, row_id=pk, row_hash=row_hash)
+            for pk, row_hash in self.pending.items()
+        )
+
+    def delete_missing(self, batch_size):
+        """
+        Deletes the rows imported by earlier upserts that are absent
+        from the file with their manifest entries, rows written
+        outside imports are kept. Returns the number of deleted rows.
+        """
+        missing = [
+            row_id for row_id in ImportManifest.objects.filter(
+                table=self.table
+            ).values_list('row_id', flat=True).iterator(chunk_size=batch_size)
+            if row_id not in self.seen
+        ]
+        deleted = 0
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            _, rows = self.Model.objects.filter(pk__in=chunk).delete()
+            deleted += rows.get(self.Model._meta.label, 0)
+            ImportManifest.objects.filter(
+                table=self.table, row_id__in=chunk
+            ).delete()
+        return deleted
+
 
 class Command(BaseCommand):
     help = "Populates database with specified model data"
 
     def add_arguments(self, parser):
         parser.add_argument('--path', type=str)
+        parser.add_argument(
+            '--model', type=str, help='Model of the file read from stdin'
+        )
+        parser.add_argument(
+            '--dir', type=str,
+            help='Load every csv file of the directory in bulk'
+        )
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='Insert rows in batches inside one transaction'
+        )
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Write only new and changed rows, inserting or updating by id'
+        )
+        parser.add_argument(
+            '--delete-missing', action='store_true',
+            help='With --upsert delete the rows absent from the file'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of processes parsing the files of a directory'
+        )
 
     def handle(self, *args, **kwargs):
+        if kwargs['delete_missing'] and not kwargs['upsert']:
+            raise CommandError("--delete-missing requires --upsert")
+        options = {
+            'upsert': kwargs['upsert'],
+            'delete_missing': kwargs['delete_missing'],
+        }
+        if kwargs['dir']:
+            self.load_directory(
+                kwargs['dir'], kwargs['batch_size'], kwargs['workers'],
+                **options
+            )
+            return
         path = kwargs['path']
-        model_name, type = os.path.splitext(os.path.basename(path))
-        p = inflect.engine()
-        to_singular = p.singular_noun(model_name)
-
-        if not to_singular:
-            model_name = string.capwords(model_name, '_').replace('_', '')
+        if path == '-':
+            if not kwargs['model']:
+                raise CommandError("--model is required to read stdin")
+            Model = get_model(kwargs['model'])
         else:
-            model_name = string.capwords(to_singular, '_').replace('_', '')
+            Model = get_model(os.path.basename(path))
 
-        try:
-            Model = apps.get_model('reviews', model_name)
-        except LookupError:
-            raise CommandError(f"{model_name} model does not exist")
-
-        model_fields = [field.name for field in Model._meta.fields]
-        file_fields = []
-
-        with open(path, 'rt') as file:
-            reader = csv.reader(file, delimiter=',')
-            file_fields = next(reader)
-
-            for i in range(len(file_fields)):
-                file_fields[i] = file_fields[i].lower()
-                file_fields[i] = file_fields[i].replace(' ', '_')
-                file_fields[i] = file_fields[i].replace('_id', '')
-                if not file_fields[i] in model_fields:
-                    raise CommandError(
-                        f"{Model.__name__} model"
-                        f" does not have {file_fields[i]} field"
-                    )
+        with open_csv(path) as file:
+            reader = read_rows(file, path)
+            fields = get_file_fields(Model, next(reader))
+
+            if kwargs['bulk'] or kwargs['upsert']:
+                self.load_bulk(
+                    Model, fields, reader, kwargs['batch_size'],
+                    'stdin' if path == '-' else os.path.basename(path),
+                    **options
+                )
+                return
 
             for row in reader:
                 obj = Model()
-                for i, field_value in enumerate(row):
-                    model_field = obj._meta.get_field(file_fields[i])
+                for model_field, field_value in zip(fields, row):
                     if isinstance(model_field, ForeignKey):
                         field_value = model_field.related_model.objects.get(
                             pk=int(field_value)
                         )
-                        setattr(obj, file_fields[i], field_value)
+                        setattr(obj, model_field.name, field_value)
                     else:
-                        setattr(obj, file_fields[i], field_value)
+                        setattr(
+                            obj, model_field.name,
+                            self.to_python(model_field, field_value)
+                        )
                 obj.save()
+
+    def load_directory(self, directory, batch_size, workers, **options):
+        files = {}
+        for file_name in sorted(os.listdir(directory)):
+            _, shard, file_format = split_file_name(file_name)
+            if file_format is None:
+                continue
+            Model = get_model(file_name)
+            shards = files.setdefault(Model, {})
+            # A table comes either in one file or in numbered shards.
+            if shards and (shard in shards or None in (shard, *shards)):
+                raise CommandError(
+                    f"{shards.get(shard, next(iter(shards.values())))} "
+                    f"and {file_name} both hold {Model.__name__} rows"
+                )
+            shards[shard] = file_name
+        if not files:
+            raise CommandError(f"No data files found in {directory}")
+        paths = [
+            (Model, [
+                os.path.join(directory, files[Model][shard])
+                for shard in sorted(files[Model])
+            ])
+            for Model in get_load_order(files)
+        ]
+        all_paths = [path for _, shard_paths in paths for path in shard_paths]
+
+        context = multiprocessing.get_context()
+        file_queues = {
+            path: context.Queue(QUEUE_BATCHES) for path in all_paths
+        }
+        # The pool takes the files in load order, the file the writer
+        # waits for is always parsed first and the queues cannot jam.
+        pool = get_pool(
+            min(workers, len(all_paths)),
+            initializer=f'{__name__}.set_queues', initargs=(file_queues,)
+        )
+        started = time.monotonic()
+        try:
+            for path in all_paths:
+                pool.apply_async(parse_file, (path, batch_size))
+            pool.close()
+            with transaction.atomic():
+                loaded = 0
+                for Model, shard_paths in paths:
+                    batches = iter_shards(shard_paths, file_queues)
+                    header = next(batches)
+                    source = os.path.basename(shard_paths[0])
+                    if len(shard_paths) > 1:
+                        source += f" and {len(shard_paths) - 1} more shards"
+                    loaded += self.load_bulk(
+                        Model, get_file_fields(Model, header),
+                        chain.from_iterable(batches), batch_size,
+                        source, **options
+                    )
+        finally:
+            pool.terminate()
+            pool.join()
+        self.stdout.write(
+            f"Loaded {loaded} rows from {len(all_paths)} files "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+
+    def load_bulk(self, Model, fields, rows, batch_size, source,
+                  upsert=False, delete_missing=False):
+        foreign_keys = [
+            (i, field) for i, field in enumerate(fields)
+            if isinstance(field, ForeignKey)
+        ]
+        stamped_field, key_getters = STAMPED_FIELDS.get(Model, (None, ()))
+        stamped = [
+            i for i, field in enumerate(fields) if field.name == stamped_field
+        ]
+        manifest = RowManifest(Model, fields) if upsert else None
+        stamp_keys = set()
+        created = updated = deleted = 0
+        started = time.monotonic()
+        with transaction.atomic(), keep_file_dates(fields):
+            while True:
+                rows_batch = list(islice(rows, batch_size))
+                if not rows_batch:
+                    break
+                batch = [
+                    [self.to_python(field, value)
+                     for field, value in zip(fields, row)]
+                    for row in rows_batch
+                ]
+                existing = set()
+                if manifest is not None:
+                    batch, existing = manifest.select_changed(
+                        rows_batch, batch
+                    )
+                for i, field in foreign_keys:
+                    self.check_references(field, {row[i] for row in batch})
+                objs = [
+                    Model(**{
+                        field.attname: value
+                        for field, value in zip(fields, row)
+                    })
+                    for row in batch
+                ]
+                new_objs = [obj for obj in objs if obj.pk not in existing]
+                changed_objs = [obj for obj in objs if obj.pk in existing]
+                # Backends cap the rows of one INSERT, Django 2.2 does not
+                # apply the cap to an explicit batch size.
+                Model.objects.bulk_create(new_objs, batch_size=min(
+                    batch_size, connection.ops.bulk_batch_size(
+                        Model._meta.concrete_fields, new_objs
+                    )
+                ))
+                if changed_objs:
+                    Model.objects.bulk_update(
+                        changed_objs,
+                        [field.name for field in fields
+                         if not field.primary_key],
+                        batch_size=batch_size
+                    )
+                if manifest is not None:
+                    manifest.save()
+                for i in stamped:
+                    stamp_keys.update(
+                        get_key(row[i]) for row in batch
+                        for get_key in key_getters
+                    )
+                created += len(new_objs)
+                updated += len(changed_objs)
+            if delete_missing:
+                deleted = manifest.delete_missing(batch_size)
+        transaction.on_commit(
+            partial(self.refresh_caches, Model, created, stamp_keys)
+        )
+        elapsed = time.monotonic() - started
+        loaded = created + updated
+        rate = f"{loaded / elapsed if elapsed else 0:.0f} rows/s"
+        if manifest is None:
+            self.stdout.write(
+                f"Loaded {loaded} {Model.__name__} rows in {elapsed:.2f}s "
+                f"({rate}) from {source}"
+            )
+        else:
+            self.stdout.write(
+                f"Upserted {Model.__name__} rows from {source}: "
+                f"{created} created, {updated} updated, "
+                f"{manifest.skipped} unchanged, {deleted} deleted "
+                f"in {elapsed:.2f}s ({rate})"
+            )
+        return loaded
+
+    @staticmethod
+    def refresh_caches(Model, loaded, stamp_keys):
+        """
+        Updates the cached state that model signals keep in sync
+        on single writes, ratings and the search index are left
+        to reconcile_ratings and rebuild_search_index.
+        """
+        if Model is Category:
+            registry.categories.invalidate()
+            stamp_keys.add(versions.CATALOGUE_KEY)
+        elif Model is Genre:
+            registry.genres.invalidate()
+            stamp_keys.add(versions.CATALOGUE_KEY)
+        elif Model in (Title, GenreTitle):
+            leaderboards.invalidate_boards()
+        if Model is Title:
+            counters.shift_titles_count(loaded)
+        if stamp_keys:
+            versions.touch(*stamp_keys)
+
+    @staticmethod
+    def to_python(field, value):
+        if value == NULL:
+            return None
+        if value == '' and not field.empty_strings_allowed:
+            return None
+        value = unescape(value)
+        try:
+            return field.to_python(value)
+        except ValidationError as error:
+            raise CommandError(
+                f"Invalid {field.name} value {value!r}: {error.messages[0]}"
+            )
+
+    @staticmethod
+    def check_references(field, ids):
+        """
+        Checks the ids referenced by one foreign key of a batch
+        with a single query, missing rows abort the whole load.
+        """
+        ids.discard(None)
+        found = set(
+            field.related_model.objects.filter(pk__in=ids)
+            .values_list('pk', flat=True)
+        )
+        missing = sorted(ids - found)
+        if missing:
+            raise CommandError(
+                f"{field.related_model.__name__} rows referenced by "
+                f"{field.name} do not exist: {missing[:10]}"
+            )
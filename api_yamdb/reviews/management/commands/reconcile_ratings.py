@@ -0,0 +1,256 @@
+'''
+Command to reconcile stored title rating aggregates with reviews.
+
+Script walks titles in primary key chunks, aggregates the chunk reviews
+into score histograms with a single GROUP BY query per chunk,
+repairs drifted rating counters and title statistics
+and reports orphaned GenreTitle and Comment rows.
+
+For script execution in the command line type:
+
+python3 manage.py reconcile_ratings [--dry-run] [--since <date>]
+
+* --since limits the check to titles reviewed since the date
+'''
+import math
+import time
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from reviews import leaderboards, versions
+from reviews.models import (Comment, Genre, GenreTitle, Review, Title,
+                            TitleStatistics)
+
+RATING_FIELDS = ('rating_sum', 'rating_count', 'rating', 'weighted_rating')
+STATISTICS_FIELDS = tuple(
+    f'score_{score}' for score in TitleStatistics.SCORES
+) + ('last_review_date',)
+
+
+def parse_since(value):
+    since = parse_datetime(value)
+    if since is None:
+        date = parse_date(value)
+        if date is None:
+            raise CommandError(f"Invalid --since value: {value}")
+        since = datetime.combine(date, datetime.min.time())
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+class Command(BaseCommand):
+    help = "Reconciles stored title rating aggregates with reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report drift without repairing it"
+        )
+        parser.add_argument(
+            '--since', type=str,
+            help="Check only titles reviewed since the date"
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+        if kwargs['since']:
+            chunks = self.get_reviewed_chunks(
+                parse_since(kwargs['since']), kwargs['chunk_size']
+            )
+        else:
+            chunks = self.get_chunks(kwargs['chunk_size'])
+
+        checked = drifted = 0
+        for chunk in chunks:
+            checked += len(chunk)
+            drifted += self.reconcile_chunk(chunk, kwargs['dry_run'])
+
+        if drifted and not kwargs['dry_run']:
+            leaderboards.invalidate_boards()
+        action = 'found' if kwargs['dry_run'] else 'repaired'
+        self.stdout.write(
+            f"Checked {checked} titles, {action} drift in {drifted} "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        self.report_orphans()
+
+    @staticmethod
+    def get_chunks(chunk_size):
+        titles = Title.objects.order_by('pk').values_list(
+            'pk', *RATING_FIELDS
+        )
+        last_pk = 0
+        while True:
+            chunk = list(titles.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1][0]
+            yield chunk
+
+    @staticmethod
+    def get_reviewed_chunks(since, chunk_size):
+        """
+        Yields the titles reviewed since the date in chunks, the reviews
+        are scanned once for the title ids.
+        """
+        title_ids = sorted(
+            Review.objects.filter(pub_date__gte=since).order_by()
+            .values_list('title_id', flat=True).distinct()
+        )
+        titles = Title.objects.order_by('pk').values_list(
+            'pk', *RATING_FIELDS
+        )
+        for start in range(0, len(title_ids), chunk_size):
+            yield list(
+                titles.filter(pk__in=title_ids[start:start + chunk_size])
+            )
+
+    @staticmethod
+    def aggregate_reviews(title_ids):
+        """
+        Returns the score histograms and last review dates of the titles,
+        one row per title, so that each date is parsed once.
+        """
+        histograms = {
+            pk: dict.fromkeys(TitleStatistics.SCORES, 0) for pk in title_ids
+        }
+        last_review_dates = dict.fromkeys(title_ids)
+        totals = (
+            Review.objects.filter(title_id__in=title_ids).order_by()
+            .values('title_id')
+            .annotate(last=Max('pub_date'), **{
+                f'score_{score}': Count('id', filter=Q(score=score))
+                for score in TitleStatistics.SCORES
+            })
+        )
+        for total in totals:
+            histograms[total['title_id']] = {
+                score: total[f'score_{score}']
+                for score in TitleStatistics.SCORES
+            }
+            last_review_dates[total['title_id']] = total['last']
+        return histograms, last_review_dates
+
+    @staticmethod
+    def expected_rating(histogram):
+        rating_count = sum(histogram.values())
+        rating_sum = sum(score * count for score, count in histogram.items())
+        prior_votes = settings.RATING_PRIOR_VOTES
+        return {
+            'rating_sum': rating_sum,
+            'rating_count': rating_count,
+            'rating': rating_sum / rating_count if rating_count else None,
+            'weighted_rating': (
+                (rating_sum + prior_votes * settings.RATING_PRIOR_MEAN)
+                / (rating_count + prior_votes)
+            ),
+        }
+
+    def reconcile_chunk(self, chunk, dry_run):
+        """
+        Compares the stored values of the chunk (rows of the title pk and
+        RATING_FIELDS) with the reviews, model instances are built only
+        for the rows to repair.
+        """
+        titles = {
+            pk: dict(zip(RATING_FIELDS, values)) for pk, *values in chunk
+        }
+        histograms, last_review_dates = self.aggregate_reviews(titles)
+        statistics = {
+            title_id: (pk, dict(zip(STATISTICS_FIELDS, values)))
+            for pk, title_id, *values in
+            TitleStatistics.objects.filter(title_id__in=titles)
+            .values_list('pk', 'title_id', *STATISTICS_FIELDS)
+        }
+
+        drifted_titles = []
+        drifted_statistics = []
+        missing_statistics = []
+        for pk, stored in titles.items():
+            expected = self.expected_rating(histograms[pk])
+            if any(
+                not self.is_same(stored[field], value)
+                for field, value in expected.items()
+            ):
+                drifted_titles.append(Title(pk=pk, **expected))
+
+            expected = {
+                f'score_{score}': count
+                for score, count in histograms[pk].items()
+            }
+            expected['last_review_date'] = last_review_dates[pk]
+            if pk not in statistics:
+                missing_statistics.append(
+                    TitleStatistics(title_id=pk, **expected)
+                )
+                continue
+            statistics_pk, stored = statistics[pk]
+            if stored != expected:
+                drifted_statistics.append(TitleStatistics(
+                    pk=statistics_pk, title_id=pk, **expected
+                ))
+
+        for title in drifted_titles:
+            self.stdout.write(f"Drift in title {title.pk} rating counters")
+        for title_statistics in drifted_statistics + missing_statistics:
+            self.stdout.write(
+                f"Drift in title {title_statistics.title_id} statistics"
+            )
+        if not dry_run:
+            with transaction.atomic():
+                Title.objects.bulk_update(drifted_titles, RATING_FIELDS)
+                TitleStatistics.objects.bulk_update(
+                    drifted_statistics, STATISTICS_FIELDS
+                )
+                TitleStatistics.objects.bulk_create(missing_statistics)
+                transaction.on_commit(partial(versions.touch, *(
+                    versions.get_title_key(title.pk)
+                    for title in drifted_titles
+                )))
+        return len(
+            {title.pk for title in drifted_titles}
+            | {item.title_id for item in drifted_statistics}
+            | {item.title_id for item in missing_statistics}
+        )
+
+    @staticmethod
+    def is_same(stored, expected):
+        if stored is None or expected is None:
+            return stored is expected
+        return math.isclose(stored, expected)
+
+    def report_orphans(self):
+        orphans = {
+            'GenreTitle': GenreTitle.objects.annotate(
+                has_title=Exists(
+                    Title.objects.filter(pk=OuterRef('title_id'))
+                ),
+                has_genre=Exists(
+                    Genre.objects.filter(pk=OuterRef('genre_id'))
+                ),
+            ).exclude(has_title=True, has_genre=True),
+            'Comment': Comment.objects.annotate(
+                has_review=Exists(
+                    Review.objects.filter(pk=OuterRef('review_id'))
+                ),
+            ).filter(has_review=False),
+        }
+        for model_name, rows in orphans.items():
+            count = rows.count()
+            if count:
+                orphan_ids = rows.order_by('pk').values_list('pk', flat=True)
+                self.stdout.write(self.style.WARNING(
+                    f"Found {count} orphaned {model_name} rows: "
+                    f"{', '.join(map(str, orphan_ids[:20]))}"
+                ))
+            else:
+                self.stdout.write(f"No orphaned {model_name} rows")
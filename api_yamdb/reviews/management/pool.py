@@ -0,0 +1,31 @@
+"""
+Process pools of the management commands.
+
+Workers started with spawn or forkserver import the worker functions in
+a fresh interpreter, where Django is not set up yet and importing the
+command modules fails with AppRegistryNotReady. The pool initializer
+is given by its dotted path, so that the workers set Django up before
+they import it or any task function.
+"""
+import multiprocessing
+from importlib import import_module
+
+import django
+
+
+def setup_worker(initializer, initargs):
+    django.setup()
+    if initializer is not None:
+        module_name, name = initializer.rsplit('.', 1)
+        getattr(import_module(module_name), name)(*initargs)
+
+
+def get_pool(processes, initializer=None, initargs=()):
+    """
+    Returns a pool of the default start method, its workers run
+    `initializer`, the dotted path of a function, with `initargs`.
+    """
+    return multiprocessing.get_context().Pool(
+        processes, initializer=setup_worker,
+        initargs=(initializer, initargs)
+    )
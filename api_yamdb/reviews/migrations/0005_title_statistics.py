@@ -0,0 +1,61 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:33
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def fill_title_statistics(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    TitleStatistics = apps.get_model('reviews', 'TitleStatistics')
+    statistics = {
+        title_id: TitleStatistics(title_id=title_id)
+        for title_id in Title.objects.values_list('pk', flat=True)
+    }
+    totals = (
+        Review.objects.order_by().values('title_id', 'score')
+        .annotate(count=Count('id'), last=Max('pub_date'))
+    )
+    for total in totals.iterator():
+        title_statistics = statistics[total['title_id']]
+        setattr(title_statistics, f'score_{total["score"]}', total['count'])
+        if (
+            title_statistics.last_review_date is None
+            or total['last'] > title_statistics.last_review_date
+        ):
+            title_statistics.last_review_date = total['last']
+    TitleStatistics.objects.bulk_create(statistics.values(), batch_size=500)
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_title_rating_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_1', models.PositiveIntegerField(default=0, verbose_name='Оценок «1»')),
+                ('score_2', models.PositiveIntegerField(default=0, verbose_name='Оценок «2»')),
+                ('score_3', models.PositiveIntegerField(default=0, verbose_name='Оценок «3»')),
+                ('score_4', models.PositiveIntegerField(default=0, verbose_name='Оценок «4»')),
+                ('score_5', models.PositiveIntegerField(default=0, verbose_name='Оценок «5»')),
+                ('score_6', models.PositiveIntegerField(default=0, verbose_name='Оценок «6»')),
+                ('score_7', models.PositiveIntegerField(default=0, verbose_name='Оценок «7»')),
+                ('score_8', models.PositiveIntegerField(default=0, verbose_name='Оценок «8»')),
+                ('score_9', models.PositiveIntegerField(default=0, verbose_name='Оценок «9»')),
+                ('score_10', models.PositiveIntegerField(default=0, verbose_name='Оценок «10»')),
+                ('last_review_date', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего отзыва')),
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='reviews.Title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Title statistics',
+                'verbose_name_plural': 'Title statistics',
+            },
+        ),
+        migrations.RunPython(fill_title_statistics, migrations.RunPython.noop),
+    ]
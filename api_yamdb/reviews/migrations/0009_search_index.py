@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                """CREATE VIRTUAL TABLE reviews_search USING fts5(
+                    title_id UNINDEXED, review_id UNINDEXED, name, body,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )""",
+                """INSERT INTO reviews_search (rowid, title_id, review_id, name, body)
+                    SELECT id * 3, id, NULL, name, COALESCE(description, '')
+                    FROM reviews_title""",
+                """INSERT INTO reviews_search (rowid, title_id, review_id, name, body)
+                    SELECT id * 3 + 1, title_id, NULL, '', text
+                    FROM reviews_review""",
+                """INSERT INTO reviews_search (rowid, title_id, review_id, name, body)
+                    SELECT comment.id * 3 + 2, review.title_id, comment.review_id, '', comment.text
+                    FROM reviews_comment AS comment
+                    JOIN reviews_review AS review ON review.id = comment.review_id""",
+            ],
+            reverse_sql='DROP TABLE reviews_search',
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:07
+
+from django.db import migrations, models
+import reviews.models
+from reviews.models import casefold_key
+
+SORT_KEYS = (
+    ('Category', 'name_key', 'name'),
+    ('Genre', 'name_key', 'name'),
+    ('Title', 'name_key', 'name'),
+    ('User', 'username_key', 'username'),
+)
+
+
+def fill_sort_keys(apps, schema_editor):
+    for model_name, key_field, source_field in SORT_KEYS:
+        model = apps.get_model('reviews', model_name)
+        max_length = model._meta.get_field(key_field).max_length
+        objs = list(model.objects.only('pk', source_field))
+        for obj in objs:
+            key = casefold_key(getattr(obj, source_field))[:max_length]
+            setattr(obj, key_field, key)
+        model.objects.bulk_update(objs, [key_field], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', reviews.models.SortKeyUserManager()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='title',
+            name='title_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='title',
+            name='title_year_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='title',
+            name='title_category_name_idx',
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256, verbose_name='Ключ названия категории'),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256, verbose_name='Ключ названия жанра'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=100, verbose_name='Ключ названия произведения'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='username_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=150, verbose_name='Ключ имени пользователя'),
+        ),
+        migrations.RunPython(fill_sort_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name_key', 'id'], name='title_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', 'name_key', 'id'], name='title_year_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'name_key', 'id'], name='title_category_name_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_casefold_sort_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportManifest',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=64, verbose_name='Таблица')),
+                ('row_id', models.PositiveIntegerField(verbose_name='Идентификатор строки')),
+                ('row_hash', models.CharField(max_length=32, verbose_name='Хэш строки')),
+            ],
+            options={
+                'verbose_name': 'Import manifest',
+                'verbose_name_plural': 'Import manifest',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importmanifest',
+            constraint=models.UniqueConstraint(fields=('table', 'row_id'), name='unique import manifest row'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_import_manifest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Ресурс')),
+                ('stamp', models.BigIntegerField(verbose_name='Метка версии')),
+            ],
+            options={
+                'verbose_name': 'Resource version',
+                'verbose_name_plural': 'Resource versions',
+            },
+        ),
+    ]
@@ -1,8 +1,77 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+import math
+import unicodedata
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.db import models, transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Max
+from django.db.models.functions import Cast, NullIf
+
+
+def casefold_key(value):
+    """
+    Case-insensitive search and sort key of a name,
+    Cyrillic letters are folded too and ё is treated as е.
+    """
+    return unicodedata.normalize('NFKC', value or '').casefold().replace(
+        'ё', 'е'
+    )
+
+
+class SortKeyQuerySet(models.QuerySet):
+
+    def fill_sort_keys(self, objs):
+        # Historical models of migrations come without the mixin.
+        objs = list(objs)
+        if issubclass(self.model, SortKeyMixin):
+            for obj in objs:
+                obj.fill_sort_keys()
+        return objs
+
+    def bulk_create(self, objs, *args, **kwargs):
+        return super().bulk_create(self.fill_sort_keys(objs), *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        sort_keys = getattr(self.model, 'SORT_KEYS', {})
+        fields = list(fields) + [
+            key_field for key_field, source_field in sort_keys.items()
+            if source_field in fields and key_field not in fields
+        ]
+        return super().bulk_update(
+            self.fill_sort_keys(objs), fields, *args, **kwargs
+        )
+
+
+class SortKeyMixin:
+    """
+    Fills the casefolded `SORT_KEYS` fields from their source fields
+    on save, so that lookups and ordering can use the key indexes.
+    """
+    SORT_KEYS = {}
+
+    def fill_sort_keys(self):
+        for key_field, source_field in self.SORT_KEYS.items():
+            max_length = self._meta.get_field(key_field).max_length
+            key = casefold_key(getattr(self, source_field))[:max_length]
+            setattr(self, key_field, key)
+
+    def save(self, *args, **kwargs):
+        self.fill_sort_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                key_field
+                for key_field, source_field in self.SORT_KEYS.items()
+                if source_field in update_fields
+            }
+        super().save(*args, **kwargs)
+
+
+class SortKeyUserManager(UserManager.from_queryset(SortKeyQuerySet)):
+    pass
 
 
-class User(AbstractUser):
+class User(SortKeyMixin, AbstractUser):
 
     USER = 'user'
     MODERATOR = 'moderator'
@@ -34,6 +103,14 @@ class User(AbstractUser):
     role = models.CharField(
         max_length=50, choices=USERS_ROLES, default=USER, verbose_name='Роль'
     )
+    username_key = models.CharField(
+        max_length=150, editable=False, db_index=True, default='',
+        verbose_name='Ключ имени пользователя',
+    )
+
+    SORT_KEYS = {'username_key': 'username'}
+
+    objects = SortKeyUserManager()
 
     class Meta:
         verbose_name = 'User'
@@ -55,13 +132,21 @@ class User(AbstractUser):
         return self.role == self.ADMIN or self.is_superuser
 
 
-class Category(models.Model):
+class Category(SortKeyMixin, models.Model):
     name = models.CharField(
         max_length=256, verbose_name='Название категории'
     )
     slug = models.SlugField(
         max_length=50, unique=True, verbose_name='Слаг категории'
     )
+    name_key = models.CharField(
+        max_length=256, editable=False, db_index=True, default='',
+        verbose_name='Ключ названия категории'
+    )
+
+    SORT_KEYS = {'name_key': 'name'}
+
+    objects = SortKeyQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Category'
@@ -71,13 +156,21 @@ class Category(models.Model):
         return self.name
 
 
-class Genre(models.Model):
+class Genre(SortKeyMixin, models.Model):
     name = models.CharField(
         max_length=256, verbose_name='Название жанра'
     )
     slug = models.SlugField(
         max_length=50, unique=True, verbose_name='Слаг жанра'
     )
+    name_key = models.CharField(
+        max_length=256, editable=False, db_index=True, default='',
+        verbose_name='Ключ названия жанра'
+    )
+
+    SORT_KEYS = {'name_key': 'name'}
+
+    objects = SortKeyQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Genre',
@@ -87,10 +180,64 @@ class Genre(models.Model):
         return self.name
 
 
-class Title(models.Model):
+def prior_rating():
+    return settings.RATING_PRIOR_MEAN
+
+
+def weighted_rating(rating_sum, rating_count):
+    """
+    Bayesian average: the title mean shrunk towards the prior mean,
+    as if every title had RATING_PRIOR_VOTES extra prior-mean scores.
+    """
+    prior_votes = settings.RATING_PRIOR_VOTES
+    return ExpressionWrapper(
+        (
+            Cast(rating_sum, FloatField())
+            + prior_votes * settings.RATING_PRIOR_MEAN
+        ) / (rating_count + prior_votes),
+        output_field=FloatField()
+    )
+
+
+class TitleQuerySet(SortKeyQuerySet):
+
+    def shift_rating(self, score_delta, count_delta):
+        """
+        Atomically shifts stored rating counters by the given deltas
+        and recalculates the derived ratings in the same UPDATE statement.
+        """
+        rating_sum = F('rating_sum') + score_delta
+        rating_count = F('rating_count') + count_delta
+        return self.update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=ExpressionWrapper(
+                Cast(rating_sum, FloatField()) / NullIf(rating_count, 0),
+                output_field=FloatField()
+            ),
+            weighted_rating=weighted_rating(rating_sum, rating_count),
+        )
+
+    def refresh_weighted_rating(self):
+        return self.update(
+            weighted_rating=weighted_rating(
+                F('rating_sum'), F('rating_count')
+            )
+        )
+
+
+class Title(SortKeyMixin, models.Model):
+    RATING_FIELDS = (
+        'rating_sum', 'rating_count', 'rating', 'weighted_rating'
+    )
+
     name = models.CharField(
         max_length=100, verbose_name='Название произведения'
     )
+    name_key = models.CharField(
+        max_length=100, editable=False, default='',
+        verbose_name='Ключ названия произведения'
+    )
     year = models.IntegerField(
         verbose_name='Год публикации'
     )
@@ -107,14 +254,62 @@ class Title(models.Model):
         Genre, through='GenreTitle',
         verbose_name='Жанр'
     )
+    rating_sum = models.PositiveIntegerField(
+        default=0, verbose_name='Сумма оценок'
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество оценок'
+    )
+    rating = models.FloatField(
+        null=True, blank=True, verbose_name='Рейтинг'
+    )
+    weighted_rating = models.FloatField(
+        default=prior_rating, verbose_name='Взвешенный рейтинг'
+    )
+
+    SORT_KEYS = {'name_key': 'name'}
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Title',
         verbose_name_plural = 'Titles'
+        indexes = [
+            models.Index(
+                fields=['-weighted_rating'], name='title_top_idx'
+            ),
+            models.Index(
+                fields=['category', '-weighted_rating'],
+                name='title_category_top_idx'
+            ),
+            models.Index(fields=['name_key', 'id'], name='title_name_idx'),
+            models.Index(
+                fields=['year', 'name_key', 'id'], name='title_year_name_idx'
+            ),
+            models.Index(
+                fields=['category', 'name_key', 'id'],
+                name='title_category_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def genre_ids(self):
+        return [item.genre_id for item in self.genres.all()]
+
+    def save(self, *args, **kwargs):
+        # Rating counters are maintained by review writes only,
+        # so editing a title must not overwrite them with stale values.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.RATING_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class GenreTitle(models.Model):
     title = models.ForeignKey(
@@ -135,6 +330,11 @@ class GenreTitle(models.Model):
                 name='unique title-genre constraint',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['genre', 'title'], name='genretitle_genre_title_idx'
+            ),
+        ]
 
 
 class Review(models.Model):
@@ -166,10 +366,162 @@ class Review(models.Model):
                 fields=['author', 'title'],
                 name='unique author-review constaint')
         ]
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:50]
 
+    def save(self, *args, **kwargs):
+        # Keeps the review row and title rating counters consistent,
+        # counters are updated by signal receivers within this transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class TitleStatisticsQuerySet(models.QuerySet):
+
+    def shift_histogram(self, score_deltas, **fields):
+        """
+        Atomically shifts score histogram buckets by the given deltas,
+        other summary fields are updated in the same statement.
+        """
+        return self.update(**fields, **{
+            f'score_{score}': F(f'score_{score}') + delta
+            for score, delta in score_deltas.items() if delta
+        })
+
+    def rebuild(self, title_id):
+        """
+        Recalculates the title summary from its reviews.
+        """
+        histogram = dict.fromkeys(TitleStatistics.SCORES, 0)
+        totals = (
+            Review.objects.filter(title_id=title_id).order_by()
+            .values('score').annotate(count=Count('id'), last=Max('pub_date'))
+        )
+        last_review_date = None
+        for total in totals:
+            histogram[total['score']] = total['count']
+            if last_review_date is None or total['last'] > last_review_date:
+                last_review_date = total['last']
+        statistics, _ = self.update_or_create(
+            title_id=title_id,
+            defaults={
+                'last_review_date': last_review_date,
+                **{
+                    f'score_{score}': count
+                    for score, count in histogram.items()
+                },
+            }
+        )
+        return statistics
+
+
+class TitleStatistics(models.Model):
+    """
+    Precomputed per-title summary of review scores.
+    """
+    SCORES = range(1, 11)
+
+    title = models.OneToOneField(
+        Title, on_delete=models.CASCADE,
+        related_name='statistics',
+        verbose_name='Произведение'
+    )
+    score_1 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок «1»'
+    )
+    score_2 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок «2»'
+    )
+    score_3 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок «3»'
+    )
+    score_4 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок «4»'
+    )
+    score_5 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок «5»'
+    )
+    score_6 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок «6»'
+    )
+    score_7 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок «7»'
+    )
+    score_8 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок «8»'
+    )
+    score_9 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок «9»'
+    )
+    score_10 = models.PositiveIntegerField(
+        default=0, verbose_name='Оценок «10»'
+    )
+    last_review_date = models.DateTimeField(
+        null=True, blank=True, verbose_name='Дата последнего отзыва'
+    )
+
+    objects = TitleStatisticsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Title statistics'
+        verbose_name_plural = verbose_name
+
+    @property
+    def histogram(self):
+        return {
+            score: getattr(self, f'score_{score}') for score in self.SCORES
+        }
+
+    @property
+    def review_count(self):
+        return sum(self.histogram.values())
+
+    @property
+    def mean(self):
+        count = self.review_count
+        if not count:
+            return None
+        return sum(
+            score * number for score, number in self.histogram.items()
+        ) / count
+
+    def score_at(self, position):
+        """
+        Returns the score at the given position of sorted review scores.
+        """
+        seen = 0
+        for score, number in self.histogram.items():
+            seen += number
+            if position < seen:
+                return score
+        return None
+
+    @property
+    def median(self):
+        count = self.review_count
+        if not count:
+            return None
+        return (
+            self.score_at((count - 1) // 2) + self.score_at(count // 2)
+        ) / 2
+
+    @property
+    def std_deviation(self):
+        mean = self.mean
+        if mean is None:
+            return None
+        return math.sqrt(sum(
+            number * (score - mean) ** 2
+            for score, number in self.histogram.items()
+        ) / self.review_count)
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -192,6 +544,47 @@ class Comment(models.Model):
         verbose_name = 'Comment'
         verbose_name_plural = 'Сomments'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
+
+
+class ImportManifest(models.Model):
+    """
+    Hashes of the csv rows written by populate_reviews --upsert,
+    a row whose hash is unchanged is skipped on the next import.
+    """
+    table = models.CharField(max_length=64, verbose_name='Таблица')
+    row_id = models.PositiveIntegerField(verbose_name='Идентификатор строки')
+    row_hash = models.CharField(max_length=32, verbose_name='Хэш строки')
+
+    class Meta:
+        verbose_name = 'Import manifest'
+        verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(
+                fields=['table', 'row_id'],
+                name='unique import manifest row',
+            ),
+        ]
+
+
+class ResourceVersion(models.Model):
+    """
+    Version stamps of API resources, the time in microseconds
+    of the last committed write that changed the resource.
+    """
+    key = models.CharField(
+        max_length=64, primary_key=True, verbose_name='Ресурс'
+    )
+    stamp = models.BigIntegerField(verbose_name='Метка версии')
+
+    class Meta:
+        verbose_name = 'Resource version'
+        verbose_name_plural = 'Resource versions'
@@ -0,0 +1,99 @@
+"""
+In-process registry of categories and genres.
+
+Both tables are tiny and read by almost every title request, so each
+process keeps them in memory indexed by id and slug. Writes drop
+a version token in the cache, a process reloads the table the next
+time it sees a token other than the one it has loaded. Tokens expire
+after VERSION_TIMEOUT, which bounds how long a process whose cache
+did not see the write keeps stale rows, and a row missing from the
+registry is looked up in the database before it is reported missing.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Category, Genre
+
+
+class Registry:
+
+    def __init__(self, model):
+        self.model = model
+        self.version_key = f'registry:{model._meta.label_lower}:version'
+        self.version = None
+        self.by_id = {}
+        self.by_slug = {}
+        self.representations = {}
+
+    def __deepcopy__(self, memo):
+        # Serializer fields are deep copied per serializer instance,
+        # they all have to share the one registry of the process.
+        return self
+
+    def invalidate(self):
+        cache.delete(self.version_key)
+
+    def load(self):
+        version = cache.get_or_set(
+            self.version_key, lambda: uuid4().hex, settings.VERSION_TIMEOUT
+        )
+        if version != self.version:
+            # The token is read before the rows, so a write committed
+            # meanwhile leaves a newer token and triggers another reload.
+            objects = list(self.model.objects.all())
+            self.by_id = {obj.pk: obj for obj in objects}
+            self.by_slug = {obj.slug: obj for obj in objects}
+            self.representations = {}
+            self.version = version
+        return self
+
+    def find(self, index, **lookup):
+        """
+        Looks up a row missing from the loaded registry in the database,
+        a row written since the load makes the registry reload.
+        """
+        if not self.model.objects.filter(**lookup).exists():
+            return None
+        self.version = None
+        return getattr(self.load(), index).get(*lookup.values())
+
+    def get(self, pk):
+        obj = self.load().by_id.get(pk)
+        if obj is None and pk is not None:
+            obj = self.find('by_id', pk=pk)
+        return obj
+
+    def get_by_slug(self, slug):
+        obj = self.load().by_slug.get(slug)
+        if obj is None:
+            obj = self.find('by_slug', slug=slug)
+        return obj
+
+    def search(self, value):
+        """
+        Returns ids of rows whose slug contains the value, ignoring case.
+        """
+        value = value.lower()
+        return [
+            obj.pk for slug, obj in self.load().by_slug.items()
+            if value in slug.lower()
+        ]
+
+    def represent(self, pk, serializer_class):
+        """
+        Returns the serialized row, each row is serialized once per load.
+        """
+        self.load()
+        key = (serializer_class, pk)
+        if key not in self.representations:
+            obj = self.get(pk)
+            self.representations[key] = (
+                None if obj is None else serializer_class(obj).data
+            )
+        return self.representations[key]
+
+
+categories = Registry(Category)
+genres = Registry(Genre)
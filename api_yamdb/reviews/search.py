@@ -0,0 +1,191 @@
+"""
+Full-text search index over titles, reviews and comments.
+
+Rows live in the SQLite FTS5 table reviews_search. The rowid packs
+the object kind and primary key, so a write replaces its row by key.
+Signal receivers keep the index in sync with model writes, bulk loads
+are indexed with the rebuild_search_index command.
+"""
+import html
+import re
+from collections import namedtuple
+
+from django.db import connection
+
+TABLE = 'reviews_search'
+KINDS = ('title', 'review', 'comment')
+# bm25 weights of the title_id, review_id, name and body columns,
+# a match in a title name outranks the same match in a text.
+WEIGHTS = '0.0, 0.0, 10.0, 1.0'
+SNIPPET_TOKENS = 16
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+
+SearchHit = namedtuple(
+    'SearchHit', 'type id title_id review_id snippet rank rowid'
+)
+
+REBUILD_SQL = (
+    f'DELETE FROM {TABLE}',
+    f'''INSERT INTO {TABLE} (rowid, title_id, review_id, name, body)
+        SELECT id * 3, id, NULL, name, COALESCE(description, '')
+        FROM reviews_title''',
+    f'''INSERT INTO {TABLE} (rowid, title_id, review_id, name, body)
+        SELECT id * 3 + 1, title_id, NULL, '', text
+        FROM reviews_review''',
+    f'''INSERT INTO {TABLE} (rowid, title_id, review_id, name, body)
+        SELECT comment.id * 3 + 2, review.title_id, comment.review_id, '',
+            comment.text
+        FROM reviews_comment AS comment
+        JOIN reviews_review AS review ON review.id = comment.review_id''',
+    f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')",
+)
+
+TITLE_ROWS_SQL = '''
+    SELECT %s
+    UNION ALL
+    SELECT id * 3 + 1 FROM reviews_review WHERE title_id = %s
+    UNION ALL
+    SELECT comment.id * 3 + 2
+    FROM reviews_comment AS comment
+    JOIN reviews_review AS review ON review.id = comment.review_id
+    WHERE review.title_id = %s
+'''
+AUTHOR_ROWS_SQL = '''
+    SELECT id * 3 + 1 FROM reviews_review WHERE author_id = %s
+    UNION
+    SELECT id * 3 + 2 FROM reviews_comment WHERE author_id = %s
+    UNION
+    SELECT comment.id * 3 + 2
+    FROM reviews_comment AS comment
+    JOIN reviews_review AS review ON review.id = comment.review_id
+    WHERE review.author_id = %s
+'''
+
+
+def get_rowid(kind, pk):
+    return pk * len(KINDS) + KINDS.index(kind)
+
+
+def index(kind, pk, title_id, review_id=None, name='', body=''):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'REPLACE INTO {TABLE} (rowid, title_id, review_id, name, body) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            [get_rowid(kind, pk), title_id, review_id, name, body or '']
+        )
+
+
+def remove(kind, pk):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid = %s', [get_rowid(kind, pk)]
+        )
+
+
+def remove_rows(sql, params):
+    """
+    Removes the rows whose rowids the query selects, returns the rowids.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rowids = {rowid for rowid, in cursor.fetchall()}
+        if rowids:
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid IN ({sql})', params
+            )
+    return rowids
+
+
+def remove_title(title_id):
+    """
+    Removes the title together with its reviews and their comments.
+    """
+    return remove_rows(
+        TITLE_ROWS_SQL, [get_rowid('title', title_id), title_id, title_id]
+    )
+
+
+def remove_author(user_id):
+    """
+    Removes the reviews and comments of the user
+    and the comments to the reviews of the user.
+    """
+    return remove_rows(AUTHOR_ROWS_SQL, [user_id] * 3)
+
+
+def index_title(title):
+    index('title', title.pk, title.pk, name=title.name, body=title.description)
+
+
+def index_review(review):
+    index('review', review.pk, review.title_id, body=review.text)
+
+
+def index_comment(comment):
+    index(
+        'comment', comment.pk, comment.review.title_id,
+        review_id=comment.review_id, body=comment.text
+    )
+
+
+def rebuild():
+    """
+    Refills the index from the model tables, returns the number of rows.
+    """
+    with connection.cursor() as cursor:
+        for sql in REBUILD_SQL:
+            cursor.execute(sql)
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def parse_query(text):
+    """
+    Turns user input into an FTS5 query matching all of its words,
+    the words are quoted so that FTS5 syntax in the input is inert.
+    """
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', text))
+
+
+def highlight(snippet):
+    return html.escape(snippet).replace(
+        HIGHLIGHT_START, '<mark>'
+    ).replace(HIGHLIGHT_END, '</mark>')
+
+
+def search(text, limit, position=None):
+    """
+    Returns up to `limit` hits best first, starting after the
+    (rank, rowid) position of the previous page edge.
+    """
+    query = parse_query(text)
+    if not query:
+        return []
+    params = [HIGHLIGHT_START, HIGHLIGHT_END, SNIPPET_TOKENS, query]
+    after = ''
+    if position is not None:
+        after = 'WHERE score > %s OR (score = %s AND rowid > %s)'
+        params += [position[0], position[0], position[1]]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''SELECT * FROM (
+                SELECT rowid, title_id, review_id,
+                    snippet({TABLE}, -1, %s, %s, '…', %s) AS snippet,
+                    bm25({TABLE}, {WEIGHTS}) AS score
+                FROM {TABLE} WHERE {TABLE} MATCH %s
+            ) {after} ORDER BY score, rowid LIMIT %s''',
+            params + [limit]
+        )
+        rows = cursor.fetchall()
+    return [
+        SearchHit(
+            type=KINDS[rowid % len(KINDS)],
+            id=rowid // len(KINDS),
+            title_id=title_id,
+            review_id=review_id,
+            snippet=highlight(snippet),
+            rank=rank,
+            rowid=rowid,
+        )
+        for rowid, title_id, review_id, snippet, rank in rows
+    ]
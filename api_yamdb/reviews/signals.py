@@ -0,0 +1,307 @@
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import transaction
+from django.db.models import (Case, DateTimeField, F, OuterRef, Subquery,
+                              Value, When)
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import counters, leaderboards, registry, search, versions
+from .models import (Category, Comment, Genre, GenreTitle, Review, Title,
+                     TitleStatistics, User)
+
+SEARCH_INDEXERS = {
+    Title: search.index_title,
+    Review: search.index_review,
+    Comment: search.index_comment,
+}
+
+
+class PendingUpdates:
+    """
+    Cache updates deferred until the current transaction commits.
+
+    A cascade delete sends signals for every row, the updates they
+    schedule are collected here and each one runs once on commit.
+    """
+
+    def __init__(self):
+        self.callbacks = {}
+        self.version_keys = set()
+        self.leaderboard_title_ids = set()
+        # Titles and users being deleted with the search rowids of their
+        # rows, the cascade skips search and counter updates of those rows.
+        self.cascades = {}
+        self.unindexed_rowids = set()
+
+    def __call__(self):
+        for callback in self.callbacks:
+            callback()
+        if self.version_keys:
+            versions.touch(*self.version_keys)
+        for title_id in sorted(self.leaderboard_title_ids):
+            leaderboards.update_title(title_id)
+
+
+@contextmanager
+def pending_updates():
+    """
+    Yields the updates pending on the current transaction, they are
+    flushed once it commits. Outside of a transaction they are flushed
+    right away.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        pending = PendingUpdates()
+        yield pending
+        pending()
+        return
+    pending = getattr(connection, 'pending_updates', None)
+    # A rollback drops the flush together with the other callbacks,
+    # the next write then starts a new set.
+    if pending is None or all(
+        callback is not pending for _, callback in connection.run_on_commit
+    ):
+        pending = connection.pending_updates = PendingUpdates()
+        transaction.on_commit(pending)
+    yield pending
+
+
+def schedule_once(callback):
+    with pending_updates() as pending:
+        pending.callbacks[callback] = None
+
+
+def schedule_leaderboard_update(title_id):
+    with pending_updates() as pending:
+        pending.leaderboard_title_ids.add(title_id)
+
+
+def schedule_touch(*keys):
+    with pending_updates() as pending:
+        pending.version_keys.update(keys)
+
+
+def add_review_score(review):
+    Title.objects.filter(pk=review.title_id).shift_rating(review.score, 1)
+    shifted = TitleStatistics.objects.filter(
+        title_id=review.title_id
+    ).shift_histogram(
+        {review.score: 1},
+        last_review_date=Case(
+            When(
+                last_review_date__gt=review.pub_date,
+                then=F('last_review_date')
+            ),
+            default=Value(review.pub_date, output_field=DateTimeField()),
+        ),
+    )
+    if not shifted:
+        TitleStatistics.objects.rebuild(review.title_id)
+    schedule_leaderboard_update(review.title_id)
+
+
+def remove_review_score(title_id, score):
+    Title.objects.filter(pk=title_id).shift_rating(-score, -1)
+    TitleStatistics.objects.filter(title_id=title_id).shift_histogram(
+        {score: -1},
+        last_review_date=Subquery(
+            Review.objects.filter(title_id=OuterRef('title_id'))
+            .order_by('-pub_date').values('pub_date')[:1]
+        ),
+    )
+    schedule_leaderboard_update(title_id)
+
+
+def change_review_score(title_id, previous_score, score):
+    Title.objects.filter(pk=title_id).shift_rating(score - previous_score, 0)
+    shifted = TitleStatistics.objects.filter(
+        title_id=title_id
+    ).shift_histogram({previous_score: -1, score: 1})
+    if not shifted:
+        TitleStatistics.objects.rebuild(title_id)
+    schedule_leaderboard_update(title_id)
+
+
+@receiver(post_save, sender=Title)
+def create_title_statistics(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        TitleStatistics.objects.create(title=instance)
+
+
+@receiver(post_save, sender=Title)
+def count_created_title(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(counters.shift_titles_count, 1))
+
+
+@receiver(post_delete, sender=Title)
+def count_deleted_title(sender, instance, **kwargs):
+    transaction.on_commit(partial(counters.shift_titles_count, -1))
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_leaderboards(sender, **kwargs):
+    schedule_once(leaderboards.invalidate_boards)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_registry(sender, **kwargs):
+    schedule_once(registry.categories.invalidate)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_registry(sender, **kwargs):
+    schedule_once(registry.genres.invalidate)
+
+
+@receiver(pre_save, sender=Review)
+def lock_previous_score(sender, instance, **kwargs):
+    """
+    Locks the stored review row and remembers its title and score,
+    so that title counters can be shifted by the exact difference.
+    """
+    instance._previous_score = None
+    if instance.pk is not None:
+        instance._previous_score = (
+            Review.objects.select_for_update()
+            .filter(pk=instance.pk)
+            .values_list('title_id', 'score')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def update_title_on_review_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_score', None)
+    if previous is None:
+        add_review_score(instance)
+        return
+    previous_title_id, previous_score = previous
+    if previous_title_id != instance.title_id:
+        remove_review_score(previous_title_id, previous_score)
+        add_review_score(instance)
+    elif previous_score != instance.score:
+        change_review_score(instance.title_id, previous_score, instance.score)
+
+
+@receiver(post_delete, sender=Review)
+def update_title_on_review_delete(sender, instance, **kwargs):
+    with pending_updates() as pending:
+        if (Title, instance.title_id) in pending.cascades:
+            return
+    remove_review_score(instance.title_id, instance.score)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def update_search_index_on_save(sender, instance, raw, **kwargs):
+    if not raw:
+        SEARCH_INDEXERS[sender](instance)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def update_search_index_on_delete(sender, instance, **kwargs):
+    kind = sender._meta.model_name
+    with pending_updates() as pending:
+        if search.get_rowid(kind, instance.pk) in pending.unindexed_rowids:
+            return
+    search.remove(kind, instance.pk)
+
+
+@receiver(pre_delete, sender=Title)
+@receiver(pre_delete, sender=User)
+def start_cascade(sender, instance, **kwargs):
+    """
+    Removes the rows a title or user delete cascades to from the search
+    index at once, instead of one statement per deleted row.
+    """
+    if sender is Title:
+        rowids = search.remove_title(instance.pk)
+    else:
+        rowids = search.remove_author(instance.pk)
+    with pending_updates() as pending:
+        pending.cascades[sender, instance.pk] = rowids
+        pending.unindexed_rowids |= rowids
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=User)
+def finish_cascade(sender, instance, **kwargs):
+    with pending_updates() as pending:
+        pending.unindexed_rowids -= pending.cascades.pop(
+            (sender, instance.pk), set()
+        )
+        if sender is Title:
+            pending.leaderboard_title_ids.discard(instance.pk)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def touch_title(sender, instance, **kwargs):
+    schedule_touch(versions.get_title_key(instance.pk))
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def touch_title_genres(sender, instance, **kwargs):
+    schedule_touch(versions.get_title_key(instance.title_id))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_genres(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        schedule_touch(versions.CATALOGUE_KEY)
+    else:
+        schedule_touch(versions.get_title_key(instance.pk))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def touch_catalogue(sender, **kwargs):
+    schedule_touch(versions.CATALOGUE_KEY)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def touch_reviews(sender, instance, **kwargs):
+    title_ids = {instance.title_id}
+    previous = getattr(instance, '_previous_score', None)
+    if previous is not None:
+        title_ids.add(previous[0])
+    for title_id in title_ids:
+        schedule_touch(
+            versions.get_reviews_key(title_id),
+            versions.get_title_key(title_id),
+        )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_comments(sender, instance, **kwargs):
+    schedule_touch(versions.get_comments_key(instance.review_id))
+
+
+@receiver(post_save, sender=User)
+def touch_users(sender, instance, created, update_fields, **kwargs):
+    """
+    Authors are rendered by username in reviews and comments,
+    new users and saves of other fields change none of them.
+    """
+    if not created and (update_fields is None or 'username' in update_fields):
+        schedule_touch(versions.USERS_KEY)
@@ -0,0 +1,100 @@
+"""
+Version stamps of API resources for conditional GET.
+
+A stamp is the time in microseconds of the last committed write that
+changed the resource, kept in the ResourceVersion table, so that every
+process reads the same stamps and a stamp changes only on a write.
+Views build strong ETags and Last-Modified headers from the stamps of
+a response with one query by primary key, before they run serializers.
+A resource without a stamp, such as a bulk loaded one, gets the current
+time on its first read, every process then reads that stamp.
+"""
+import time
+
+from django.db import connection
+
+from .models import ResourceVersion
+
+CATALOGUE_KEY = 'version:catalogue'
+USERS_KEY = 'version:users'
+
+# A stamp moves past the stored one even when the clock of the writing
+# process is behind, so a write never brings back an earlier stamp.
+TOUCH_SQL = (
+    'INSERT INTO {table} ("key", "stamp") VALUES {values} '
+    'ON CONFLICT ("key") DO UPDATE SET '
+    '"stamp" = MAX(excluded."stamp", {table}."stamp" + 1)'
+)
+# Stamps of the first read keep the stamp another process stored first,
+# only the stamps stored by this statement are returned.
+CREATE_SQL = (
+    'INSERT INTO {table} ("key", "stamp") VALUES {values} '
+    'ON CONFLICT ("key") DO NOTHING RETURNING "key", "stamp"'
+)
+
+
+def get_title_key(title_id):
+    return f'version:title:{title_id}'
+
+
+def get_reviews_key(title_id):
+    return f'version:reviews:{title_id}'
+
+
+def get_comments_key(review_id):
+    return f'version:comments:{review_id}'
+
+
+def now():
+    return time.time_ns() // 1000
+
+
+def read_stamps(keys):
+    return dict(
+        ResourceVersion.objects.filter(key__in=keys)
+        .values_list('key', 'stamp')
+    )
+
+
+def write_stamps(sql, keys):
+    """
+    Stores the current time as the stamp of the keys with the statement,
+    returns the rows it returns.
+    """
+    keys = sorted(set(keys))
+    stamp = now()
+    batch_size = connection.ops.bulk_batch_size(
+        ResourceVersion._meta.concrete_fields, keys
+    )
+    rows = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            cursor.execute(
+                sql.format(
+                    table=ResourceVersion._meta.db_table,
+                    values=', '.join(['(%s, %s)'] * len(batch)),
+                ),
+                [value for key in batch for value in (key, stamp)]
+            )
+            if cursor.description:
+                rows += cursor.fetchall()
+    return rows
+
+
+def get_stamps(keys):
+    stamps = read_stamps(keys)
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        stamps.update(write_stamps(CREATE_SQL, missing))
+        missing = [key for key in missing if key not in stamps]
+    if missing:
+        stamps.update(read_stamps(missing))
+    return [stamps[key] for key in keys]
+
+
+def touch(*keys):
+    """
+    Marks resources as changed, called once the write is committed.
+    """
+    write_stamps(TOUCH_SQL, keys)
@@ -0,0 +1,51 @@
+"""
+Throughput of generate_reviews with one and with all processors,
+and of loading the generated dataset with populate_reviews --dir.
+
+Run with:
+
+pytest benchmarks/bench_generate_reviews.py -s
+"""
+import io
+import os
+import time
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Review
+
+SIZES = (
+    '--seed', '0', '--users', '20000', '--titles', '5000',
+    '--reviews', '200000', '--comments', '100000',
+)
+
+
+def read_files(path):
+    return {file.name: file.read_bytes() for file in path.iterdir()}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_generate_reviews_throughput(tmp_path):
+    print('\nGenerating 200000 reviews:')
+    for workers in sorted({1, os.cpu_count()}):
+        started = time.perf_counter()
+        call_command(
+            'generate_reviews', '--dir', str(tmp_path / str(workers)),
+            '--workers', str(workers), *SIZES, stdout=io.StringIO()
+        )
+        print(
+            f'workers={workers:<3} '
+            f'total={time.perf_counter() - started:7.2f}s'
+        )
+    assert read_files(tmp_path / '1') == read_files(
+        tmp_path / str(os.cpu_count())
+    )
+
+    started = time.perf_counter()
+    call_command(
+        'populate_reviews', '--dir', str(tmp_path / '1'),
+        stdout=io.StringIO()
+    )
+    print(f'load      total={time.perf_counter() - started:7.2f}s')
+    assert Review.objects.count() == 200000
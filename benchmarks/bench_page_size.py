@@ -0,0 +1,63 @@
+"""
+Per-item latency of fetching a title's reviews with different page sizes.
+
+Run with:
+
+pytest benchmarks/bench_page_size.py -s
+"""
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from reviews.models import Review, Title
+
+REVIEWS = 100
+PAGE_SIZES = (5, 20, 100)
+
+
+def fetch_all(client, url):
+    requests = 0
+    items = 0
+    while url:
+        data = client.get(url).json()
+        requests += 1
+        items += len(data['results'])
+        url = data['next']
+    return requests, items
+
+
+@pytest.mark.django_db
+def test_page_size_latency():
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'user{number}', email=f'user{number}@yamdb.fake')
+        for number in range(REVIEWS)
+    )
+    users = User.objects.filter(username__startswith='user')
+    title = Title.objects.create(name='Benchmark', year=2000)
+    Review.objects.bulk_create(
+        Review(title=title, author=user, text='text', score=number % 10 + 1)
+        for number, user in enumerate(users)
+    )
+    # bulk_create skips signals, the listing total is the stored counter
+    Title.objects.filter(pk=title.pk).update(rating_count=REVIEWS)
+    client = APIClient()
+
+    print(f'\nFetching {REVIEWS} reviews:')
+    per_item = {}
+    for page_size in PAGE_SIZES:
+        url = f'/api/v1/titles/{title.pk}/reviews/?page_size={page_size}'
+        fetch_all(client, url)
+        started = time.perf_counter()
+        requests, items = fetch_all(client, url)
+        elapsed = time.perf_counter() - started
+        assert items == REVIEWS
+        per_item[page_size] = elapsed / items
+        print(
+            f'page_size={page_size:<4} requests={requests:<4} '
+            f'total={elapsed * 1000:8.1f}ms '
+            f'per item={per_item[page_size] * 1000:6.3f}ms'
+        )
+    assert per_item[PAGE_SIZES[-1]] < per_item[PAGE_SIZES[0]]
@@ -0,0 +1,70 @@
+"""
+Throughput of populate_reviews loading reviews row by row and in bulk.
+
+Run with:
+
+pytest benchmarks/bench_populate_reviews.py -s
+"""
+import csv
+import io
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from reviews.models import Review, Title
+
+USERS = 50
+TITLES = 20
+
+
+def write_reviews(path, users, titles):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            ('id', 'title_id', 'text', 'author', 'score', 'pub_date')
+        )
+        for number, (user, title) in enumerate(
+            ((user, title) for user in users for title in titles), 1
+        ):
+            writer.writerow((
+                number, title, f'Отзыв {number}', user, number % 10 + 1,
+                '2020-01-01T00:00:00Z'
+            ))
+    return len(users) * len(titles)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_populate_reviews_throughput(tmp_path):
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'user{number}', email=f'user{number}@yamdb.fake')
+        for number in range(USERS)
+    )
+    Title.objects.bulk_create(
+        Title(name=f'Title {number}', year=2000) for number in range(TITLES)
+    )
+    rows = write_reviews(
+        tmp_path / 'review.csv',
+        list(User.objects.values_list('pk', flat=True)),
+        list(Title.objects.values_list('pk', flat=True)),
+    )
+
+    print(f'\nLoading {rows} reviews:')
+    throughput = {}
+    for mode, options in (('row', ()), ('bulk', ('--bulk',))):
+        Review.objects.all().delete()
+        started = time.perf_counter()
+        call_command(
+            'populate_reviews', '--path', str(tmp_path / 'review.csv'),
+            *options, stdout=io.StringIO()
+        )
+        elapsed = time.perf_counter() - started
+        assert Review.objects.count() == rows
+        throughput[mode] = rows / elapsed
+        print(
+            f'{mode:<5} total={elapsed:7.2f}s '
+            f'throughput={throughput[mode]:9.0f} rows/s'
+        )
+    assert throughput['bulk'] > throughput['row']
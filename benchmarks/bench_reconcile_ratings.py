@@ -0,0 +1,50 @@
+"""
+Throughput of reconcile_ratings over a generated dataset,
+a full pass and an incremental --since check.
+
+Run with:
+
+pytest benchmarks/bench_reconcile_ratings.py -s
+"""
+import io
+import time
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.models import Review
+
+SIZES = (
+    '--seed', '0', '--users', '20000', '--titles', '5000',
+    '--reviews', '200000', '--comments', '0',
+)
+
+
+def reconcile(*options):
+    started = time.perf_counter()
+    call_command('reconcile_ratings', *options, stdout=io.StringIO())
+    return time.perf_counter() - started
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reconcile_ratings_throughput(tmp_path):
+    call_command(
+        'generate_reviews', '--dir', str(tmp_path), '--load', *SIZES,
+        stdout=io.StringIO()
+    )
+    reviews = Review.objects.count()
+    since = Review.objects.order_by('-pub_date').values_list(
+        'pub_date', flat=True
+    )[reviews // 100]
+    print(f'\nReconciling {reviews} reviews:')
+    for name, options in (
+        ('full', ()),
+        ('dry-run', ('--dry-run',)),
+        ('since 1%', ('--since', timezone.localtime(since).isoformat())),
+    ):
+        elapsed = reconcile(*options)
+        print(
+            f'{name:<9} total={elapsed:7.2f}s '
+            f'reviews/s={reviews / elapsed:10.0f}'
+        )
@@ -1,3 +1,4 @@
+import pytest
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -113,3 +114,35 @@ def create_comments(admin_client, admin):
     result.append({'id': create_comment(client_moderator, titles[0]["id"], reviews[0]["id"], 'qwerty321'),
                    'author': moderator.username, 'text': 'qwerty321'})
     return result, reviews, titles, user, moderator
+
+
+def get_expected_rating(title_id):
+    """
+    Rating counters and score histogram of the title recomputed from its reviews.
+    """
+    from django.conf import settings
+    from reviews.models import Review
+    scores = list(Review.objects.filter(title_id=title_id).values_list('score', flat=True))
+    rating_sum, rating_count = sum(scores), len(scores)
+    prior_votes = settings.RATING_PRIOR_VOTES
+    return {
+        'rating_sum': rating_sum,
+        'rating_count': rating_count,
+        'rating': pytest.approx(rating_sum / rating_count) if rating_count else None,
+        'weighted_rating': pytest.approx(
+            (rating_sum + prior_votes * settings.RATING_PRIOR_MEAN) / (rating_count + prior_votes)
+        ),
+        'histogram': {score: scores.count(score) for score in range(1, 11)},
+    }
+
+
+def get_stored_rating(title_id):
+    from reviews.models import Title
+    title = Title.objects.select_related('statistics').get(pk=title_id)
+    return {
+        'rating_sum': title.rating_sum,
+        'rating_count': title.rating_count,
+        'rating': title.rating,
+        'weighted_rating': title.weighted_rating,
+        'histogram': title.statistics.histogram,
+    }
@@ -0,0 +1,72 @@
+import io
+import random
+
+import pytest
+
+
+@pytest.fixture
+def dataset(django_user_model):
+    """
+    Seeds a deterministic catalogue with users, reviews and comments.
+    """
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                                Title)
+
+    rng = random.Random(0)
+    django_user_model.objects.bulk_create(
+        django_user_model(username=f'reader{index}', email=f'reader{index}@yamdb.fake')
+        for index in range(30)
+    )
+    readers = list(django_user_model.objects.filter(username__startswith='reader'))
+    Category.objects.bulk_create(
+        Category(name=f'Категория {index}', slug=f'category-{index}')
+        for index in range(3)
+    )
+    categories = list(Category.objects.all())
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {index}', slug=f'genre-{index}') for index in range(6)
+    )
+    genres = list(Genre.objects.all())
+    Title.objects.bulk_create(
+        Title(
+            name=f'Произведение {index}', year=1950 + index,
+            description=f'Описание {index}', category=rng.choice(categories)
+        )
+        for index in range(40)
+    )
+    titles = list(Title.objects.all())
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genre)
+        for title in titles
+        for genre in rng.sample(genres, rng.randint(1, 3))
+    )
+    Review.objects.bulk_create(
+        Review(
+            title=title, author=reader, text=f'Отзыв {reader.username}',
+            score=rng.randint(1, 10), pub_date=timezone.now()
+        )
+        for reader in readers
+        for title in rng.sample(titles, 7)
+    )
+    reviews = list(Review.objects.all())
+    Comment.objects.bulk_create(
+        Comment(
+            review=rng.choice(reviews), author=rng.choice(readers),
+            text='Комментарий', pub_date=timezone.now()
+        )
+        for _ in range(300)
+    )
+    call_command('reconcile_ratings', stdout=io.StringIO())
+    call_command('rebuild_search_index', stdout=io.StringIO())
+    review = Review.objects.filter(comments__isnull=False).first()
+    return {
+        'readers': readers,
+        'title': review.title,
+        'review': review,
+        'comment': review.comments.first(),
+        'category': categories[0],
+        'genre': genres[0],
+    }
@@ -0,0 +1,14 @@
+import multiprocessing
+
+import pytest
+
+
+@pytest.fixture(params=['spawn', 'forkserver'])
+def start_method(request):
+    """
+    Starts the workers of process pools with spawn or forkserver.
+    """
+    previous = multiprocessing.get_start_method()
+    multiprocessing.set_start_method(request.param, force=True)
+    yield request.param
+    multiprocessing.set_start_method(previous, force=True)
@@ -0,0 +1,193 @@
+import pytest
+
+from .common import (auth_client, create_reviews, create_titles,
+                     get_expected_rating, get_stored_rating)
+
+
+class Test08TitleRatingAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_stats(self, client, admin_client, admin):
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/stats/'
+        response = client.get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/stats/` '
+            'без токена авторизации возвращается статус 200'
+        )
+        data = response.json()
+        assert data.get('review_count') == 3, (
+            'Проверьте, что `/api/v1/titles/{title_id}/stats/` возвращает количество отзывов'
+        )
+        histogram = data.get('histogram')
+        assert histogram == {
+            '1': 0, '2': 0, '3': 1, '4': 1, '5': 1,
+            '6': 0, '7': 0, '8': 0, '9': 0, '10': 0
+        }, (
+            'Проверьте, что `/api/v1/titles/{title_id}/stats/` возвращает распределение оценок'
+        )
+        assert data.get('mean') == 4 and data.get('median') == 4, (
+            'Проверьте, что `/api/v1/titles/{title_id}/stats/` возвращает среднее и медиану оценок'
+        )
+        assert round(data.get('std_deviation'), 4) == 0.8165, (
+            'Проверьте, что `/api/v1/titles/{title_id}/stats/` возвращает стандартное отклонение оценок'
+        )
+        assert data.get('last_review_date'), (
+            'Проверьте, что `/api/v1/titles/{title_id}/stats/` возвращает дату последнего отзыва'
+        )
+
+        client_user = auth_client(user)
+        client_user.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/',
+            data={'score': 10}
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[2]["id"]}/')
+        data = client.get(url).json()
+        assert data.get('review_count') == 2 and data['histogram']['10'] == 1, (
+            'Проверьте, что статистика произведения обновляется при изменении и удалении отзывов'
+        )
+        assert data.get('median') == 7.5, (
+            'Проверьте, что медиана четного количества оценок равна среднему двух центральных'
+        )
+
+        response = client.get('/api/v1/titles/100500/stats/')
+        assert response.status_code == 404, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/stats/` '
+            'для несуществующего произведения возвращается статус 404'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_top(self, client, admin_client, admin, user_client, moderator_client):
+        titles, categories, genres = create_titles(admin_client)
+        response = client.get('/api/v1/titles/top/')
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/titles/top/` '
+            'без токена авторизации возвращается статус 200'
+        )
+        assert [title['id'] for title in response.json()] == sorted(
+            title['id'] for title in titles
+        ), (
+            'Проверьте, что произведения без отзывов имеют одинаковый взвешенный рейтинг'
+        )
+        movies_url = f'/api/v1/titles/top/?category={categories[0]["slug"]}'
+        assert [title['id'] for title in client.get(movies_url).json()] == [titles[0]['id']], (
+            'Проверьте, что `/api/v1/titles/top/` фильтрует произведения по категории'
+        )
+
+        admin_client.post(f'/api/v1/titles/{titles[0]["id"]}/reviews/', data={'text': 'a', 'score': 10})
+        for uclient in (admin_client, user_client, moderator_client):
+            response = uclient.post(f'/api/v1/titles/{titles[1]["id"]}/reviews/', data={'text': 'b', 'score': 9})
+        review_id = response.json()['id']
+        data = client.get('/api/v1/titles/top/').json()
+        assert [title['id'] for title in data] == [titles[1]['id'], titles[0]['id']], (
+            'Проверьте, что в `/api/v1/titles/top/` произведение с несколькими высокими оценками '
+            'выше произведения с единственной оценкой 10'
+        )
+        assert data[0]['weighted_rating'] == pytest.approx((27 + 55) / 13), (
+            'Проверьте, что `weighted_rating` рассчитывается по байесовской формуле'
+        )
+        assert data[1]['rating'] == 10, (
+            'Проверьте, что `/api/v1/titles/top/` возвращает средний рейтинг произведения'
+        )
+
+        drama_url = f'/api/v1/titles/top/?genre={genres[2]["slug"]}'
+        moderator_client.patch(f'/api/v1/titles/{titles[1]["id"]}/reviews/{review_id}/', data={'score': 1})
+        assert [title['id'] for title in client.get(drama_url).json()] == [titles[1]['id']], (
+            'Проверьте, что `/api/v1/titles/top/` фильтрует произведения по жанру'
+        )
+        data = client.get('/api/v1/titles/top/').json()
+        assert [title['id'] for title in data] == [titles[0]['id'], titles[1]['id']], (
+            'Проверьте, что `/api/v1/titles/top/` обновляется при изменении оценок'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_leaderboard_updated_once_per_title(self, django_user_model, monkeypatch):
+        from django.db import transaction
+        from reviews import leaderboards
+        from reviews.models import Review, Title
+        title = Title.objects.create(name='Произведение', year=2000)
+        authors = [
+            django_user_model.objects.create(username=f'reader{index}', email=f'reader{index}@yamdb.fake')
+            for index in range(5)
+        ]
+        updated = []
+        monkeypatch.setattr(leaderboards, 'update_title', updated.append)
+        with transaction.atomic():
+            for author in authors:
+                Review.objects.create(title=title, author=author, text='Отзыв', score=7)
+            assert updated == [], (
+                'Проверьте, что рейтинги обновляются после фиксации транзакции'
+            )
+        assert updated == [title.id], (
+            'Проверьте, что рейтинг произведения обновляется один раз на транзакцию'
+        )
+        updated.clear()
+        with transaction.atomic():
+            Review.objects.filter(title=title).first().delete()
+            transaction.set_rollback(True)
+        with transaction.atomic():
+            Review.objects.filter(title=title).last().delete()
+        assert updated == [title.id], (
+            'Проверьте, что после отката транзакции рейтинг произведения снова обновляется'
+        )
+        updated.clear()
+        title.delete()
+        assert updated == [], (
+            'Проверьте, что удаление произведения не обновляет рейтинг его отзывами'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_rating_follows_review_writes(self, admin_client, admin):
+        from reviews.models import Review, Title
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        title_id = titles[0]['id']
+        assert get_stored_rating(title_id) == get_expected_rating(title_id), (
+            'Проверьте, что создание отзыва обновляет рейтинг произведения'
+        )
+        url = f'/api/v1/titles/{title_id}/reviews/{reviews[1]["id"]}/'
+        auth_client(user).patch(url, data={'score': 10})
+        assert get_stored_rating(title_id) == get_expected_rating(title_id), (
+            'Проверьте, что изменение оценки отзыва обновляет рейтинг произведения'
+        )
+        auth_client(user).patch(url, data={'text': 'Новый текст'})
+        assert get_stored_rating(title_id) == get_expected_rating(title_id), (
+            'Проверьте, что изменение текста отзыва не меняет рейтинг произведения'
+        )
+        review = Review.objects.get(pk=reviews[2]['id'])
+        review.title_id = titles[1]['id']
+        review.save()
+        for moved_title_id in (title_id, titles[1]['id']):
+            assert get_stored_rating(moved_title_id) == get_expected_rating(moved_title_id), (
+                'Проверьте, что перенос отзыва к другому произведению обновляет рейтинги обоих'
+            )
+        for review in reviews[:2]:
+            admin_client.delete(f'/api/v1/titles/{title_id}/reviews/{review["id"]}/')
+        assert get_stored_rating(title_id) == get_expected_rating(title_id), (
+            'Проверьте, что удаление отзыва обновляет рейтинг произведения'
+        )
+        assert Title.objects.get(pk=title_id).rating is None, (
+            'Проверьте, что у произведения без отзывов нет рейтинга'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_shift_rating(self, settings):
+        from reviews.models import Title
+        title = Title.objects.create(name='Произведение', year=2000)
+        titles = Title.objects.filter(pk=title.pk)
+        titles.shift_rating(7, 1)
+        titles.shift_rating(4, 1)
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (11, 2, 5.5), (
+            'Проверьте, что `shift_rating` сдвигает счётчики и пересчитывает средний рейтинг'
+        )
+        prior_votes = settings.RATING_PRIOR_VOTES
+        assert title.weighted_rating == pytest.approx(
+            (11 + prior_votes * settings.RATING_PRIOR_MEAN) / (2 + prior_votes)
+        ), (
+            'Проверьте, что `shift_rating` пересчитывает взвешенный рейтинг'
+        )
+        titles.shift_rating(-11, -2)
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (0, 0, None), (
+            'Проверьте, что `shift_rating` обнуляет рейтинг, когда оценок не осталось'
+        )
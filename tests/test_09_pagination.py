@@ -0,0 +1,132 @@
+import pytest
+
+from .common import create_reviews
+
+
+class Test09PaginationAPI:
+
+    def walk(self, client, url):
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200, (
+                f'Проверьте, что при GET запросе `{url}` возвращается статус 200'
+            )
+            data = response.json()
+            pages.append(data)
+            url = data['next']
+        return pages
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_cursor(self, client):
+        from reviews.models import Title
+        for number in range(12):
+            Title.objects.create(name=f'Произведение {number % 4}', year=2000)
+        expected = list(Title.objects.order_by('name', 'id').values_list('id', flat=True))
+
+        pages = self.walk(client, '/api/v1/titles/?cursor=')
+        assert [len(page['results']) for page in pages] == [5, 5, 2], (
+            'Проверьте, что `/api/v1/titles/?cursor=` возвращает страницы по 5 произведений'
+        )
+        assert [title['id'] for page in pages for title in page['results']] == expected, (
+            'Проверьте, что курсорная пагинация `/api/v1/titles/` упорядочивает по `name` и `id` без пропусков'
+        )
+        assert 'count' not in pages[0] and pages[0]['previous'] is None, (
+            'Проверьте, что первая страница курсорной пагинации не содержит `count` и ссылки `previous`'
+        )
+        previous = client.get(pages[-1]['previous']).json()
+        assert previous['results'] == pages[1]['results'], (
+            'Проверьте, что ссылка `previous` курсорной пагинации ведёт на предыдущую страницу'
+        )
+
+        response = client.get('/api/v1/titles/?cursor=invalid')
+        assert response.status_code == 404, (
+            'Проверьте, что при некорректном курсоре возвращается статус 404'
+        )
+        data = client.get('/api/v1/titles/').json()
+        assert data['count'] == 12 and len(data['results']) == 5, (
+            'Проверьте, что постраничная пагинация `/api/v1/titles/` продолжает работать'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_cursor(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor=&page_size=2'
+        pages = self.walk(client, url)
+        ids = [review['id'] for page in pages for review in page['results']]
+        assert sorted(ids) == sorted(review['id'] for review in reviews), (
+            'Проверьте, что курсорная пагинация `/api/v1/titles/{title_id}/reviews/` возвращает все отзывы'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cached_count(self, client, settings):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from reviews.models import Title
+        for number in range(12):
+            Title.objects.create(name=f'Произведение {number}', year=2000 + number % 2)
+        client.get('/api/v1/titles/')
+        with CaptureQueriesContext(connection) as context:
+            data = client.get('/api/v1/titles/?page=2').json()
+        assert not any('COUNT(' in query['sql'] for query in context.captured_queries), (
+            'Проверьте, что `/api/v1/titles/` без фильтров не выполняет запрос COUNT'
+        )
+        assert data['count'] == 12 and data['count_is_estimate'] is False, (
+            'Проверьте, что `/api/v1/titles/` без фильтров берёт количество произведений из счётчика'
+        )
+        Title.objects.create(name='Новое произведение', year=2000)
+        assert client.get('/api/v1/titles/').json()['count'] == 13, (
+            'Проверьте, что счётчик произведений обновляется при создании произведения'
+        )
+
+        settings.COUNT_ESTIMATE_CAP = 3
+        data = client.get('/api/v1/titles/?year=2000').json()
+        assert data['count_is_estimate'] is True and data['count'] == 6 and data['next'], (
+            'Проверьте, что для отфильтрованного списка количество ограничивается '
+            'и помечается флагом `count_is_estimate`'
+        )
+        data = client.get('/api/v1/titles/?year=2000&page=2').json()
+        assert len(data['results']) == 2 and data['next'] is None, (
+            'Проверьте, что для отфильтрованного списка доступны все страницы'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_page_size(self, client):
+        from reviews.models import Title
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {number}', year=2000) for number in range(60)
+        )
+        data = client.get('/api/v1/titles/?page_size=20').json()
+        assert len(data['results']) == 20, (
+            'Проверьте, что параметр `page_size` задаёт размер страницы'
+        )
+        data = client.get('/api/v1/titles/?limit=7&page=2').json()
+        assert len(data['results']) == 7 and data['count'] == 60, (
+            'Проверьте, что параметр `limit` задаёт размер страницы'
+        )
+        data = client.get('/api/v1/titles/?page_size=1000').json()
+        assert len(data['results']) == 50, (
+            'Проверьте, что размер страницы `/api/v1/titles/` ограничен максимальным значением'
+        )
+        data = client.get('/api/v1/titles/?page_size=abc').json()
+        assert len(data['results']) == 5, (
+            'Проверьте, что при некорректном `page_size` используется размер страницы по умолчанию'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_unfiltered_count_exact(self, admin_client, django_user_model, settings):
+        settings.COUNT_ESTIMATE_CAP = 3
+        django_user_model.objects.bulk_create(
+            django_user_model(username=f'reader{number}', email=f'reader{number}@yamdb.fake')
+            for number in range(10)
+        )
+        data = admin_client.get('/api/v1/users/').json()
+        assert data['count'] == 11 and data['count_is_estimate'] is False, (
+            'Проверьте, что количество в списке без фильтров точное, '
+            'даже если оно больше `COUNT_ESTIMATE_CAP`'
+        )
+        data = admin_client.get('/api/v1/users/?search=reader').json()
+        assert data['count'] == 6 and data['count_is_estimate'] is True, (
+            'Проверьте, что для отфильтрованного списка пользователей количество ограничивается'
+        )
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+import pytest
+
+from .common import create_reviews
+
+
+class Test10TitleExportAPI:
+    url = '/api/v1/titles/export/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_export_permissions(self, client, user_client):
+        response = client.get(self.url)
+        assert response.status_code == 401, (
+            f'Проверьте, что при GET запросе `{self.url}` без токена авторизации возвращается статус 401'
+        )
+        response = user_client.get(self.url)
+        assert response.status_code == 403, (
+            f'Проверьте, что при GET запросе `{self.url}` от обычного пользователя возвращается статус 403'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_export_ndjson(self, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        response = admin_client.get(self.url)
+        assert response.status_code == 200 and response.streaming, (
+            f'Проверьте, что `{self.url}` возвращает потоковый ответ со статусом 200'
+        )
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).decode().splitlines()
+        ]
+        assert [row['id'] for row in rows] == [title['id'] for title in titles], (
+            f'Проверьте, что `{self.url}` выгружает все произведения'
+        )
+        assert rows[0]['genre'] == sorted(titles[0]['genre']) and rows[0]['category'] == titles[0]['category'], (
+            f'Проверьте, что `{self.url}` выгружает жанры и категорию произведения'
+        )
+        assert rows[0]['rating'] == 4 and rows[0]['rating_count'] == 3, (
+            f'Проверьте, что `{self.url}` выгружает рейтинг произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_export_csv(self, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        response = admin_client.get(f'{self.url}?type=csv')
+        assert response.status_code == 200, (
+            f'Проверьте, что `{self.url}?type=csv` возвращает статус 200'
+        )
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        assert [row['name'] for row in rows] == [title['name'] for title in titles], (
+            f'Проверьте, что `{self.url}?type=csv` выгружает все произведения'
+        )
+        response = admin_client.get(f'{self.url}?type=xml')
+        assert response.status_code == 400, (
+            f'Проверьте, что при неизвестном формате выгрузки `{self.url}` возвращает статус 400'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_export_empty_csv(self, admin_client):
+        response = admin_client.get(f'{self.url}?type=csv')
+        content = b''.join(response.streaming_content).decode()
+        assert content.splitlines() == [','.join(
+            ('id', 'name', 'year', 'description', 'category', 'genre', 'rating', 'rating_count')
+        )], (
+            f'Проверьте, что `{self.url}?type=csv` без произведений возвращает строку заголовков'
+        )
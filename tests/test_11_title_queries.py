@@ -0,0 +1,64 @@
+import pytest
+
+
+class Test11TitleQueries:
+
+    def create_titles(self, number):
+        from reviews.models import Category, Genre, GenreTitle, Title
+        categories = [
+            Category.objects.create(name=f'Категория {index}', slug=f'category-{index}')
+            for index in range(3)
+        ]
+        genres = [
+            Genre.objects.create(name=f'Жанр {index}', slug=f'genre-{index}')
+            for index in range(4)
+        ]
+        titles = [
+            Title.objects.create(
+                name=f'Произведение {index}', year=2000,
+                category=categories[index % len(categories)]
+            )
+            for index in range(number)
+        ]
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genre)
+            for index, title in enumerate(titles)
+            for genre in genres[:index % len(genres) + 1]
+        )
+        return titles
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('page_size', (5, 50))
+    def test_01_title_list_queries(self, client, django_assert_num_queries,
+                                   django_assert_max_num_queries, page_size):
+        self.create_titles(60)
+        client.get('/api/v1/titles/')
+        # page ids, version stamps, stamps stored on the first read,
+        # titles and genres of the titles without cached fragments
+        with django_assert_max_num_queries(5):
+            response = client.get(f'/api/v1/titles/?page_size={page_size}')
+        # page ids and version stamps
+        with django_assert_num_queries(2):
+            cached = client.get(f'/api/v1/titles/?page_size={page_size}')
+        data = response.json()
+        assert cached.json() == data, (
+            'Проверьте, что `/api/v1/titles/` собирает ответ из кэшированных произведений без изменений'
+        )
+        assert len(data['results']) == page_size, (
+            'Проверьте, что `/api/v1/titles/` возвращает страницу запрошенного размера'
+        )
+        assert all(title['genre'] and title['category'] for title in data['results']), (
+            'Проверьте, что `/api/v1/titles/` возвращает жанры и категории произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_retrieve_queries(self, client, django_assert_num_queries):
+        titles = self.create_titles(4)
+        client.get(f'/api/v1/titles/{titles[0].id}/')
+        # version stamps, title and genres
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{titles[3].id}/')
+        data = response.json()
+        assert len(data['genre']) == 4 and data['category']['slug'] == 'category-0', (
+            'Проверьте, что `/api/v1/titles/{title_id}/` возвращает жанры и категорию произведения'
+        )
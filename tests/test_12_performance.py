@@ -0,0 +1,183 @@
+import gc
+import json
+import os
+import time
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .common import auth_client
+
+BASELINES_PATH = os.path.join(
+    os.path.dirname(__file__), 'baselines', 'performance.json'
+)
+# Wall time is noisy, it fails only when it is several times the baseline.
+TIME_TOLERANCE = 3
+TIME_SLACK_MS = 100
+# Safe requests are timed several times and the best run is kept.
+GET_REPEATS = 3
+UPDATE_BASELINES = os.environ.get('YAMDB_UPDATE_BASELINES') == '1'
+
+CASES = (
+    ('auth-signup', 'anonymous', 'post', '/api/v1/auth/signup/',
+     {'username': 'newcomer', 'email': 'newcomer@yamdb.fake'}, 200),
+    ('auth-confirmation-code', 'anonymous', 'post', '/api/v1/auth/confirmation_code/',
+     {'username': '{username}', 'email': '{email}'}, 200),
+    ('auth-token', 'anonymous', 'post', '/api/v1/auth/token/',
+     {'username': '{username}', 'confirmation_code': '{confirmation_code}'}, 200),
+    ('users-list', 'admin', 'get', '/api/v1/users/', None, 200),
+    ('users-create', 'admin', 'post', '/api/v1/users/',
+     {'username': 'newcomer', 'email': 'newcomer@yamdb.fake', 'role': 'user'}, 201),
+    ('users-retrieve', 'admin', 'get', '/api/v1/users/{username}/', None, 200),
+    ('users-update', 'admin', 'patch', '/api/v1/users/{username}/', {'bio': 'Новое описание'}, 200),
+    ('users-delete', 'admin', 'delete', '/api/v1/users/{username}/', None, 204),
+    ('users-me', 'user', 'get', '/api/v1/users/me/', None, 200),
+    ('categories-list', 'anonymous', 'get', '/api/v1/categories/', None, 200),
+    ('categories-create', 'admin', 'post', '/api/v1/categories/', {'name': 'Музыка', 'slug': 'music'}, 201),
+    ('categories-delete', 'admin', 'delete', '/api/v1/categories/{category_id}/', None, 204),
+    ('genres-list', 'anonymous', 'get', '/api/v1/genres/', None, 200),
+    ('genres-create', 'admin', 'post', '/api/v1/genres/', {'name': 'Рок', 'slug': 'rock'}, 201),
+    ('genres-delete', 'admin', 'delete', '/api/v1/genres/{genre_id}/', None, 204),
+    ('titles-list', 'anonymous', 'get', '/api/v1/titles/?page_size=20', None, 200),
+    ('titles-list-filtered', 'anonymous', 'get', '/api/v1/titles/?genre={genre}&year=1960', None, 200),
+    ('titles-retrieve', 'anonymous', 'get', '/api/v1/titles/{title_id}/', None, 200),
+    ('titles-create', 'admin', 'post', '/api/v1/titles/',
+     {'name': 'Новинка', 'year': 2020, 'genre': ['{genre}'], 'category': '{category}'}, 201),
+    ('titles-update', 'admin', 'patch', '/api/v1/titles/{title_id}/', {'name': 'Новое название'}, 200),
+    ('titles-delete', 'admin', 'delete', '/api/v1/titles/{title_id}/', None, 204),
+    ('titles-stats', 'anonymous', 'get', '/api/v1/titles/{title_id}/stats/', None, 200),
+    ('titles-top', 'anonymous', 'get', '/api/v1/titles/top/?category={category}', None, 200),
+    ('titles-export', 'admin', 'get', '/api/v1/titles/export/', None, 200),
+    ('reviews-list', 'anonymous', 'get', '/api/v1/titles/{title_id}/reviews/', None, 200),
+    ('reviews-retrieve', 'anonymous', 'get', '/api/v1/titles/{title_id}/reviews/{review_id}/', None, 200),
+    ('reviews-create', 'admin', 'post', '/api/v1/titles/{title_id}/reviews/', {'text': 'Отзыв', 'score': 7}, 201),
+    ('reviews-update', 'admin', 'patch', '/api/v1/titles/{title_id}/reviews/{review_id}/', {'score': 2}, 200),
+    ('reviews-delete', 'admin', 'delete', '/api/v1/titles/{title_id}/reviews/{review_id}/', None, 204),
+    ('comments-list', 'anonymous', 'get', '/api/v1/titles/{title_id}/reviews/{review_id}/comments/', None, 200),
+    ('comments-retrieve', 'anonymous', 'get',
+     '/api/v1/titles/{title_id}/reviews/{review_id}/comments/{comment_id}/', None, 200),
+    ('comments-create', 'admin', 'post',
+     '/api/v1/titles/{title_id}/reviews/{review_id}/comments/', {'text': 'Комментарий'}, 201),
+    ('comments-update', 'admin', 'patch',
+     '/api/v1/titles/{title_id}/reviews/{review_id}/comments/{comment_id}/', {'text': 'Исправлено'}, 200),
+    ('search-list', 'anonymous', 'get', '/api/v1/search/?q=Отзыв reader1', None, 200),
+    ('comments-delete', 'admin', 'delete',
+     '/api/v1/titles/{title_id}/reviews/{review_id}/comments/{comment_id}/', None, 204),
+)
+
+
+def fill(value, values):
+    if isinstance(value, str):
+        return value.format(**values)
+    if isinstance(value, list):
+        return [fill(item, values) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, values) for key, item in value.items()}
+    return value
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as file:
+        return json.load(file)
+
+
+def save_baseline(name, measurement):
+    baselines = load_baselines()
+    baselines[name] = measurement
+    os.makedirs(os.path.dirname(BASELINES_PATH), exist_ok=True)
+    with open(BASELINES_PATH, 'w') as file:
+        json.dump(dict(sorted(baselines.items())), file, indent=2)
+        file.write('\n')
+
+
+class Test12Performance:
+    """
+    Query count and wall time regression checks for every API route.
+
+    Baselines live in tests/baselines/performance.json,
+    run with YAMDB_UPDATE_BASELINES=1 to record new ones.
+    """
+
+    def test_00_all_routes_covered(self):
+        from api.urls import router_v1
+        covered = {name.split('-')[0] for name, *_ in CASES}
+        missing = {basename for _, _, basename in router_v1.registry} - covered
+        assert not missing, (
+            f'Добавьте в набор проверок производительности маршруты: {", ".join(sorted(missing))}'
+        )
+
+    # Requests are served in autocommit mode. Inside a wrapping test
+    # transaction on_commit callbacks never run and atomic blocks become
+    # savepoints, so the counts would not match production.
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize(
+        'name, role, method, url, data, status_code', CASES,
+        ids=[case[0] for case in CASES]
+    )
+    def test_01_route_performance(self, request, dataset, name, role, method, url, data, status_code):
+        from reviews import registry
+        reader = dataset['readers'][1]
+        values = {
+            'username': reader.username,
+            'email': reader.email,
+            'confirmation_code': default_token_generator.make_token(reader),
+            'title_id': dataset['title'].id,
+            'review_id': dataset['review'].id,
+            'comment_id': dataset['comment'].id,
+            'category': dataset['category'].slug,
+            'category_id': dataset['category'].id,
+            'genre': dataset['genre'].slug,
+            'genre_id': dataset['genre'].id,
+        }
+        clients = {
+            'anonymous': APIClient,
+            'admin': lambda: request.getfixturevalue('admin_client'),
+            'user': lambda: auth_client(dataset['readers'][0]),
+        }
+        client = clients[role]()
+        url = fill(url, values)
+        data = fill(data, values)
+        # A long running process serves requests with warm registries.
+        registry.categories.load()
+        registry.genres.load()
+        if method == 'get':
+            client.get(url)
+        repeats = GET_REPEATS if method == 'get' else 1
+        timings = []
+        for _ in range(repeats):
+            gc.collect()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data=data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == status_code, (
+            f'Проверьте, что `{method.upper()} {url}` возвращает статус {status_code}'
+        )
+        measurement = {
+            'queries': len(context.captured_queries),
+            'time_ms': round(min(timings), 1),
+        }
+        if UPDATE_BASELINES:
+            save_baseline(name, measurement)
+            return
+
+        baseline = load_baselines().get(name)
+        assert baseline is not None, (
+            f'Нет базового замера для `{name}`, запустите тесты с YAMDB_UPDATE_BASELINES=1'
+        )
+        assert measurement['queries'] <= baseline['queries'], (
+            f'`{method.upper()} {url}` выполняет {measurement["queries"]} запросов к БД '
+            f'вместо {baseline["queries"]}'
+        )
+        time_limit = baseline['time_ms'] * TIME_TOLERANCE + TIME_SLACK_MS
+        assert measurement['time_ms'] <= time_limit, (
+            f'`{method.upper()} {url}` выполняется {measurement["time_ms"]} мс '
+            f'при базовом значении {baseline["time_ms"]} мс'
+        )
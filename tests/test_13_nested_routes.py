@@ -0,0 +1,70 @@
+import pytest
+
+
+class Test13NestedRoutes:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_comment_routes_queries(self, client, dataset, django_assert_num_queries):
+        title, review, comment = dataset['title'], dataset['review'], dataset['comment']
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        # version stamps, the stamps stored on the first read, review and comments
+        with django_assert_num_queries(4):
+            response = client.get(url)
+        assert response.status_code == 200 and response.json()['results'], (
+            'Проверьте, что `/api/v1/titles/{title_id}/reviews/{review_id}/comments/` '
+            'возвращает комментарии отзыва'
+        )
+        # version stamps and comment
+        with django_assert_num_queries(2):
+            response = client.get(f'{url}{comment.id}/')
+        assert response.status_code == 200, (
+            'Проверьте, что `/api/v1/titles/{title_id}/reviews/{review_id}/comments/{comment_id}/` '
+            'возвращает комментарий'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_review_retrieve_queries(self, client, dataset, django_assert_num_queries):
+        title, review = dataset['title'], dataset['review']
+        # version stamps, the stamps stored on the first read and review
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/{review.id}/')
+        assert response.status_code == 200, (
+            'Проверьте, что `/api/v1/titles/{title_id}/reviews/{review_id}/` возвращает отзыв'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_nested_routes_not_found(self, client, admin_client, dataset):
+        from reviews.models import Title
+        review, comment = dataset['review'], dataset['comment']
+        other_title = Title.objects.exclude(id=review.title_id).first()
+        urls = (
+            f'/api/v1/titles/{other_title.id}/reviews/{review.id}/',
+            f'/api/v1/titles/{other_title.id}/reviews/{review.id}/comments/',
+            f'/api/v1/titles/{other_title.id}/reviews/{review.id}/comments/{comment.id}/',
+            f'/api/v1/titles/{review.title_id}/reviews/0/comments/',
+            '/api/v1/titles/0/reviews/',
+        )
+        for url in urls:
+            assert client.get(url).status_code == 404, (
+                f'Проверьте, что `{url}` возвращает статус 404'
+            )
+        response = admin_client.post(
+            f'/api/v1/titles/{other_title.id}/reviews/{review.id}/comments/',
+            data={'text': 'Комментарий'}
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что при создании комментария к отзыву другого произведения '
+            'возвращается статус 404'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_review_without_comments(self, client, dataset):
+        from reviews.models import Review
+        review = Review.objects.filter(comments__isnull=True).first()
+        response = client.get(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/comments/'
+        )
+        assert response.status_code == 200 and response.json()['results'] == [], (
+            'Проверьте, что для отзыва без комментариев '
+            '`/api/v1/titles/{title_id}/reviews/{review_id}/comments/` возвращает пустой список'
+        )
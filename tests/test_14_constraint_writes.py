@@ -0,0 +1,88 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test14ConstraintWrites:
+    url_signup = '/api/v1/auth/signup/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_single_query(self, client, django_assert_num_queries):
+        data = {'username': 'newcomer', 'email': 'newcomer@yamdb.fake'}
+        with django_assert_num_queries(1):
+            response = client.post(self.url_signup, data=data)
+        assert response.status_code == 200, (
+            f'Проверьте, что POST запрос `{self.url_signup}` с валидными данными возвращает статус 200'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_signup_duplicate_messages(self, client, django_user_model):
+        django_user_model.objects.create(username='taken', email='taken@yamdb.fake')
+        cases = (
+            ({'username': 'taken', 'email': 'free@yamdb.fake'}, {'username'}),
+            ({'username': 'free', 'email': 'taken@yamdb.fake'}, {'email'}),
+            ({'username': 'taken', 'email': 'taken@yamdb.fake'}, {'username', 'email'}),
+        )
+        for data, fields in cases:
+            response = client.post(self.url_signup, data=data)
+            assert response.status_code == 400, (
+                f'Проверьте, что POST запрос `{self.url_signup}` с занятыми данными '
+                'возвращает статус 400'
+            )
+            assert set(response.json()) == fields, (
+                f'Проверьте, что POST запрос `{self.url_signup}` сообщает о занятых полях {fields}'
+            )
+            assert all('используется другим пользователем' in response.json()[field][0] for field in fields), (
+                f'Проверьте, что POST запрос `{self.url_signup}` возвращает сообщение о занятом значении'
+            )
+        assert django_user_model.objects.filter(username='free').count() == 0, (
+            f'Проверьте, что POST запрос `{self.url_signup}` с занятыми данными не создает пользователя'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_user_update_duplicate_email(self, admin_client, django_user_model):
+        django_user_model.objects.create(username='first', email='first@yamdb.fake')
+        django_user_model.objects.create(username='second', email='second@yamdb.fake')
+        response = admin_client.patch('/api/v1/users/second/', data={'email': 'first@yamdb.fake'})
+        assert response.status_code == 400 and 'email' in response.json(), (
+            'Проверьте, что PATCH запрос `/api/v1/users/{username}/` с занятым email возвращает статус 400'
+        )
+        response = admin_client.patch('/api/v1/users/second/', data={'email': 'second@yamdb.fake'})
+        assert response.status_code == 200, (
+            'Проверьте, что PATCH запрос `/api/v1/users/{username}/` с текущим email возвращает статус 200'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_review_duplicate(self, admin_client, django_assert_max_num_queries):
+        from reviews.models import Review, Title
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        admin_client.post(url, data={'text': 'Отзыв', 'score': 8})
+        with django_assert_max_num_queries(5):
+            response = admin_client.post(url, data={'text': 'Ещё отзыв', 'score': 1})
+        assert response.status_code == 400, (
+            f'Проверьте, что повторный POST запрос `{url}` возвращает статус 400'
+        )
+        assert response.json() == {
+            'non_field_errors': ['Вы уже написали отзыв к этому произведению.']
+        }, (
+            f'Проверьте, что повторный POST запрос `{url}` возвращает сообщение о существующем отзыве'
+        )
+        title = Title.objects.get(id=titles[0]['id'])
+        assert Review.objects.filter(title=title).count() == 1 and title.rating_sum == 8, (
+            'Проверьте, что повторный отзыв не сохраняется и не меняет рейтинг произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_review_other_integrity_error(self, admin_client, monkeypatch):
+        from django.db import IntegrityError
+        from reviews.models import Review
+
+        def save(*args, **kwargs):
+            raise IntegrityError('NOT NULL constraint failed: reviews_review.text')
+
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        monkeypatch.setattr(Review, 'save', save)
+        with pytest.raises(IntegrityError):
+            admin_client.post(url, data={'text': 'Отзыв', 'score': 8})
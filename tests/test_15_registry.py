@@ -0,0 +1,150 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def registry_queries(queries):
+    return [
+        query['sql'] for query in queries
+        if query['sql'].startswith('SELECT')
+        and ('FROM "reviews_genre"' in query['sql'] or 'FROM "reviews_category"' in query['sql'])
+    ]
+
+
+class Test15Registry:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_reads_without_registry_tables(self, client, dataset):
+        title = dataset['title']
+        client.get('/api/v1/titles/')
+        urls = (
+            '/api/v1/titles/',
+            f'/api/v1/titles/{title.id}/',
+            f'/api/v1/titles/?genre={dataset["genre"].slug}',
+            f'/api/v1/titles/?category={dataset["category"].slug[:-1].upper()}',
+        )
+        for url in urls:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == 200, (
+                f'Проверьте, что `{url}` возвращает статус 200'
+            )
+            assert not registry_queries(context.captured_queries), (
+                f'Проверьте, что `{url}` берёт категории и жанры из реестра, а не из БД'
+            )
+        data = client.get(f'/api/v1/titles/{title.id}/').json()
+        assert data['category'] == {'name': title.category.name, 'slug': title.category.slug}, (
+            'Проверьте, что `/api/v1/titles/{title_id}/` возвращает категорию произведения'
+        )
+        assert sorted(genre['slug'] for genre in data['genre']) == sorted(
+            genre.slug for genre in title.genre.all()
+        ), (
+            'Проверьте, что `/api/v1/titles/{title_id}/` возвращает жанры произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_filter_matches_slug_part(self, client, dataset):
+        from reviews.models import Title
+        genre = dataset['genre']
+        response = client.get('/api/v1/titles/?genre=RE-0&page_size=50')
+        expected = Title.objects.filter(genre__slug__icontains='re-0').count()
+        assert response.json()['count'] == expected, (
+            'Проверьте, что фильтр `genre` ищет произведения по части слага жанра'
+        )
+        assert expected == genre.titles.count(), (
+            'Проверьте, что фильтр `genre` не дублирует произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_registry_follows_changes(self, client, admin_client, dataset):
+        from reviews.models import Category
+        response = admin_client.post('/api/v1/genres/', data={'name': 'Рок', 'slug': 'rock'})
+        assert response.status_code == 201
+        client.get('/api/v1/titles/')
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Новинка', 'year': 2020, 'genre': ['rock'], 'category': dataset['category'].slug
+        })
+        assert response.status_code == 201 and response.json()['genre'] == ['rock'], (
+            'Проверьте, что новый жанр сразу доступен при создании произведения'
+        )
+        category = Category.objects.get(pk=dataset['category'].pk)
+        category.slug = 'renamed'
+        category.save()
+        title_id = response.json()['id']
+        data = client.get(f'/api/v1/titles/{title_id}/').json()
+        assert data['category']['slug'] == 'renamed', (
+            'Проверьте, что изменение категории сразу видно в ответах API'
+        )
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Ещё новинка', 'year': 2020, 'category': 'unknown'
+        })
+        assert response.status_code == 400 and 'category' in response.json(), (
+            'Проверьте, что при создании произведения с несуществующей категорией возвращается статус 400'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_admin_title_changelist(self, client, user_superuser, dataset):
+        client.force_login(user_superuser)
+        genre = dataset['genre']
+        response = client.get(f'/admin/reviews/title/?genre={genre.pk}')
+        assert response.status_code == 200, (
+            'Проверьте, что список произведений в админке открывается с фильтром по жанру'
+        )
+        assert genre.name in response.content.decode(), (
+            'Проверьте, что в списке произведений в админке выводятся жанры'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_registry_sees_writes_of_other_processes(self, client, admin_client, user_superuser,
+                                                        dataset, settings):
+        import time
+
+        from reviews.models import Category, Genre, GenreTitle
+        settings.VERSION_TIMEOUT = 0.5
+        title = dataset['title']
+        client.get(f'/api/v1/titles/{title.id}/')
+        # Bulk writes skip the signals, as writes of another process
+        # leave the version tokens of this process untouched.
+        Genre.objects.bulk_create([Genre(name='Рок', slug='rock')])
+        Category.objects.bulk_create([Category(name='Опера', slug='opera')])
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Новинка', 'year': 2020, 'genre': ['rock'], 'category': 'opera'
+        })
+        assert response.status_code == 201, (
+            'Проверьте, что жанры и категории, созданные другим процессом, принимаются при создании произведения'
+        )
+        data = client.get(f'/api/v1/titles/{response.json()["id"]}/').json()
+        assert data['category'] == {'name': 'Опера', 'slug': 'opera'} and data['genre'] == [
+            {'name': 'Рок', 'slug': 'rock'}
+        ], (
+            'Проверьте, что жанры и категории, созданные другим процессом, выводятся в ответах API'
+        )
+        GenreTitle.objects.bulk_create([GenreTitle(title=title, genre=Genre.objects.get(slug='rock'))])
+        client.force_login(user_superuser)
+        response = client.get('/admin/reviews/title/')
+        assert response.status_code == 200 and 'Рок' in response.content.decode(), (
+            'Проверьте, что список произведений в админке выводит жанры, созданные другим процессом'
+        )
+        Category.objects.filter(pk=title.category_id).update(name='Переименована')
+        time.sleep(settings.VERSION_TIMEOUT + 0.1)
+        data = client.get(f'/api/v1/titles/{title.id}/').json()
+        assert data['category']['name'] == 'Переименована', (
+            'Проверьте, что изменения другого процесса видны после истечения VERSION_TIMEOUT'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_registry_invalidated_once_per_transaction(self, monkeypatch):
+        from django.db import transaction
+        from reviews import registry
+        from reviews.models import Category
+        invalidated = []
+        monkeypatch.setattr(registry.categories, 'invalidate', lambda: invalidated.append(True))
+        with transaction.atomic():
+            for index in range(3):
+                Category.objects.create(name=f'Категория {index}', slug=f'category-{index}')
+            assert invalidated == [], (
+                'Проверьте, что реестр категорий сбрасывается после фиксации транзакции'
+            )
+        assert len(invalidated) == 1, (
+            'Проверьте, что реестр категорий сбрасывается один раз на транзакцию'
+        )
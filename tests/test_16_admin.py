@@ -0,0 +1,53 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class Test16Admin:
+    changelists = (
+        '/admin/reviews/title/',
+        '/admin/reviews/review/',
+        '/admin/reviews/review/?score=7',
+        '/admin/reviews/comment/',
+    )
+
+    def measure(self, client, url):
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что страница админки `{url}` открывается'
+        )
+        return [query['sql'] for query in context.captured_queries]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_changelist_queries_bounded(self, client, user_superuser, dataset):
+        client.force_login(user_superuser)
+        for url in self.changelists:
+            queries = self.measure(client, url)
+            # session, user, capped count, page rows and genres of titles
+            assert len(queries) <= 5, (
+                f'Проверьте, что число запросов страницы админки `{url}` не зависит от числа строк'
+            )
+            assert not any(
+                query.startswith('SELECT COUNT(*)') and 'LIMIT' not in query
+                for query in queries
+            ), (
+                f'Проверьте, что страница админки `{url}` не считает все строки таблицы'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_change_forms_without_user_dropdowns(self, client, user_superuser, dataset):
+        client.force_login(user_superuser)
+        urls = (
+            f'/admin/reviews/review/{dataset["review"].pk}/change/',
+            f'/admin/reviews/comment/{dataset["comment"].pk}/change/',
+        )
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 200, (
+                f'Проверьте, что страница админки `{url}` открывается'
+            )
+            assert '<select name="author"' not in response.content.decode(), (
+                f'Проверьте, что на странице админки `{url}` автор выбирается без списка всех пользователей'
+            )
@@ -0,0 +1,130 @@
+import re
+
+import pytest
+from django.db import connection
+
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def hot_queries(dataset):
+    """
+    Hot list queries with the plan step each of them has to contain.
+    """
+    from reviews.models import Comment, GenreTitle, Review, Title
+    title, review = dataset['title'], dataset['review']
+    genre_ids = [dataset['genre'].pk]
+    return {
+        'titles-list': (
+            Title.objects.order_by('name_key', 'id')[:5],
+            'SCAN reviews_title USING INDEX title_name_idx',
+        ),
+        'titles-year': (
+            Title.objects.filter(year=1960).order_by('name_key', 'id')[:5],
+            'SEARCH reviews_title USING INDEX title_year_name_idx',
+        ),
+        'titles-category': (
+            Title.objects.filter(
+                category_id__in=[dataset['category'].pk]
+            ).order_by('name_key', 'id')[:5],
+            'SEARCH reviews_title USING INDEX title_category_name_idx',
+        ),
+        'titles-genre': (
+            GenreTitle.objects.filter(genre_id__in=genre_ids).values('title_id'),
+            'SEARCH reviews_genretitle USING COVERING INDEX genretitle_genre_title_idx',
+        ),
+        'titles-top': (
+            Title.objects.order_by('-weighted_rating', 'pk')[:10],
+            'SCAN reviews_title USING INDEX title_top_idx',
+        ),
+        'titles-category-top': (
+            Title.objects.filter(
+                category_id=dataset['category'].pk
+            ).order_by('-weighted_rating', 'pk')[:10],
+            'SEARCH reviews_title USING INDEX title_category_top_idx',
+        ),
+        'title-genres': (
+            GenreTitle.objects.filter(title_id__in=[title.pk]),
+            'SEARCH reviews_genretitle USING COVERING INDEX',
+        ),
+        'reviews-list': (
+            Review.objects.filter(title_id=title.pk).order_by('-pub_date', '-id')[:5],
+            'SEARCH reviews_review USING INDEX review_title_pub_date_idx',
+        ),
+        'comments-list': (
+            Comment.objects.filter(
+                review_id=review.pk, review__title_id=title.pk
+            ).order_by('-pub_date', '-id')[:5],
+            'SEARCH reviews_comment USING INDEX comment_review_pub_date_idx',
+        ),
+    }
+
+
+class Test17Indexes:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_hot_queries_use_indexes(self, dataset):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        for name, (queryset, expected_step) in hot_queries(dataset).items():
+            plan = query_plan(queryset)
+            table_scans = [
+                step for step in plan
+                if re.match(r'SCAN (TABLE )?reviews_\w+$', step)
+            ]
+            assert not table_scans, (
+                f'Проверьте, что запрос `{name}` использует индекс, а не полный просмотр таблицы: {plan}'
+            )
+            assert 'USE TEMP B-TREE FOR ORDER BY' not in plan, (
+                f'Проверьте, что запрос `{name}` сортирует строки по индексу: {plan}'
+            )
+            assert any(
+                re.sub(r'TABLE ', '', step).startswith(expected_step) for step in plan
+            ), (
+                f'Проверьте, что запрос `{name}` использует индекс: ожидается `{expected_step}`, план {plan}'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_deep_cursor_pages_seek_the_index(self, dataset):
+        from api.pagination import KeysetPagination
+        from reviews.models import Comment, Review, Title
+        title, review = dataset['title'], dataset['review']
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        position_filter = KeysetPagination.get_position_filter
+        deep_queries = {
+            'titles-cursor': (
+                Title.objects.filter(
+                    position_filter(('name_key', 'id'), (title.name_key, title.pk))
+                ).order_by('name_key', 'id')[:5],
+                'SEARCH reviews_title USING INDEX title_name_idx (name_key>?)',
+            ),
+            'reviews-cursor': (
+                Review.objects.filter(
+                    position_filter(('-pub_date', '-id'), (review.pub_date, review.pk)),
+                    title_id=title.pk,
+                ).order_by('-pub_date', '-id')[:5],
+                'SEARCH reviews_review USING INDEX review_title_pub_date_idx (title_id=? AND pub_date<?)',
+            ),
+            'comments-cursor': (
+                Comment.objects.filter(
+                    position_filter(('-pub_date', '-id'), (review.pub_date, review.pk)),
+                    review_id=review.pk,
+                ).order_by('-pub_date', '-id')[:5],
+                'SEARCH reviews_comment USING INDEX comment_review_pub_date_idx (review_id=? AND pub_date<?)',
+            ),
+        }
+        for name, (queryset, expected_step) in deep_queries.items():
+            plan = [re.sub(r'TABLE ', '', step) for step in query_plan(queryset)]
+            assert not [step for step in plan if step.startswith('SCAN')], (
+                f'Проверьте, что запрос страницы `{name}` по курсору ищет позицию по индексу, '
+                f'а не просматривает его целиком: {plan}'
+            )
+            assert expected_step in plan, (
+                f'Проверьте, что запрос `{name}` ограничивает диапазон индекса позицией курсора: '
+                f'ожидается `{expected_step}`, план {plan}'
+            )
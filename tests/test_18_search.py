@@ -0,0 +1,142 @@
+import io
+
+import pytest
+from django.core.management import call_command
+
+
+class Test18Search:
+    url = '/api/v1/search/'
+
+    @pytest.fixture
+    def catalogue(self, admin_client):
+        from reviews.models import Title
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        shawshank = Title.objects.create(
+            name='Побег из Шоушенка', year=1994, description='Тюремная драма'
+        )
+        other = Title.objects.create(
+            name='Зелёная миля', year=1999, description='Драма о <побеге>'
+        )
+        response = admin_client.post(
+            f'/api/v1/titles/{other.id}/reviews/',
+            data={'text': 'Побег удался, отличное кино', 'score': 9}
+        )
+        review_id = response.json()['id']
+        admin_client.post(
+            f'/api/v1/titles/{other.id}/reviews/{review_id}/comments/',
+            data={'text': 'Согласен, побег великолепен'}
+        )
+        return shawshank, other, review_id
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search_ranked(self, client, catalogue):
+        shawshank, other, review_id = catalogue
+        response = client.get(f'{self.url}?q=ПОБЕГ')
+        assert response.status_code == 200, (
+            f'Проверьте, что `{self.url}?q=` возвращает статус 200'
+        )
+        results = response.json()['results']
+        assert [(hit['type'], hit['id']) for hit in results][0] == ('title', shawshank.id), (
+            'Проверьте, что совпадение в названии произведения ранжируется выше совпадений в тексте'
+        )
+        assert {(hit['type'], hit['title_id']) for hit in results} == {
+            ('title', shawshank.id), ('review', other.id), ('comment', other.id)
+        }, (
+            f'Проверьте, что `{self.url}` ищет по произведениям, отзывам и комментариям'
+        )
+        comment = next(hit for hit in results if hit['type'] == 'comment')
+        assert comment['review_id'] == review_id and '<mark>побег</mark>' in comment['snippet'], (
+            f'Проверьте, что `{self.url}` возвращает фрагменты текста с подсветкой совпадений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_search_follows_writes(self, client, admin_client, catalogue):
+        shawshank, other, review_id = catalogue
+        admin_client.patch(f'/api/v1/titles/{shawshank.id}/', data={'name': 'Искупление'})
+        admin_client.delete(f'/api/v1/titles/{other.id}/reviews/{review_id}/')
+        response = client.get(f'{self.url}?q=побег')
+        assert response.json()['results'] == [], (
+            f'Проверьте, что `{self.url}` учитывает изменение и удаление объектов'
+        )
+        response = client.get(f'{self.url}?q=искупление')
+        assert [hit['id'] for hit in response.json()['results']] == [shawshank.id], (
+            f'Проверьте, что `{self.url}` находит произведение по новому названию'
+        )
+        response = client.get(f'{self.url}?q=драма')
+        snippets = [hit['snippet'] for hit in response.json()['results']]
+        assert 'Драма о &lt;побеге&gt;' in ''.join(snippets).replace('<mark>', '').replace('</mark>', ''), (
+            f'Проверьте, что `{self.url}` экранирует HTML в найденных фрагментах'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_search_cursor_pagination(self, client, admin_client, django_user_model):
+        from reviews.models import Review, Title
+        title = Title.objects.create(name='Произведение', year=2000)
+        for index in range(7):
+            author = django_user_model.objects.create(
+                username=f'reader{index}', email=f'reader{index}@yamdb.fake'
+            )
+            Review.objects.create(
+                title=title, author=author, score=5, text='Хорошее кино ' * (index + 1)
+            )
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        data = client.get(self.url, {'q': 'кино', 'page_size': 3}).json()
+        seen = [hit['id'] for hit in data['results']]
+        while data['next']:
+            data = client.get(data['next']).json()
+            seen += [hit['id'] for hit in data['results']]
+        assert sorted(seen) == sorted(Review.objects.values_list('id', flat=True)), (
+            f'Проверьте, что курсорная пагинация `{self.url}` возвращает все результаты без повторов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_search_invalid_query(self, client):
+        for query in ('', '"*()', 'a' * 201):
+            response = client.get(self.url, {'q': query})
+            assert response.status_code == 400, (
+                f'Проверьте, что `{self.url}` с некорректным запросом возвращает статус 400'
+            )
+        response = client.get(self.url, {'q': 'кино', 'cursor': 'broken'})
+        assert response.status_code == 404, (
+            f'Проверьте, что `{self.url}` с некорректным курсором возвращает статус 404'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_rebuild_search_index(self, client, dataset):
+        from reviews.models import Comment, Review, Title
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        total = Title.objects.count() + Review.objects.count() + Comment.objects.count()
+        assert f'Indexed {total} rows' in out.getvalue(), (
+            'Проверьте, что команда rebuild_search_index индексирует произведения, отзывы и комментарии'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_search_follows_cascade_deletes(self, admin_client, dataset):
+        from django.db import connection
+        from django.db.models import Count, Sum
+        from reviews.models import Title
+
+        def read_rowids():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT rowid FROM reviews_search')
+                return {rowid for rowid, in cursor.fetchall()}
+
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        admin_client.delete(f'/api/v1/titles/{dataset["title"].id}/')
+        admin_client.delete(f'/api/v1/users/{dataset["readers"][1].username}/')
+        rowids = read_rowids()
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        assert rowids == read_rowids(), (
+            'Проверьте, что удаление произведения или пользователя удаляет из поискового индекса '
+            'их отзывы и комментарии'
+        )
+        titles = Title.objects.annotate(
+            review_sum=Sum('reviews__score'), review_count=Count('reviews')
+        )
+        assert all(
+            (title.rating_sum, title.rating_count) == (title.review_sum or 0, title.review_count)
+            for title in titles
+        ), (
+            'Проверьте, что удаление пользователя пересчитывает рейтинги произведений его отзывов'
+        )
@@ -0,0 +1,111 @@
+import pytest
+
+from .test_17_indexes import query_plan
+
+
+class Test19CasefoldKeys:
+
+    @pytest.fixture
+    def catalogue(self):
+        from reviews.models import Category, Title
+        category = Category.objects.create(name='Фильмы', slug='movies')
+        names = ('побег из Шоушенка', 'Ёлки', 'Зелёная миля', 'Апокалипсис')
+        titles = Title.objects.bulk_create(
+            Title(name=name, year=2000, category=category) for name in names
+        )
+        return category, titles
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_keys_are_casefolded(self, catalogue):
+        from reviews.models import Title
+        category, titles = catalogue
+        assert category.name_key == 'фильмы', (
+            'Проверьте, что при сохранении категории заполняется ключ названия в нижнем регистре'
+        )
+        assert set(Title.objects.values_list('name_key', flat=True)) == {
+            'побег из шоушенка', 'елки', 'зеленая миля', 'апокалипсис'
+        }, (
+            'Проверьте, что ключи названий заполняются и при `bulk_create`, а `ё` приравнивается к `е`'
+        )
+        title = Title.objects.get(name=titles[0].name)
+        title.name = 'ИСКУПЛЕНИЕ'
+        title.save(update_fields=['name'])
+        title.refresh_from_db()
+        assert title.name_key == 'искупление', (
+            'Проверьте, что ключ названия обновляется при сохранении с `update_fields`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_titles_filter_and_order(self, client, catalogue):
+        url = '/api/v1/titles/'
+        response = client.get(url, {'name': 'ПОБЕГ'})
+        assert [title['name'] for title in response.json()['results']] == ['побег из Шоушенка'], (
+            f'Проверьте, что фильтр `name` на `{url}` не зависит от регистра кириллицы'
+        )
+        response = client.get(url, {'name': 'елки'})
+        assert [title['name'] for title in response.json()['results']] == ['Ёлки'], (
+            f'Проверьте, что фильтр `name` на `{url}` не различает `е` и `ё`'
+        )
+        response = client.get(url, {'name': 'ЛЕНАЯ'})
+        assert [title['name'] for title in response.json()['results']] == ['Зелёная миля'], (
+            f'Проверьте, что фильтр `name` на `{url}` находит подстроку в середине названия'
+        )
+        response = client.get(url, {'name_prefix': 'зел'})
+        assert [title['name'] for title in response.json()['results']] == ['Зелёная миля'], (
+            f'Проверьте, что фильтр `name_prefix` на `{url}` ищет по началу названия'
+        )
+        response = client.get(url, {'name_prefix': 'миля'})
+        assert response.json()['results'] == [], (
+            f'Проверьте, что фильтр `name_prefix` на `{url}` не находит подстроку в середине названия'
+        )
+        response = client.get(url)
+        assert [title['name'] for title in response.json()['results']] == [
+            'Апокалипсис', 'Ёлки', 'Зелёная миля', 'побег из Шоушенка'
+        ], (
+            f'Проверьте, что `{url}` сортирует произведения по алфавиту без учёта регистра'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_search_fields(self, admin_client, catalogue, django_user_model):
+        django_user_model.objects.create(username='Иван', email='ivan@yamdb.fake')
+        response = admin_client.get('/api/v1/categories/', {'search': 'ФИЛЬ'})
+        assert [item['slug'] for item in response.json()['results']] == ['movies'], (
+            'Проверьте, что поиск категорий не зависит от регистра кириллицы'
+        )
+        response = admin_client.get('/api/v1/users/', {'search': 'иван'})
+        assert [item['username'] for item in response.json()['results']] == ['Иван'], (
+            'Проверьте, что поиск пользователей не зависит от регистра кириллицы'
+        )
+        response = admin_client.get('/api/v1/categories/', {'search': 'ЛЬМ'})
+        assert [item['slug'] for item in response.json()['results']] == ['movies'], (
+            'Проверьте, что поиск категорий находит подстроку в середине названия'
+        )
+        response = admin_client.get('/api/v1/categories/', {'search_prefix': 'ЛЬМ'})
+        assert response.json()['results'] == [], (
+            'Проверьте, что параметр `search_prefix` ищет только по началу названия'
+        )
+        response = admin_client.get('/api/v1/users/', {'search_prefix': 'ив'})
+        assert [item['username'] for item in response.json()['results']] == ['Иван'], (
+            'Проверьте, что параметр `search_prefix` ищет пользователей по началу имени'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_key_lookups_use_indexes(self, catalogue):
+        from api.filters import key_prefix_q
+        from reviews.models import Category, Genre, Title, User
+        lookups = (
+            (Title, 'name_key', 'title_name_idx'),
+            (Category, 'name_key', 'name_key'),
+            (Genre, 'name_key', 'name_key'),
+            (User, 'username_key', 'username_key'),
+        )
+        for model, field_name, index_name in lookups:
+            plan = query_plan(
+                model.objects.filter(key_prefix_q(field_name, 'Зел')).order_by(field_name)
+            )
+            assert any('USING INDEX' in step and index_name in step for step in plan), (
+                f'Проверьте, что поиск по `{model.__name__}.{field_name}` использует индекс: {plan}'
+            )
+            assert 'USE TEMP B-TREE FOR ORDER BY' not in plan, (
+                f'Проверьте, что сортировка по `{model.__name__}.{field_name}` использует индекс: {plan}'
+            )
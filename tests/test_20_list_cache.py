@@ -0,0 +1,114 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .conftest import MANAGE_PATH
+
+
+class Test20ListCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_list_served_from_cache(self, client, dataset):
+        from reviews import list_cache
+        url = '/api/v1/categories/'
+        first = client.get(url, {'search': 'кат', 'page_size': 2})
+        assert first['X-Cache'] == 'MISS', (
+            f'Проверьте, что первый запрос `{url}` формирует ответ'
+        )
+        with CaptureQueriesContext(connection) as context:
+            second = client.get(url, {'page_size': 2, 'search': 'кат'})
+        assert second['X-Cache'] == 'HIT' and second.json() == first.json(), (
+            f'Проверьте, что повторный запрос `{url}` отдаётся из кэша'
+        )
+        assert not context.captured_queries, (
+            f'Проверьте, что ответ `{url}` из кэша не обращается к базе данных'
+        )
+        other = client.get(url, {'page_size': 1})
+        assert other['X-Cache'] == 'MISS', (
+            f'Проверьте, что ответы `{url}` кэшируются отдельно для разных параметров'
+        )
+        assert list_cache.categories.get_stats() == {
+            'hits': 1, 'misses': 2, 'ratio': 1 / 3
+        }, (
+            'Проверьте, что попадания и промахи кэша списков подсчитываются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_writes_invalidate_cache(self, client, admin_client):
+        from reviews.models import Genre
+        url = '/api/v1/genres/'
+        client.get(url)
+        admin_client.post(url, data={'name': 'Рок', 'slug': 'rock'})
+        genre = Genre.objects.get(slug='rock')
+        response = client.get(url)
+        assert [item['slug'] for item in response.json()['results']] == ['rock'], (
+            f'Проверьте, что после создания жанра `{url}` возвращает новый список'
+        )
+        client.get(url)
+        admin_client.delete(f'{url}{genre.pk}/')
+        response = client.get(url)
+        assert response.json()['results'] == [], (
+            f'Проверьте, что после удаления жанра `{url}` возвращает новый список'
+        )
+        client.get(url)
+        Genre.objects.create(name='Джаз', slug='jazz')
+        response = client.get(url)
+        assert [item['slug'] for item in response.json()['results']] == ['jazz'], (
+            f'Проверьте, что изменения жанров вне API, например в админке, сбрасывают кэш `{url}`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_list_cache_stats_command(self, client):
+        url = '/api/v1/categories/'
+        client.get(url)
+        client.get(url)
+        out = io.StringIO()
+        call_command('list_cache_stats', '--reset', stdout=out)
+        assert 'categories: 1 hits, 1 misses, hit ratio 50.0%' in out.getvalue(), (
+            'Проверьте, что команда list_cache_stats выводит попадания и промахи кэша'
+        )
+        out = io.StringIO()
+        call_command('list_cache_stats', stdout=out)
+        assert 'categories: 0 hits, 0 misses' in out.getvalue(), (
+            'Проверьте, что команда list_cache_stats с `--reset` обнуляет счётчики'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_writes_of_other_processes_expire(self, client, settings):
+        import time
+
+        from reviews.models import Genre
+        settings.VERSION_TIMEOUT = 0.5
+        url = '/api/v1/genres/'
+        client.get(url)
+        # Bulk writes skip the signals, as writes of another process
+        # leave the version token of this process untouched.
+        Genre.objects.bulk_create([Genre(name='Рок', slug='rock')])
+        time.sleep(settings.VERSION_TIMEOUT + 0.1)
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS' and [
+            genre['slug'] for genre in response.json()['results']
+        ] == ['rock'], (
+            f'Проверьте, что `{url}` показывает жанры, созданные другим процессом, '
+            'после истечения VERSION_TIMEOUT'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_stats_read_by_other_process(self, client):
+        import subprocess
+        import sys
+
+        url = '/api/v1/genres/'
+        for _ in range(3):
+            client.get(url)
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'list_cache_stats'],
+            cwd=MANAGE_PATH, capture_output=True, text=True, check=True
+        )
+        assert 'genres: 2 hits, 1 misses' in result.stdout, (
+            'Проверьте, что команда list_cache_stats в отдельном процессе видит попадания '
+            'и промахи кэша, подсчитанные сервером'
+        )
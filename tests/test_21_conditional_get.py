@@ -0,0 +1,132 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class Test21ConditionalGet:
+
+    def revalidate(self, client, url, response):
+        with CaptureQueriesContext(connection) as context:
+            revalidated = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        return revalidated, context.captured_queries
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_not_modified_with_stamps_query(self, client, dataset):
+        title, review = dataset['title'], dataset['review']
+        urls = (
+            f'/api/v1/titles/{title.pk}/',
+            f'/api/v1/titles/{title.pk}/reviews/',
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/',
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/',
+        )
+        for url in urls:
+            response = client.get(url)
+            assert response.has_header('ETag') and response.has_header('Last-Modified'), (
+                f'Проверьте, что ответ `{url}` содержит заголовки `ETag` и `Last-Modified`'
+            )
+            revalidated, queries = self.revalidate(client, url, response)
+            assert revalidated.status_code == 304, (
+                f'Проверьте, что `{url}` с актуальным `If-None-Match` возвращает статус 304'
+            )
+            assert len(queries) == 1 and 'reviews_resourceversion' in queries[0]['sql'], (
+                f'Проверьте, что ответ 304 `{url}` формируется одним запросом к версиям ресурсов'
+            )
+            revalidated = client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+            assert revalidated.status_code == 304, (
+                f'Проверьте, что `{url}` с актуальным `If-Modified-Since` возвращает статус 304'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_writes_change_etag(self, client, admin_client, dataset):
+        title, review, category = dataset['title'], dataset['review'], dataset['category']
+        title_url = f'/api/v1/titles/{title.pk}/'
+        reviews_url = f'{title_url}reviews/'
+        comments_url = f'{reviews_url}{review.pk}/comments/'
+        writes = (
+            ((title_url,), lambda: admin_client.patch(title_url, data={'year': 1961})),
+            ((title_url, reviews_url), lambda: admin_client.post(
+                reviews_url, data={'text': 'Новый отзыв', 'score': 1}
+            )),
+            ((comments_url,), lambda: admin_client.post(
+                comments_url, data={'text': 'Новый комментарий'}
+            )),
+            ((title_url,), category.save),
+        )
+        for urls, write in writes:
+            responses = {url: client.get(url) for url in urls}
+            write()
+            for url, response in responses.items():
+                revalidated, _ = self.revalidate(client, url, response)
+                assert revalidated.status_code == 200, (
+                    f'Проверьте, что после изменения данных `{url}` возвращает новый ответ, а не 304'
+                )
+                assert revalidated['ETag'] != response['ETag'], (
+                    f'Проверьте, что после изменения данных `{url}` возвращает новый `ETag`'
+                )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_unrelated_writes_keep_etag(self, client, admin_client, dataset):
+        title, review = dataset['title'], dataset['review']
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        response = client.get(url)
+        admin_client.post(
+            f'/api/v1/titles/{title.pk}/reviews/', data={'text': 'Новый отзыв', 'score': 1}
+        )
+        revalidated, _ = self.revalidate(client, url, response)
+        assert revalidated.status_code == 304, (
+            f'Проверьте, что новый отзыв не сбрасывает `ETag` комментариев `{url}`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_stamps_shared_by_processes(self, client, dataset, settings):
+        import time
+
+        from django.core.cache import cache
+        from reviews import versions
+        from reviews.models import Title
+        settings.VERSION_TIMEOUT = 0.5
+        title = dataset['title']
+        title_url = f'/api/v1/titles/{title.pk}/'
+        reviews_url = f'{title_url}reviews/'
+        responses = {url: client.get(url) for url in (title_url, reviews_url)}
+        # Another process has a cache of its own, the stamps must not
+        # depend on what the cache of this process holds or expires.
+        cache.clear()
+        time.sleep(settings.VERSION_TIMEOUT + 0.1)
+        for url, response in responses.items():
+            revalidated, _ = self.revalidate(client, url, response)
+            assert revalidated.status_code == 304, (
+                f'Проверьте, что `ETag` ответа `{url}` не меняется без изменения данных'
+            )
+        # Bulk writes skip the signals and touch the stamps themselves,
+        # as populate_reviews does.
+        Title.objects.filter(pk=title.pk).update(year=1999)
+        versions.touch(versions.get_title_key(title.pk))
+        revalidated, _ = self.revalidate(client, title_url, responses[title_url])
+        assert revalidated.status_code == 200 and revalidated.json()['year'] == 1999, (
+            f'Проверьте, что `{title_url}` возвращает новый ответ после изменения версии в базе данных'
+        )
+        revalidated, _ = self.revalidate(client, reviews_url, responses[reviews_url])
+        assert revalidated.status_code == 304, (
+            f'Проверьте, что изменение произведения не сбрасывает `ETag` отзывов `{reviews_url}`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_writes_touch_stamps_once_per_transaction(self, dataset, monkeypatch):
+        from django.db import transaction
+        from reviews import versions
+        title = dataset['title']
+        touched = []
+        monkeypatch.setattr(versions, 'touch', lambda *keys: touched.append(set(keys)))
+        with transaction.atomic():
+            for review in title.reviews.all():
+                review.text = 'Изменённый отзыв'
+                review.save()
+            assert touched == [], (
+                'Проверьте, что версии ресурсов обновляются после фиксации транзакции'
+            )
+        assert touched == [{versions.get_title_key(title.pk), versions.get_reviews_key(title.pk)}], (
+            'Проверьте, что версии ресурсов обновляются одним вызовом на транзакцию'
+        )
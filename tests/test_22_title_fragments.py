@@ -0,0 +1,104 @@
+import pytest
+
+
+class Test22TitleFragments:
+    url = '/api/v1/titles/'
+
+    def get_listed(self, client, title_id):
+        response = client.get(self.url, {'page_size': 50})
+        return next(
+            title for title in response.json()['results'] if title['id'] == title_id
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_writes_refresh_fragments(self, client, admin_client, dataset):
+        from reviews.models import Category, Genre, GenreTitle
+        title = dataset['title']
+        listed = self.get_listed(client, title.pk)
+
+        admin_client.patch(f'{self.url}{title.pk}/', data={'year': 1961})
+        assert self.get_listed(client, title.pk)['year'] == 1961, (
+            f'Проверьте, что `{self.url}` показывает изменения произведения'
+        )
+
+        genre = Genre.objects.create(name='Новый жанр', slug='new-genre')
+        GenreTitle.objects.create(title=title, genre=genre)
+        genres = self.get_listed(client, title.pk)['genre']
+        assert {'name': 'Новый жанр', 'slug': 'new-genre'} in genres, (
+            f'Проверьте, что `{self.url}` показывает новые жанры произведения'
+        )
+
+        genre.name = 'Переименованный жанр'
+        genre.save()
+        category = Category.objects.get(pk=title.category_id)
+        category.name = 'Переименованная категория'
+        category.save()
+        listed_after = self.get_listed(client, title.pk)
+        assert {'name': 'Переименованный жанр', 'slug': 'new-genre'} in listed_after['genre'], (
+            f'Проверьте, что `{self.url}` показывает изменения жанров'
+        )
+        assert listed_after['category']['name'] == 'Переименованная категория', (
+            f'Проверьте, что `{self.url}` показывает изменения категорий'
+        )
+
+        admin_client.post(
+            f'{self.url}{title.pk}/reviews/', data={'text': 'Отзыв', 'score': 1}
+        )
+        title.refresh_from_db()
+        assert self.get_listed(client, title.pk)['rating'] == title.rating != listed['rating'], (
+            f'Проверьте, что `{self.url}` показывает рейтинг с учётом новых отзывов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_top_uses_fragments(self, client, dataset, django_assert_num_queries):
+        url = f'{self.url}top/'
+        first = client.get(url)
+        with django_assert_num_queries(1):
+            second = client.get(url)
+        assert second.json() == first.json() and first.json(), (
+            f'Проверьте, что `{url}` собирается из кэшированных произведений, '
+            'читая из базы данных только версии произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_writes_of_other_processes_expire(self, client, dataset, settings):
+        import time
+
+        from reviews import versions
+        from reviews.models import Title
+        settings.VERSION_TIMEOUT = 0.5
+        title = dataset['title']
+        self.get_listed(client, title.pk)
+        client.get(f'{self.url}top/')
+        # Queryset updates skip the signals, as writes of another process
+        # leave the boards in the cache of this process untouched. The
+        # version stamps are in the database, the other process moves them.
+        Title.objects.filter(pk=title.pk).update(name='Переименовано', weighted_rating=11)
+        versions.touch(versions.get_title_key(title.pk))
+        assert self.get_listed(client, title.pk)['name'] == 'Переименовано', (
+            f'Проверьте, что `{self.url}` сразу показывает изменения другого процесса'
+        )
+        time.sleep(settings.VERSION_TIMEOUT + 0.1)
+        top = client.get(f'{self.url}top/').json()
+        assert top[0]['id'] == title.pk and top[0]['name'] == 'Переименовано', (
+            'Проверьте, что лучшие произведения обновляются после истечения VERSION_TIMEOUT'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_fragments_outlive_version_timeout(self, client, dataset, settings):
+        import time
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        settings.VERSION_TIMEOUT = 0.5
+        first = client.get(self.url)
+        time.sleep(settings.VERSION_TIMEOUT + 0.1)
+        with CaptureQueriesContext(connection) as context:
+            second = client.get(self.url)
+        assert second.json() == first.json(), (
+            f'Проверьте, что `{self.url}` возвращает те же данные'
+        )
+        assert not any('"reviews_title"."description"' in query['sql'] for query in context.captured_queries), (
+            f'Проверьте, что `{self.url}` без изменений данных не перечитывает произведения '
+            'после истечения VERSION_TIMEOUT'
+        )
@@ -0,0 +1,96 @@
+import io
+from datetime import datetime, timezone
+
+import pytest
+from django.core.management import CommandError, call_command
+
+
+def write_csv(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+class Test23BulkPopulate:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_load_keeps_ids_and_dates(self, tmp_path, django_user_model):
+        from reviews.models import Review, Title
+        author = django_user_model.objects.create(username='reader', email='reader@yamdb.fake')
+        titles = write_csv(
+            tmp_path, 'titles.csv', 'id,name,year,category\n10,Побег,1994,\n11,Зелёная миля,1999,\n'
+        )
+        reviews = write_csv(
+            tmp_path, 'review.csv',
+            'id,title_id,text,author,score,pub_date\n'
+            f'1,10,"Отлично,\nправда",{author.pk},10,2019-09-24T21:08:21.567Z\n'
+            f'2,11,Хорошо,{author.pk},8,2020-01-01T00:00:00Z\n'
+        )
+        out = io.StringIO()
+        call_command('populate_reviews', '--bulk', '--path', titles, stdout=out)
+        call_command('populate_reviews', '--bulk', '--path', reviews, '--batch-size', '1', stdout=out)
+        assert 'Loaded 2 Review rows' in out.getvalue() and 'rows/s' in out.getvalue(), (
+            'Проверьте, что команда populate_reviews --bulk сообщает число загруженных строк и скорость загрузки'
+        )
+        assert list(Title.objects.order_by('pk').values_list('pk', 'name_key')) == [
+            (10, 'побег'), (11, 'зеленая миля')
+        ], (
+            'Проверьте, что populate_reviews --bulk сохраняет идентификаторы из файла'
+        )
+        review = Review.objects.get(pk=1)
+        assert review.pub_date == datetime(2019, 9, 24, 21, 8, 21, 567000, tzinfo=timezone.utc), (
+            'Проверьте, что populate_reviews --bulk сохраняет дату `pub_date` из файла'
+        )
+        assert review.text == 'Отлично,\nправда' and review.author_id == author.pk, (
+            'Проверьте, что populate_reviews --bulk загружает поля и связи из файла'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_bulk_load_rejects_missing_references(self, tmp_path, django_user_model):
+        from reviews.models import Review, Title
+        author = django_user_model.objects.create(username='reader', email='reader@yamdb.fake')
+        title = Title.objects.create(name='Побег', year=1994)
+        reviews = write_csv(
+            tmp_path, 'review.csv',
+            'id,title_id,text,author,score,pub_date\n'
+            f'1,{title.pk},Отлично,{author.pk},10,2019-09-24T21:08:21Z\n'
+            f'2,{title.pk + 1},Хорошо,{author.pk},8,2020-01-01T00:00:00Z\n'
+        )
+        with pytest.raises(CommandError, match=str(title.pk + 1)):
+            call_command('populate_reviews', '--bulk', '--path', reviews, stdout=io.StringIO())
+        assert not Review.objects.exists(), (
+            'Проверьте, что populate_reviews --bulk не загружает ничего, если файл ссылается на несуществующие строки'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_bulk_load_refreshes_caches(self, client, tmp_path):
+        client.get('/api/v1/categories/')
+        client.get('/api/v1/titles/')
+        categories = write_csv(tmp_path, 'category.csv', 'id,name,slug\n1,Фильм,movie\n')
+        titles = write_csv(tmp_path, 'titles.csv', 'id,name,year,category\n1,Побег,1994,1\n')
+        for path in (categories, titles):
+            call_command('populate_reviews', '--bulk', '--path', path, stdout=io.StringIO())
+        response = client.get('/api/v1/categories/')
+        assert [item['slug'] for item in response.json()['results']] == ['movie'], (
+            'Проверьте, что populate_reviews --bulk сбрасывает кэш категорий и жанров'
+        )
+        response = client.get('/api/v1/titles/')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что populate_reviews --bulk обновляет счётчик произведений'
+        )
+        assert response.json()['results'][0]['category'] == {'name': 'Фильм', 'slug': 'movie'}, (
+            'Проверьте, что произведения, загруженные populate_reviews --bulk, отображаются с категорией'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('mode', ['--bulk', '--upsert'])
+    def test_04_bulk_load_caps_batch_size(self, tmp_path, mode):
+        from reviews.models import Genre
+        genres = write_csv(
+            tmp_path, 'genre.csv',
+            'id,name,slug\n' + ''.join(f'{number},Жанр {number},genre-{number}\n' for number in range(1, 601))
+        )
+        call_command('populate_reviews', mode, '--path', genres, '--batch-size', '1000', stdout=io.StringIO())
+        assert Genre.objects.count() == 600, (
+            'Проверьте, что populate_reviews загружает пачки больше допустимого размера вставки в СУБД'
+        )
@@ -0,0 +1,88 @@
+import gzip
+import io
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+from django.core.management import CommandError, call_command
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'api_yamdb' / 'static' / 'data'
+
+
+class Test24DirectoryImport:
+
+    @pytest.fixture
+    def data_dir(self, tmp_path):
+        for path in DATA_DIR.glob('*.csv'):
+            if path.name == 'review.csv':
+                with gzip.open(tmp_path / 'review.csv.gz', 'wb') as file:
+                    file.write(path.read_bytes())
+            else:
+                shutil.copy(path, tmp_path / path.name)
+        return tmp_path
+
+    def test_01_load_order_follows_foreign_keys(self):
+        from reviews.management.commands.populate_reviews import get_load_order
+        from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title, User
+        order = get_load_order([Comment, GenreTitle, Review, Title, Genre, Category, User])
+        for Model, dependencies in (
+            (Title, (Category,)),
+            (GenreTitle, (Genre, Title)),
+            (Review, (Title, User)),
+            (Comment, (Review, User)),
+        ):
+            assert all(order.index(dependency) < order.index(Model) for dependency in dependencies), (
+                f'Проверьте, что {Model.__name__} загружается после моделей, на которые ссылается: {order}'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_load_directory(self, data_dir):
+        from reviews.models import Category, Comment, GenreTitle, Review, Title, User
+        out = io.StringIO()
+        call_command('populate_reviews', '--dir', str(data_dir), '--workers', '2', stdout=out)
+        expected = {
+            Category: 3, User: 5, Title: 32, GenreTitle: 42, Review: 72, Comment: 3
+        }
+        for Model, count in expected.items():
+            assert Model.objects.count() == count, (
+                f'Проверьте, что populate_reviews --dir загружает все строки {Model.__name__}'
+            )
+            assert f'Loaded {count} {Model.__name__} rows in' in out.getvalue(), (
+                f'Проверьте, что populate_reviews --dir сообщает время загрузки файла {Model.__name__}'
+            )
+        assert 'from review.csv.gz' in out.getvalue(), (
+            'Проверьте, что populate_reviews --dir читает файлы, сжатые gzip'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_load_directory_is_atomic(self, data_dir):
+        from reviews.models import Category, Review
+        (data_dir / 'comments.csv').write_text(
+            'id,review_id,text,author,pub_date\n1,999,Текст,100,2020-01-13T23:20:02Z\n'
+        )
+        with pytest.raises(CommandError, match='999'):
+            call_command('populate_reviews', '--dir', str(data_dir), stdout=io.StringIO())
+        assert not Category.objects.exists() and not Review.objects.exists(), (
+            'Проверьте, что при ошибке populate_reviews --dir не загружает ни одного файла'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_load_stdin(self, monkeypatch):
+        from reviews.models import Genre
+        data = gzip.compress((DATA_DIR / 'genre.csv').read_bytes())
+        monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BufferedReader(io.BytesIO(data))))
+        call_command(
+            'populate_reviews', '--bulk', '--path', '-', '--model', 'genre', stdout=io.StringIO()
+        )
+        assert Genre.objects.count() == 15, (
+            'Проверьте, что populate_reviews --path - загружает файл из stdin'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_load_directory_with_spawned_workers(self, data_dir, start_method):
+        from reviews.models import Review
+        call_command('populate_reviews', '--dir', str(data_dir), '--workers', '2', stdout=io.StringIO())
+        assert Review.objects.count() == 72, (
+            f'Проверьте, что populate_reviews --dir работает, когда процессы запускаются методом {start_method}'
+        )
@@ -0,0 +1,77 @@
+import io
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from .test_23_bulk_populate import write_csv
+
+
+def upsert(path, *options):
+    out = io.StringIO()
+    call_command('populate_reviews', '--upsert', '--path', path, *options, stdout=out)
+    return out.getvalue()
+
+
+class Test25UpsertImport:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_upsert_writes_only_changes(self, tmp_path):
+        from reviews.models import Title
+        header = 'id,name,year,category\n'
+        path = write_csv(tmp_path, 'titles.csv', header + '1,Побег,1994,\n2,Ёлки,2010,\n3,Мост,1959,\n')
+        assert '3 created, 0 updated, 0 unchanged' in upsert(path), (
+            'Проверьте, что populate_reviews --upsert создаёт новые строки'
+        )
+        assert '0 created, 0 updated, 3 unchanged' in upsert(path), (
+            'Проверьте, что populate_reviews --upsert пропускает неизменённые строки'
+        )
+        path = write_csv(
+            tmp_path, 'titles.csv', header + '1,Побег,1994,\n2,Ёлки 2,2011,\n4,Сталкер,1979,\n'
+        )
+        output = upsert(path, '--delete-missing')
+        assert '1 created, 1 updated, 1 unchanged, 1 deleted' in output, (
+            'Проверьте, что populate_reviews --upsert --delete-missing записывает только изменения и удаляет отсутствующие строки'
+        )
+        assert list(Title.objects.order_by('pk').values_list('pk', 'name', 'name_key', 'year')) == [
+            (1, 'Побег', 'побег', 1994),
+            (2, 'Ёлки 2', 'елки 2', 2011),
+            (4, 'Сталкер', 'сталкер', 1979),
+        ], (
+            'Проверьте, что populate_reviews --upsert обновляет строки по id вместе с ключами сортировки'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_upsert_restores_deleted_rows(self, tmp_path):
+        from reviews.models import Genre
+        path = write_csv(tmp_path, 'genre.csv', 'id,name,slug\n1,Драма,drama\n2,Комедия,comedy\n')
+        upsert(path)
+        Genre.objects.filter(slug='drama').delete()
+        assert '1 created, 0 updated, 1 unchanged' in upsert(path), (
+            'Проверьте, что populate_reviews --upsert восстанавливает удалённые из таблицы строки'
+        )
+        assert Genre.objects.count() == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_delete_missing_keeps_rows_created_outside_import(self, tmp_path):
+        from reviews.models import Genre
+        path = write_csv(tmp_path, 'genre.csv', 'id,name,slug\n1,Драма,drama\n2,Комедия,comedy\n')
+        upsert(path)
+        Genre.objects.create(name='Ужасы', slug='horror')
+        path = write_csv(tmp_path, 'genre.csv', 'id,name,slug\n1,Драма,drama\n')
+        assert '1 deleted' in upsert(path, '--delete-missing'), (
+            'Проверьте, что populate_reviews --delete-missing удаляет загруженные ранее строки, '
+            'отсутствующие в файле'
+        )
+        assert sorted(Genre.objects.values_list('slug', flat=True)) == ['drama', 'horror'], (
+            'Проверьте, что populate_reviews --delete-missing не удаляет строки, созданные не импортом'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_upsert_requires_id(self, tmp_path):
+        path = write_csv(tmp_path, 'genre.csv', 'name,slug\nДрама,drama\n')
+        with pytest.raises(CommandError):
+            upsert(path)
+        with pytest.raises(CommandError):
+            call_command(
+                'populate_reviews', '--delete-missing', '--path', path, stdout=io.StringIO()
+            )
@@ -0,0 +1,88 @@
+import io
+from pathlib import Path
+
+import pytest
+from django.core.management import CommandError, call_command
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'api_yamdb' / 'static' / 'data'
+
+
+def get_models():
+    from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title, User
+    return (User, Category, Genre, Title, GenreTitle, Review, Comment)
+
+
+def snapshot():
+    return {
+        Model.__name__: list(Model.objects.order_by('pk').values())
+        for Model in get_models()
+    }
+
+
+def clear():
+    for Model in reversed(get_models()):
+        Model.objects.all().delete()
+
+
+class Test26DumpReviews:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('options', [
+        (),
+        ('--gzip', '--shard-size', '20', '--batch-size', '7'),
+        ('--format', 'ndjson', '--gzip'),
+        ('--format', 'ndjson', '--shard-size', '30'),
+    ])
+    def test_01_round_trip(self, tmp_path, options):
+        from reviews.models import Review, Title, User
+        call_command('populate_reviews', '--dir', str(DATA_DIR), stdout=io.StringIO())
+        call_command('reconcile_ratings', stdout=io.StringIO())
+        User.objects.filter(pk=100).update(first_name=None, last_name='', bio='\\N')
+        Title.objects.filter(pk=1).update(description='')
+        title = Title.objects.get(pk=2)
+        title.description, title.name = None, '\\\\ обратная черта'
+        title.save()
+        Review.objects.filter(pk=1).update(text='\\')
+        expected = snapshot()
+        out = io.StringIO()
+        call_command('dump_reviews', '--dir', str(tmp_path), *options, stdout=out)
+        assert 'Dumped 72 Review rows' in out.getvalue(), (
+            'Проверьте, что команда dump_reviews сообщает число выгруженных строк'
+        )
+        clear()
+        call_command('populate_reviews', '--dir', str(tmp_path), stdout=io.StringIO())
+        assert snapshot() == expected, (
+            'Проверьте, что данные, выгруженные dump_reviews и загруженные populate_reviews --dir, '
+            'совпадают с исходными'
+        )
+        user = User.objects.get(pk=100)
+        titles = Title.objects.in_bulk([1, 2])
+        assert (user.first_name, user.last_name, user.bio) == (None, '', '\\N'), (
+            'Проверьте, что после выгрузки и загрузки NULL и пустые строки пользователя различаются'
+        )
+        assert (titles[1].description, titles[2].description) == ('', None), (
+            'Проверьте, что после выгрузки и загрузки NULL и пустое описание произведения различаются'
+        )
+        assert titles[2].name == '\\\\ обратная черта' and Review.objects.get(pk=1).text == '\\', (
+            'Проверьте, что тексты, начинающиеся с обратной черты, выгружаются и загружаются без изменений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_layout_and_shards(self, tmp_path):
+        call_command('populate_reviews', '--dir', str(DATA_DIR), stdout=io.StringIO())
+        call_command('dump_reviews', '--dir', str(tmp_path), '--shard-size', '30', stdout=io.StringIO())
+        assert sorted(path.name for path in tmp_path.glob('review.*')) == [
+            'review.0001.csv', 'review.0002.csv', 'review.0003.csv'
+        ], (
+            'Проверьте, что dump_reviews --shard-size делит таблицу на файлы с заданным числом строк'
+        )
+        header = (tmp_path / 'review.0001.csv').read_text().splitlines()[0]
+        assert header.startswith((DATA_DIR / 'review.csv').read_text().splitlines()[0]), (
+            'Проверьте, что dump_reviews записывает столбцы в порядке файлов static/data'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_dump_refuses_stale_files(self, tmp_path):
+        (tmp_path / 'review.csv').write_text('id,title_id,text,author,score,pub_date\n')
+        with pytest.raises(CommandError, match='review.csv'):
+            call_command('dump_reviews', '--dir', str(tmp_path), stdout=io.StringIO())
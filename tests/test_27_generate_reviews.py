@@ -0,0 +1,66 @@
+import io
+import statistics
+
+import pytest
+from django.core.management import CommandError, call_command
+
+SIZES = ('--users', '40', '--titles', '30', '--reviews', '400', '--comments', '200')
+
+
+def generate(path, *options):
+    out = io.StringIO()
+    call_command('generate_reviews', '--dir', str(path), *SIZES, *options, stdout=out)
+    return out.getvalue()
+
+
+def read_files(path):
+    return {file.name: file.read_bytes() for file in path.iterdir()}
+
+
+class Test27GenerateReviews:
+
+    def test_01_generation_is_deterministic(self, tmp_path):
+        generate(tmp_path / 'first', '--seed', '7', '--workers', '1')
+        generate(tmp_path / 'second', '--seed', '7', '--workers', '3')
+        generate(tmp_path / 'other', '--seed', '8', '--workers', '1')
+        assert read_files(tmp_path / 'first') == read_files(tmp_path / 'second'), (
+            'Проверьте, что generate_reviews с одним и тем же --seed создаёт одинаковые файлы '
+            'при любом числе процессов'
+        )
+        assert read_files(tmp_path / 'first') != read_files(tmp_path / 'other'), (
+            'Проверьте, что generate_reviews создаёт разные данные для разных --seed'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_load_generated_data(self, tmp_path):
+        from reviews.models import Comment, Review, Title, User
+        output = generate(tmp_path, '--load', '--workers', '2')
+        assert (User.objects.count(), Title.objects.count(), Review.objects.count()) == (40, 30, 400), (
+            'Проверьте, что generate_reviews --load загружает в базу заданное число строк'
+        )
+        assert f'{Comment.objects.count()} comments' in output, (
+            'Проверьте, что generate_reviews сообщает число созданных комментариев'
+        )
+        counts = sorted(Title.objects.values_list('rating_count', flat=True), reverse=True)
+        assert sum(counts) == 400 and counts[0] > 3 * statistics.median(counts), (
+            'Проверьте, что число отзывов на произведение распределено по закону Ципфа '
+            'и рейтинги пересчитаны после загрузки'
+        )
+        scores = list(Review.objects.values_list('score', flat=True))
+        assert statistics.mean(scores) > 6, (
+            'Проверьте, что generate_reviews смещает оценки к верху шкалы'
+        )
+
+    def test_03_rejects_impossible_sizes(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command(
+                'generate_reviews', '--dir', str(tmp_path), '--users', '2', '--titles', '3',
+                '--reviews', '7', stdout=io.StringIO()
+            )
+
+    def test_04_generate_with_spawned_workers(self, tmp_path, start_method):
+        generate(tmp_path / 'single', '--seed', '7', '--workers', '1')
+        generate(tmp_path / start_method, '--seed', '7', '--workers', '2')
+        assert read_files(tmp_path / 'single') == read_files(tmp_path / start_method), (
+            f'Проверьте, что generate_reviews работает, когда процессы запускаются методом {start_method}'
+        )
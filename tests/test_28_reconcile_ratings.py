@@ -0,0 +1,121 @@
+import io
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from .common import get_expected_rating, get_stored_rating
+
+
+def reconcile(*options):
+    out = io.StringIO()
+    call_command('reconcile_ratings', *options, stdout=out)
+    return out.getvalue()
+
+
+def corrupt(title_id):
+    from reviews.models import Title, TitleStatistics
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=1, rating_count=100, rating=0.01, weighted_rating=0.01
+    )
+    TitleStatistics.objects.filter(title_id=title_id).update(score_1=50, score_10=0)
+
+
+class Test28ReconcileRatings:
+
+    @pytest.fixture
+    def titles(self, dataset):
+        from reviews.models import Title
+        return list(
+            Title.objects.filter(reviews__isnull=False).distinct().order_by('pk').values_list('pk', flat=True)
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_repairs_drift(self, titles):
+        corrupt(titles[0])
+        corrupt(titles[1])
+        output = reconcile()
+        for title_id in titles[:2]:
+            assert get_stored_rating(title_id) == get_expected_rating(title_id), (
+                'Проверьте, что reconcile_ratings восстанавливает рейтинг и распределение оценок по отзывам'
+            )
+            assert f'Drift in title {title_id} rating counters' in output, (
+                'Проверьте, что reconcile_ratings сообщает о расхождении счётчиков рейтинга'
+            )
+            assert f'Drift in title {title_id} statistics' in output, (
+                'Проверьте, что reconcile_ratings сообщает о расхождении распределения оценок'
+            )
+        assert 'repaired drift in 2 ' in output, (
+            'Проверьте, что reconcile_ratings сообщает число исправленных произведений'
+        )
+        assert 'repaired drift in 0 ' in reconcile(), (
+            'Проверьте, что повторный запуск reconcile_ratings не находит расхождений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_dry_run_does_not_write(self, titles):
+        from reviews.models import Title, TitleStatistics
+        corrupt(titles[0])
+        before = (
+            list(Title.objects.order_by('pk').values()),
+            list(TitleStatistics.objects.order_by('pk').values()),
+        )
+        output = reconcile('--dry-run')
+        assert 'found drift in 1 ' in output and f'Drift in title {titles[0]} rating counters' in output, (
+            'Проверьте, что reconcile_ratings --dry-run сообщает о расхождениях'
+        )
+        after = (
+            list(Title.objects.order_by('pk').values()),
+            list(TitleStatistics.objects.order_by('pk').values()),
+        )
+        assert before == after, (
+            'Проверьте, что reconcile_ratings --dry-run ничего не записывает в базу'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_since_limits_titles(self, titles):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.utils import timezone
+        from reviews.models import Review, Title
+        Review.objects.update(pub_date=timezone.make_aware(timezone.datetime(2010, 1, 1)))
+        Review.objects.filter(title_id__in=titles[1:3]).update(
+            pub_date=timezone.make_aware(timezone.datetime(2020, 6, 1))
+        )
+        corrupt(titles[0])
+        corrupt(titles[1])
+        with CaptureQueriesContext(connection) as context:
+            output = reconcile('--since', '2020-01-01', '--chunk-size', '1')
+        assert 'Checked 2 titles, repaired drift in 2 ' in output, (
+            'Проверьте, что reconcile_ratings --since проверяет только произведения с новыми отзывами'
+        )
+        assert sum('"pub_date" >=' in query['sql'] for query in context.captured_queries) == 1, (
+            'Проверьте, что reconcile_ratings --since выбирает отзывы по дате один раз, а не для каждой пачки'
+        )
+        assert get_stored_rating(titles[1]) == get_expected_rating(titles[1]), (
+            'Проверьте, что reconcile_ratings --since исправляет произведения с новыми отзывами'
+        )
+        assert Title.objects.get(pk=titles[0]).rating_count == 100, (
+            'Проверьте, что reconcile_ratings --since не трогает произведения без новых отзывов'
+        )
+        with pytest.raises(CommandError):
+            reconcile('--since', 'вчера')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_reports_orphans(self, titles):
+        from django.db import connection
+        from reviews.models import Comment, GenreTitle
+        assert 'No orphaned GenreTitle rows' in reconcile() and 'No orphaned Comment rows' in reconcile(), (
+            'Проверьте, что reconcile_ratings сообщает об отсутствии висячих строк'
+        )
+        genre_title = GenreTitle.objects.first()
+        comment = Comment.objects.first()
+        with connection.constraint_checks_disabled():
+            GenreTitle.objects.filter(pk=genre_title.pk).update(genre_id=9999)
+            Comment.objects.filter(pk=comment.pk).update(review_id=9999)
+        output = reconcile()
+        assert f'Found 1 orphaned GenreTitle rows: {genre_title.pk}' in output, (
+            'Проверьте, что reconcile_ratings сообщает о строках GenreTitle без жанра или произведения'
+        )
+        assert f'Found 1 orphaned Comment rows: {comment.pk}' in output, (
+            'Проверьте, что reconcile_ratings сообщает о комментариях без отзыва'
+        )